@@ -1,8 +1,19 @@
+import os
+import tempfile
+import threading
 import unittest
 
+import numpy as np
+from PIL import Image
+
 from expression import Expression
 from expression_set import ExpressionSet
 import matplotlib.pyplot as plt
+import venn_canvas
+import venn_regions
+import visual_regression
+from venn_watch import FileWatcher, diagram_state
+from venn_worker import BackgroundWorker
 
 TRUE = (True, True)
 MAYBE_TRUE = (True, False)
@@ -10,6 +21,12 @@ FALSE = (False, True)
 MAYBE_FALSE = (False, False)
 
 
+# Set VENN_SHOW=1 to open the diagrams in windows instead of comparing them against
+# the golden images, VENN_UPDATE_GOLDEN=1 to write new golden images
+INTERACTIVE = os.environ.get("VENN_SHOW") == "1"
+UPDATE_GOLDEN = os.environ.get("VENN_UPDATE_GOLDEN") == "1"
+
+
 class VennDiagramTestCase(unittest.TestCase):
     SHOW_BY_DEFAULT = True
 
@@ -17,12 +34,20 @@ class VennDiagramTestCase(unittest.TestCase):
         s = ExpressionSet()
         s.add_premises(premises)
         s.parse_premises()
-        if show:
+        if show and INTERACTIVE:
             s.display_diagram()
-        ret = s.evaluate(Expression(exp), show=show)
-        if show:
+        ret = s.evaluate(Expression(exp), show=show and INTERACTIVE)
+        if show and INTERACTIVE:
             plt.show()
         self.assertEqual((ret[0], ret[1]), expected)
+        if show and not INTERACTIVE:
+            self.check_image(premises, exp)
+
+    def check_image(self, premises, exp):
+        name = self._testMethodName[len("test_"):]
+        name, status, ratio, message = visual_regression.check(
+            name, premises, exp, update=UPDATE_GOLDEN, out_dir=tempfile.mkdtemp())
+        self.assertIn(status, ("pass", "updated"), message)
 
     def test_some_some(self):
         # If I want to know a SOME argument there must be an X in my covered area
@@ -49,6 +74,21 @@ class VennDiagramTestCase(unittest.TestCase):
         exp = "All C's are not A's"
         self.simple_test(premises, exp, MAYBE_TRUE, show=False)
 
+    def test_some_all(self):
+        # An X in the support of an "All" argument does not make it TRUE: the
+        # refuting areas may still be inhabited
+        premises = """Some C's are A's"""
+        exp = "All C's are A's"
+        self.simple_test(premises, exp, MAYBE_TRUE, show=False)
+
+    def test_all_some_all(self):
+        # An "All" argument is TRUE once every refuting area is black, with or
+        # without an X in its support
+        premises = """All C's are A's\n
+                      Some C's are B's"""
+        exp = "All C's are A's"
+        self.simple_test(premises, exp, TRUE, show=False)
+
     def test_all_some(self):
         premises = """All A's are B's\n
                       All B's are C's"""
@@ -96,5 +136,1240 @@ class VennDiagramTestCase(unittest.TestCase):
                              " and [\"All B's are not A's\"]", "Error message")
 
 
+class VennDiagramExportTestCase(unittest.TestCase):
+    premises = """All A's are B's\n
+                  Some C's are A's"""
+    conclusions = ["Some C's are B's", "All A's are C's", "Some D's are A's",
+                   "All B's are not C's", "Some B's are not A's"]
+
+    def export(self, filename):
+        s = ExpressionSet()
+        s.add_premises(self.premises)
+        s.parse_premises()
+        path = os.path.join(tempfile.mkdtemp(), filename)
+        s.venn_diagram.export_conclusions(
+            [Expression(exp) for exp in self.conclusions], path)
+        return path
+
+    def test_export_grid(self):
+        path = self.export("grid.png")
+        self.assertTrue(os.path.getsize(path) > 0)
+
+    def test_copy_to(self):
+        from venn_diagram import VennDiagramPlt
+        s = ExpressionSet()
+        s.add_premises(self.premises)
+        s.parse_premises()
+        fig = plt.figure()
+        base = VennDiagramPlt(s, ax=fig.add_subplot(1, 2, 1), panel=True)
+        base.create_diagram()
+        copy = base.copy_to(fig.add_subplot(1, 2, 2))
+        for region_id in s.all_label.values():
+            patch = base.venn_diagram.get_patch_by_id(region_id)
+            copied = copy.venn_diagram.get_patch_by_id(region_id)
+            self.assertIsNot(patch, copied)
+            self.assertEqual(patch.get_facecolor(), copied.get_facecolor())
+        copy.show_conclusion(Expression("Some C's are B's"))
+        self.assertEqual(copy.venn_diagram.get_patch_by_id('111').get_hatch(), '///')
+        self.assertIsNone(base.venn_diagram.get_patch_by_id('111').get_hatch())
+        plt.close(fig)
+
+    def test_export_pages(self):
+        path = self.export("pages.pdf")
+        with open(path, 'rb') as f:
+            pages = f.read().count(b"/Type /Page ")
+        self.assertEqual(pages, len(self.conclusions))
+
+    def test_clear_marks(self):
+        s = ExpressionSet()
+        s.add_premises(self.premises)
+        s.parse_premises()
+        s.display_diagram()
+        patch = s.venn_diagram.venn_diagram.get_patch_by_id('110')
+        hatch = patch.get_hatch()
+        s.evaluate(Expression("Some C's are B's"), show=True)
+        self.assertEqual(len(s.venn_diagram.overlay), 2)
+        s.venn_diagram.clear_marks()
+        self.assertEqual(patch.get_hatch(), hatch)
+        self.assertEqual(len(s.venn_diagram.overlay), 0)
+        plt.close('all')
+
+    def test_export_bytes(self):
+        import io
+        s = ExpressionSet()
+        s.add_premises(self.premises)
+        s.parse_premises()
+        plt.figure()
+        s.display_diagram()
+        s.evaluate(Expression("Some C's are B's"), show=True)
+        files = s.venn_diagram.export_bytes(["png", "png@200", "svg", "pdf"])
+        self.assertEqual(list(files), ["png", "png@200", "svg", "pdf"])
+        for dpi, key in [(None, "png"), (200, "png@200")]:
+            buffer = io.BytesIO()
+            plt.savefig(buffer, format="png", dpi=dpi)
+            expected = np.asarray(Image.open(buffer))
+            self.assertTrue(np.array_equal(
+                np.asarray(Image.open(io.BytesIO(files[key]))), expected))
+        self.assertTrue(files["svg"].lstrip().startswith(b"<?xml"))
+        self.assertTrue(files["pdf"].startswith(b"%PDF"))
+        # Every raster format, in the order asked for even though they are grouped
+        # by resolution
+        from venn_diagram import RASTER_FORMATS
+        formats = ["svg"] + ["{}@{}".format(fmt, 50 + 10 * (i % 2))
+                             for i, fmt in enumerate(RASTER_FORMATS)]
+        files = s.venn_diagram.export_bytes(formats)
+        self.assertEqual(list(files), formats)
+        for spec in formats[1:]:
+            image = Image.open(io.BytesIO(files[spec]))
+            self.assertEqual(image.format.lower(),
+                             RASTER_FORMATS[spec.partition("@")[0]])
+        with self.assertRaises(ValueError):
+            s.venn_diagram.export_bytes(["bmp@100x"])
+        plt.close('all')
+
+
+class AnimationTestCase(unittest.TestCase):
+    premises = """Some C's are A's\n
+                  All A's are B's\n
+                  Some B's are not C's\n
+                  All C's are D's"""
+
+    def expression_set(self):
+        s = ExpressionSet()
+        s.add_premises(self.premises)
+        s.parse_premises()
+        return s
+
+    def test_frames(self):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from venn_diagram import VennDiagramPlt
+        s = self.expression_set()
+        frames = s.venn_diagram.animation_frames()
+        self.assertEqual(len(frames), 5)
+        # The last frame, drawn piece by piece, is the same as a diagram drawn in full
+        fig = Figure()
+        canvas = FigureCanvasAgg(fig)
+        painter = VennDiagramPlt(s, ax=fig.add_subplot())
+        painter.create_diagram()
+        painter.axes().annotate("4/4  All C's are D's", xy=(0.5, 0.08),
+                                xycoords='figure fraction', size=13, ha='center',
+                                textcoords='offset points', xytext=(0, 0))
+        canvas.draw()
+        ratio, mask = visual_regression.compare(frames[-1],
+                                                np.asarray(canvas.buffer_rgba()))
+        self.assertLessEqual(ratio, visual_regression.MAX_RATIO)
+
+    def test_moved_marks(self):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from venn_diagram import VennDiagramPlt
+        # The X's of five sets move away from the areas turned black
+        s = ExpressionSet()
+        s.add_premises("""Some C's are A's\n
+                          Some D's are not E's\n
+                          All E's are not A's\n
+                          Some B's are C's\n
+                          All D's are C's\n
+                          All C's are not E's""")
+        s.parse_premises()
+        frames = s.venn_diagram.animation_frames()
+        fig = Figure()
+        canvas = FigureCanvasAgg(fig)
+        painter = VennDiagramPlt(s, ax=fig.add_subplot())
+        painter.create_diagram()
+        painter.axes().annotate("6/6  All C's are not E's", xy=(0.5, 0.08),
+                                xycoords='figure fraction', size=13, ha='center',
+                                textcoords='offset points', xytext=(0, 0))
+        canvas.draw()
+        ratio, mask = visual_regression.compare(frames[-1],
+                                                np.asarray(canvas.buffer_rgba()))
+        self.assertLessEqual(ratio, visual_regression.MAX_RATIO)
+
+    def test_export(self):
+        s = self.expression_set()
+        directory = tempfile.mkdtemp()
+        for filename in ("steps.gif", "steps.png"):
+            path = os.path.join(directory, filename)
+            s.venn_diagram.export_animation(path, interval=500)
+            with Image.open(path) as image:
+                self.assertEqual(image.n_frames, 5)
+        path = os.path.join(directory, "frames")
+        s.venn_diagram.export_animation(path)
+        self.assertEqual(sorted(os.listdir(path)),
+                         ["frame_{:03d}.png".format(i) for i in range(5)])
+
+
+class VennRegionsTestCase(unittest.TestCase):
+    def test_four_sets(self):
+        s = ExpressionSet()
+        s.add_premises("""All A's are B's\n
+                         All B's are C's\n
+                         Some C's are D's""")
+        s.parse_premises()
+        self.assertEqual(len(s.all_label), 15)
+        s.display_diagram()
+        ret = s.evaluate(Expression("All A's are C's"), show=True)
+        self.assertEqual((ret[0], ret[1]), TRUE)
+        ret = s.evaluate(Expression("Some A's are D's"))
+        self.assertEqual((ret[0], ret[1]), MAYBE_TRUE)
+        plt.close('all')
+
+    def test_seven_sets(self):
+        s = ExpressionSet()
+        with self.assertRaises(ValueError):
+            s.add_premises("A\nB\nC\nD\nE\nF\nG")
+
+    def test_layout_regions(self):
+        for name in list(venn_regions.DEFAULT_LAYOUT.values()) + \
+                list(venn_regions.CIRCLE_LAYOUT.values()):
+            layout = venn_regions.get_layout(name)
+            self.assertEqual(len(layout.polygons), 2 ** layout.size - 1)
+            for region_id, pos in layout.label_pos.items():
+                self.assertEqual(layout.region_at(*pos), region_id)
+            self.assertIsNone(layout.region_at(layout.extent[0], layout.extent[2]))
+
+    def test_layout_disk_cache(self):
+        directory = tempfile.mkdtemp()
+        os.environ["VENN_CACHE_DIR"] = directory
+        try:
+            venn_regions._layouts.pop("ellipse4", None)
+            built = venn_regions.get_layout("ellipse4")
+            self.assertEqual(len(os.listdir(directory)), 1)
+            venn_regions._layouts.pop("ellipse4")
+            loaded = venn_regions.get_layout("ellipse4")
+            self.assertIs(venn_regions.get_layout("ellipse4"), loaded)
+            self.assertTrue((built.raster == loaded.raster).all())
+            self.assertEqual(built.label_pos, loaded.label_pos)
+        finally:
+            del os.environ["VENN_CACHE_DIR"]
+
+
+class EulerLayoutTestCase(unittest.TestCase):
+    premises = "All A's are B's\nSome C's are A's"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        os.environ["VENN_CACHE_DIR"] = cls.directory
+
+    @classmethod
+    def tearDownClass(cls):
+        del os.environ["VENN_CACHE_DIR"]
+
+    def expression_set(self, premises):
+        s = ExpressionSet()
+        s.add_premises(premises)
+        s.parse_premises()
+        return s
+
+    def test_layout(self):
+        for premises, left_out in [(self.premises, {"A", "AC"}),
+                                   ("All A's are not B's", {"AB"})]:
+            s = self.expression_set(premises)
+            mask = venn_regions.black_mask(s.all_label[label] for label in s.black)
+            layout = venn_regions.get_euler_layout(len(s.members), mask)
+            self.assertEqual({label for label, region_id in s.all_label.items()
+                              if region_id not in layout.polygons}, left_out)
+            for region_id, pos in layout.label_pos.items():
+                self.assertEqual(layout.region_at(*pos), region_id)
+            # Stored on disk, and loaded instead of fitted again
+            name = venn_regions.euler_name(len(s.members), mask)
+            self.assertTrue(any(f.startswith(name) for f in os.listdir(self.directory)))
+            venn_regions._layouts.pop(name)
+            loaded = venn_regions.get_layout(name)
+            self.assertEqual(loaded.label_pos, layout.label_pos)
+
+    def test_draw(self):
+        s = self.expression_set(self.premises)
+        s.display_diagram(euler=True)
+        self.assertIsNone(s.venn_diagram.venn_diagram.get_patch_by_id(s.all_label["A"]))
+        ret = s.evaluate(Expression("Some C's are B's"), show=True)
+        self.assertEqual((ret[0], ret[1]), TRUE)
+        for area_label in ("B", "C", "AB", "BC", "ABC"):
+            pos = s.venn_diagram.venn_diagram.get_label_by_id(
+                s.all_label[area_label]).get_position()
+            self.assertEqual(s.venn_diagram.area_at(*pos), area_label)
+        s.venn_diagram.clear_marks()
+        plt.close('all')
+        canvas = FakeCanvas()
+        diagram = venn_canvas.TkVennDiagram(canvas)
+        diagram.show(s, euler=True)
+        self.assertNotIn(s.all_label["AC"], diagram.regions)
+        diagram.show_result(*s.judge(Expression("All C's are B's")))
+        diagram.clear_marks()
+
+    def test_prepare_and_export(self):
+        import venn_gui
+        s = self.expression_set(self.premises)
+        name = venn_regions.euler_name(len(s.members), venn_regions.black_mask(
+            s.all_label[label] for label in s.black))
+        venn_regions._layouts.pop(name, None)
+        venn_gui.VennGUI.prepare(self.premises, "", euler=True)
+        self.assertIn(name, venn_regions._layouts)
+        path = os.path.join(tempfile.mkdtemp(), "premises.venn")
+        with open(path, "w") as f:
+            f.write(self.premises)
+        with open(path + ".conclusions", "w") as f:
+            f.write("Some C's are B's\nAll C's are B's")
+        export = path + ".png"
+        gui = venn_gui.VennGUI(["venn_gui.py", "-f", path, "--no_window", "--euler",
+                                "--conclusions", path + ".conclusions",
+                                "--export", export])
+        self.assertEqual(gui.run(), 0)
+        self.assertTrue(os.path.exists(export))
+        gui = venn_gui.VennGUI(["venn_gui.py", "-f", path, "--no_window", "--euler",
+                                "--animation", path + ".gif"])
+        self.assertEqual(gui.run(), 1)
+        self.assertFalse(os.path.exists(path + ".gif"))
+
+
+class VennHitTestCase(unittest.TestCase):
+    def check_areas(self, premises):
+        s = ExpressionSet()
+        s.add_premises(premises)
+        s.parse_premises()
+        s.display_diagram()
+        for area_label, patch_id in s.all_label.items():
+            pos = s.venn_diagram.venn_diagram.get_label_by_id(patch_id).get_position()
+            self.assertEqual(s.venn_diagram.area_at(*pos), area_label)
+        self.assertIsNone(s.venn_diagram.area_at(100, 100))
+        plt.close('all')
+        return s
+
+    def test_three_sets(self):
+        s = self.check_areas("""All A's are B's\n
+                               Some C's are A's""")
+        blacks, crosses = s.area_premises("AC")
+        self.assertEqual([str(e) for e in blacks], ["All A's are B's"])
+        self.assertEqual([str(e) for e in crosses], ["Some C's are A's"])
+        self.assertEqual(s.area_premises("B"), ([], []))
+
+    def test_five_sets(self):
+        self.check_areas("A\nB\nC\nD\nAll D's are E's")
+
+
+class FakeRoot(object):
+    """ Stands for the Tk root window: "after" callbacks run when fire() is called """
+    def __init__(self):
+        self.timers = dict()
+        self.count = 0
+
+    def after(self, ms, func):
+        self.count += 1
+        self.timers[self.count] = func
+        return self.count
+
+    def after_cancel(self, timer):
+        self.timers.pop(timer, None)
+
+    def fire(self):
+        timers, self.timers = self.timers, dict()
+        for func in timers.values():
+            func()
+
+
+class BackgroundWorkerTestCase(unittest.TestCase):
+    def test_debounce(self):
+        root = FakeRoot()
+        worker = BackgroundWorker(root)
+        results = []
+        for text in ["Some A", "Some A's are", "Some A's are B's"]:
+            worker.submit("preview", lambda t=text: t.upper(), results.append, delay=300)
+        root.fire()  # Start the last job
+        worker.executor.shutdown(wait=True)
+        root.fire()  # Poll the finished job
+        self.assertEqual(results, ["SOME A'S ARE B'S"])
+
+    def test_stale_result(self):
+        root = FakeRoot()
+        worker = BackgroundWorker(root)
+        results, started, release = [], threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            release.wait()
+            return "old"
+        worker.submit("preview", slow, results.append)
+        started.wait()
+        worker.submit("preview", lambda: "new", results.append)
+        release.set()
+        worker.executor.shutdown(wait=True)
+        root.fire()
+        self.assertEqual(results, ["new"])
+
+
+class FakeCanvas(object):
+    """ Stands for a Tk canvas: it keeps the options and coordinates of the items """
+    def __init__(self, width=400, height=300):
+        self.width, self.height = width, height
+        self.items = dict()  # item -> dict of its options, with "type" and "coords"
+        self.count = 0
+
+    def create(self, kind, coords, options):
+        self.count += 1
+        self.items[self.count] = dict(options, type=kind, coords=list(coords))
+        return self.count
+
+    def create_polygon(self, *coords, **options):
+        return self.create("polygon", coords, options)
+
+    def create_line(self, *coords, **options):
+        return self.create("line", coords, options)
+
+    def create_text(self, *coords, **options):
+        return self.create("text", coords, options)
+
+    def create_oval(self, *coords, **options):
+        return self.create("oval", coords, options)
+
+    def itemconfigure(self, item, **options):
+        self.items[item].update(options)
+
+    def coords(self, item, *coords):
+        self.items[item]["coords"] = list(coords)
+
+    def delete(self, tag):
+        self.items = {item: options for item, options in self.items.items()
+                      if tag != "all" and options.get("tags") != tag}
+
+    def find_all(self):
+        return tuple(self.items)
+
+    def bind(self, sequence, func, add=None):
+        pass
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+
+class TkCanvasTestCase(unittest.TestCase):
+    def test_items_reused(self):
+        canvas = FakeCanvas()
+        diagram = venn_canvas.TkVennDiagram(canvas)
+        s = ExpressionSet()
+        s.add_premises("All A's are B's\nSome C's are A's")
+        s.parse_premises()
+        diagram.show(s)
+        regions = {region_id: list(items) for region_id, items in diagram.regions.items()}
+        fills = {area_label: canvas.items[diagram.regions[patch_id][0]]["fill"]
+                 for area_label, patch_id in s.all_label.items()}
+        self.assertEqual(fills["A"], "black")
+        self.assertEqual(fills["AC"], "black")
+        self.assertEqual(fills["ABC"], "#b298b2")
+        self.assertEqual(fills["B"], "white")
+        result, marked = s.judge(Expression("Some C's are B's"))
+        diagram.show_result(result, marked, Expression("Some C's are B's"))
+        hatch = canvas.items[diagram.hatches[s.all_label["ABC"]][0]]
+        self.assertEqual((hatch["state"], hatch["stipple"]), ("normal", "gray50"))
+        self.assertEqual(canvas.items[diagram.captions[0]]["text"], "VALID ARGUMENT")
+        # Other premises of three sets only change the items
+        t = ExpressionSet()
+        t.add_premises("Some A's are B's\nAll B's are C's")
+        t.parse_premises()
+        diagram.show(t, highlight_some=False)
+        self.assertEqual(diagram.regions, regions)
+        self.assertEqual(hatch["state"], "hidden")
+        self.assertEqual(canvas.items[diagram.regions[t.all_label["AB"]][0]]["fill"],
+                         "black")
+        self.assertEqual(canvas.items[diagram.regions[t.all_label["ABC"]][0]]["fill"],
+                         "white")
+        self.assertEqual(len([o for o in canvas.items.values()
+                              if o.get("tags") == "cross"]), 1)
+
+    def test_area_at(self):
+        canvas = FakeCanvas()
+        diagram = venn_canvas.TkVennDiagram(canvas)
+        for premises in ("Some A's are B's", "A\nB\nC\nD\nAll D's are E's"):
+            s = ExpressionSet()
+            s.add_premises(premises)
+            s.parse_premises()
+            diagram.show(s)
+            for area_label, patch_id in s.all_label.items():
+                x, y = diagram.to_canvas([diagram.layout.label_pos[patch_id]])[0]
+                self.assertEqual(diagram.area_at(x, y), area_label)
+            self.assertIsNone(diagram.area_at(1, 1))
+
+    def test_no_matplotlib(self):
+        import subprocess
+        import sys
+        code = ("import sys, venn_canvas\n"
+                "assert 'matplotlib' not in sys.modules, 'matplotlib imported'\n")
+        subprocess.run([sys.executable, "-c", code], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeText(object):
+    """ Stands for a Tk Text widget of lines 16 pixels high, keeping its tagged lines """
+    def __init__(self, height=64):
+        self.height = height
+        self.tagged = dict()  # tag -> the set of the tagged line numbers
+        self.changes = 0  # The number of calls of tag_add and tag_remove
+
+    def tag_configure(self, tag, **options):
+        self.tagged.setdefault(tag, set())
+
+    def tag_bind(self, tag, sequence, func):
+        pass
+
+    def tag_add(self, tag, start, end):
+        self.tagged[tag].add(int(start.split(".")[0]))
+        self.changes += 1
+
+    def tag_remove(self, tag, start, end):
+        self.tagged[tag].discard(int(start.split(".")[0]))
+        self.changes += 1
+
+    def index(self, index):
+        x, y = map(int, index[1:].split(","))
+        return "{}.0".format(y // 16 + 1)
+
+    def dlineinfo(self, index):
+        line = int(index.split(".")[0])
+        return 0, (line - 1) * 16, 100, 16, 12
+
+    def winfo_height(self):
+        return self.height
+
+
+class PremiseDiagnosticsTestCase(unittest.TestCase):
+    premises = """A
+All A's are B's
+Some A's are C's; All A's are not C's
+Som A's are B's
+@foo
+
+Some D's are E's
+Some F's are G's
+All B's are not C's"""
+
+    def test_check(self):
+        from premise_diagnostics import PremiseChecker
+        diagnostics = PremiseChecker().check(self.premises)
+        self.assertEqual({number: kind for number, (kind, _) in diagnostics.items()},
+                         {2: "conflict", 3: "conflict", 4: "syntax", 5: "syntax",
+                          8: "sets", 9: "conflict"})
+        self.assertEqual(diagnostics[8][1],
+                         "Set \"G\" cannot be added: only 6 sets can be supported")
+        self.assertIn("\"Some A's are C's\" (line 3)", diagnostics[9][1])
+
+    def test_check_again(self):
+        import types
+        import venn_gui
+
+        class Box(object):
+            text = "All A's are B's"
+
+            def get(self, start, end):
+                return self.text
+        submitted = []
+        gui = types.SimpleNamespace(
+            premises_box=Box(), last_checked=None, checker=None,
+            diagnostic_view=types.SimpleNamespace(apply=None),
+            worker=types.SimpleNamespace(submit=lambda kind, *args, **kwargs:
+                                         submitted.append(kind)))
+        for _ in range(2):
+            venn_gui.VennGUI.check_premises(gui)
+        self.assertEqual(submitted, ["diagnostics"])
+        # The same text is checked again when it includes a file, which may change
+        gui.premises_box.text = "@include library.venn\nSome C's are A's"
+        for _ in range(2):
+            venn_gui.VennGUI.check_premises(gui)
+        self.assertEqual(submitted, ["diagnostics"] * 3)
+
+    def test_incremental(self):
+        from premise_diagnostics import PremiseChecker
+        checker = PremiseChecker()
+        lines = self.premises.split("\n")
+        checker.check("\n".join(lines))
+        self.assertEqual(checker.reparsed, len(lines))
+        lines[3] = "Some A's are B's"
+        diagnostics = checker.check("\n".join(lines))
+        self.assertEqual(checker.reparsed, 1)
+        self.assertNotIn(4, diagnostics)
+        lines.insert(0, "Some B's are D's")
+        diagnostics = checker.check("\n".join(lines))
+        self.assertEqual(checker.reparsed, 1)
+        self.assertEqual(diagnostics[6][0], "syntax")  # Line 5 moved down
+        self.assertEqual(diagnostics, PremiseChecker().check("\n".join(lines)))
+
+    def test_view(self):
+        from premise_diagnostics import DiagnosticView, PremiseChecker, tag_name
+        text, gutter, messages = FakeText(), FakeCanvas(), []
+        view = DiagnosticView(text, gutter, messages.append)
+        checker = PremiseChecker()
+        view.apply(checker.check(self.premises))
+        self.assertEqual(text.tagged[tag_name("syntax")], {4, 5})
+        self.assertEqual(text.tagged[tag_name("conflict")], {2, 3, 9})
+        # Only the visible lines (1 to 5) have markers
+        markers = [options for options in gutter.items.values()
+                   if options["type"] == "oval"]
+        self.assertEqual(len(markers), 4)
+        changes = text.changes
+        view.apply(checker.check(self.premises.replace("Som A's", "Some A's")))
+        self.assertEqual(text.tagged[tag_name("syntax")], {5})
+        self.assertEqual(text.changes, changes + 1)
+
+        class Event(object):
+            x, y = 5, 4 * 16 + 3
+        view.hover(Event())
+        self.assertEqual(messages, ["Line 5: Unknown directive \"@foo\""])
+
+
+class PremiseCacheTestCase(unittest.TestCase):
+    def test_normalize(self):
+        from expression_set import normalize_premises
+        self.assertEqual(normalize_premises("  All A's are B's\n\n Some C's are A's \n"),
+                         "All A's are B's\nSome C's are A's")
+
+    def test_compiled_once(self):
+        import venn_gui
+        first = venn_gui.VennGUI.prepare("All A's are B's\nSome C's are A's",
+                                         "Some C's are B's")
+        second = venn_gui.VennGUI.prepare("All A's are B's;  Some C's are A's\n",
+                                          "Some C's are not B's")
+        self.assertIs(first["collect"], second["collect"])
+        self.assertEqual(first["result"], "TRUE")
+        self.assertEqual(second["result"], "MAYBE TRUE")
+
+    def test_drawn_diagram_not_changed(self):
+        import venn_gui
+        # Arguments are evaluated on a copy, the query planner of the diagram the
+        # Tk thread draws is left alone
+        prepared = venn_gui.VennGUI.prepare("All A's are B's\nSome D's are C's",
+                                            "Some C's are D's")
+        self.assertEqual(prepared["result"], "TRUE")
+        self.assertIsNone(prepared["collect"].planner)
+        self.assertNotIn("judge", prepared)
+        premises = "All A's are B's\nSome D's are C's"
+        compiled = venn_gui.VennGUI.compile_premises(
+            premises, venn_gui.VennGUI.library_digests(premises, None), None)
+        self.assertIs(compiled["collect"], prepared["collect"])
+        self.assertIsNot(compiled["judge"], compiled["collect"])
+        self.assertIsNotNone(compiled["judge"].planner)
+        self.assertEqual(compiled["judge"].black, compiled["collect"].black)
+
+    def test_included_file_changes(self):
+        import venn_gui
+        path = os.path.join(tempfile.mkdtemp(), "library.venn")
+        with open(path, "w") as f:
+            f.write("All A's are B's")
+        premises = "@include \"{}\"\nSome C's are A's".format(path)
+        first = venn_gui.VennGUI.prepare(premises, "Some C's are B's")
+        self.assertEqual(first["result"], "TRUE")
+        with open(path, "w") as f:
+            f.write("All B's are A's\nSome A's are B's")
+        second = venn_gui.VennGUI.prepare(premises, "Some C's are B's")
+        self.assertIsNot(first["collect"], second["collect"])
+        self.assertEqual(second["result"], "MAYBE TRUE")
+        os.remove(path)
+        missing = venn_gui.VennGUI.prepare(premises, "Some C's are B's")
+        self.assertFalse(missing["drawable"])
+        self.assertIn("library.venn", missing["message"])
+
+    def test_include_directory(self):
+        import venn_gui
+        directories = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+        for directory, premises in zip(directories, ("All A's are B's",
+                                                     "All B's are A's")):
+            with open(os.path.join(directory, "library.venn"), "w") as f:
+                f.write(premises)
+        premises = "@include library.venn\nSome C's are A's"
+        first, second = (venn_gui.VennGUI.prepare(premises, "Some C's are B's",
+                                                  directory=directory)
+                         for directory in directories)
+        self.assertEqual(first["result"], "TRUE")
+        self.assertEqual(second["result"], "MAYBE TRUE")
+        gui = venn_gui.VennGUI(["venn_gui.py", "--no_window"])
+        gui.set_filepath(os.path.join(directories[0], "problem.venn"))
+        self.assertEqual(gui.premises_directory(), directories[0])
+        self.assertEqual(gui.checker.directory, directories[0])
+
+
+class WatchTestCase(unittest.TestCase):
+    def test_file_watcher(self):
+        path = os.path.join(tempfile.mkdtemp(), "premises.venn")
+        missing = path + ".missing"
+        with open(path, "w") as f:
+            f.write("All A's are B's")
+        watcher = FileWatcher([path, missing])
+        self.assertEqual(watcher.changed(), [path])
+        self.assertEqual(watcher.changed(), [])
+        with open(path, "a") as f:
+            f.write("\nSome C's are A's")
+        self.assertEqual(watcher.changed(), [path])
+        os.utime(path, ns=(0, 0))
+        self.assertEqual(watcher.changed(), [path])
+
+    def test_diagram_state(self):
+        def state(premises, exp):
+            s = ExpressionSet()
+            s.add_premises(premises)
+            s.parse_premises()
+            exp = Expression(exp)
+            return diagram_state(s, [(exp,) + s.judge(exp)])
+
+        before = state("All A's are B's\nSome C's are A's", "Some C's are B's")
+        self.assertEqual(before, state("Some C's are A's\n\nAll A's are B's\n"
+                                       "All A's are B's", "Some C's are B's"))
+        self.assertNotEqual(before, state("All A's are B's\nSome C's are not A's",
+                                          "Some C's are B's"))
+        self.assertNotEqual(before, state("All A's are B's\nSome C's are A's",
+                                          "Some B's are C's"))
+
+
+class PremiseLibraryTestCase(unittest.TestCase):
+    def write(self, name, text, mtime=None):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, ns=(mtime, mtime))
+        return path
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.directory, "lib"))
+        self.base = self.write("lib/base.venn", "All A's are B's")
+        self.mid = self.write("lib/mid.venn", "@include base.venn\nSome C's are A's")
+        self.problem = self.write("problem.venn", '@include "lib/mid.venn"\nD')
+        self.other = self.write("other.venn", "All A's are C's")
+
+    def test_include(self):
+        from premise_library import LibraryCache
+        libraries = LibraryCache()
+        s = ExpressionSet()
+        with open(self.problem) as f:
+            s.add_premises(f.read(), directory=self.directory, libraries=libraries)
+        s.parse_premises()
+        self.assertEqual(s.members, {"A", "B", "C", "D"})
+        self.assertEqual(s.evaluate(Expression("Some C's are B's")).verdict.key, "TRUE")
+        # Compiled files are shared until they change
+        compiled = libraries.load(self.mid).expression_set
+        diagram = libraries.diagram(self.problem)
+        self.assertIs(libraries.load(self.mid).expression_set, compiled)
+        self.assertIs(libraries.diagram(self.problem), diagram)
+        libraries.diagram(self.other)
+        self.assertEqual(libraries.stale(), set())
+        self.write("lib/base.venn", "All A's are not B's", mtime=10 ** 9)
+        self.assertEqual(libraries.stale(), {self.base, self.mid, self.problem})
+        diagram = libraries.diagram(self.problem)
+        self.assertEqual(diagram.evaluate(Expression("Some C's are B's")).verdict.key,
+                         "MAYBE TRUE")
+        self.assertEqual(libraries.stale(), set())
+
+    def test_errors(self):
+        from premise_library import LibraryCache
+        self.write("lib/base.venn", "@include mid.venn", mtime=10 ** 9)
+        with self.assertRaises(ValueError):
+            LibraryCache().load(self.problem)
+        self.write("lib/base.venn", "All A's are", mtime=2 * 10 ** 9)
+        with self.assertRaises(SyntaxError):
+            LibraryCache().load(self.problem)
+        with self.assertRaises(SyntaxError):
+            ExpressionSet().add_premises("@import base.venn")
+
+
+class EvaluationResultTestCase(unittest.TestCase):
+    def test_result(self):
+        from expression_set import Verdict
+        s = ExpressionSet()
+        s.add_premises("All A's are B's\nSome C's are A's\nSome B's are not C's")
+        s.parse_premises()
+        result = s.evaluate(Expression("Some C's are B's"))
+        self.assertIs(result.verdict, Verdict.TRUE)
+        self.assertEqual(result.verdict.key, "TRUE")
+        validity, must, reason = result
+        self.assertEqual((validity, must), TRUE)
+        self.assertEqual((result[0], result[1]), TRUE)
+        self.assertTrue(reason.startswith("This is a TRUE statement"))
+        self.assertEqual(result.marked, {"BC", "ABC"})
+        self.assertEqual(result.mask, 1 << int(s.all_label["BC"], 2) |
+                         1 << int(s.all_label["ABC"], 2))
+        blacks, crosses = result.premises()
+        self.assertEqual([str(e) for e in blacks], [])
+        self.assertEqual([str(e) for e in crosses], ["Some C's are A's"])
+
+    def test_unknown(self):
+        from expression_set import Verdict
+        s = ExpressionSet()
+        s.add_premises("All A's are B's")
+        s.parse_premises()
+        result = s.evaluate(Expression("Some A's are D's"))
+        self.assertIs(result.verdict, Verdict.UNKNOWN)
+        self.assertIsNone(result.verdict.key)
+        self.assertEqual(tuple(result), (False, True, "Set name(s) not found: 'D'"))
+        self.assertEqual([Verdict.from_key(key) for key in
+                          ["TRUE", "MAYBE TRUE", "NO TRUE", "FALSE", "MAYBE FALSE"]],
+                         list(range(5)))
+
+    def test_tuple(self):
+        s = ExpressionSet()
+        s.add_premises("All A's are B's")
+        s.parse_premises()
+        result = s.evaluate(Expression("Some A's are D's"))
+        as_tuple = tuple(result)
+        self.assertEqual(result, as_tuple)
+        self.assertEqual(hash(result), hash(as_tuple))
+        self.assertEqual({as_tuple: 1}[result], 1)
+        self.assertEqual([result[i] for i in range(-3, 3)], list(as_tuple * 2))
+        self.assertEqual(result[1:], as_tuple[1:])
+        with self.assertRaises(IndexError):
+            result[3]
+        other = s.evaluate(Expression("Some E's are A's"))
+        self.assertNotEqual(result, other)
+        self.assertEqual(result, s.evaluate(Expression("Some A's are D's")))
+
+
+class WitnessTestCase(unittest.TestCase):
+    @staticmethod
+    def holds(s, exp, inhabited):
+        support, against = s.parse(exp)
+        if exp.lhs.some:
+            return len(inhabited.intersection(support)) > 0
+        return len(inhabited.intersection(against)) == 0
+
+    @staticmethod
+    def consistent(s, inhabited):
+        return inhabited.isdisjoint(s.black) and \
+            all(inhabited.intersection(area_labels) for area_labels in s.cross)
+
+    def test_syllogisms(self):
+        import benchmark
+        import itertools
+        for premises, _ in benchmark.syllogisms():
+            s = benchmark.compiled(premises)
+            labels = sorted(s.all_label)
+            worlds = [set(world) for n in range(len(labels) + 1)
+                      for world in itertools.combinations(labels, n)
+                      if self.consistent(s, set(world))]
+            for conclusion in ["All A's are C's", "Some A's are C's",
+                               "Some C's are not A's", "All C's are not A's"]:
+                exp = Expression(conclusion)
+                for holds in (False, True):
+                    witness = s.witness(exp, holds)
+                    exists = any(self.holds(s, exp, world) == holds for world in worlds)
+                    self.assertEqual(witness is not None, exists, (premises, conclusion))
+                    if witness is not None:
+                        self.assertTrue(self.consistent(s, witness.inhabited))
+                        self.assertEqual(self.holds(s, exp, witness.inhabited), holds)
+                        self.assertEqual(witness.inhabited | witness.empty,
+                                         set(labels))
+
+    def test_show(self):
+        s = ExpressionSet()
+        s.add_premises("All A's are B's\nSome C's are A's")
+        s.parse_premises()
+        s.display_diagram()
+        result = s.evaluate(Expression("All C's are B's"))
+        witness = result.witness()
+        self.assertEqual(str(witness),
+                         "All C's are B's is FALSE when only C, ABC have members")
+        self.assertIsNone(s.witness(Expression("Some A's are D's")))
+        s.venn_diagram.show_witness(witness)
+        self.assertGreater(len(s.venn_diagram.overlay), 0)
+        s.venn_diagram.clear_marks()
+        self.assertEqual(len(s.venn_diagram.overlay), 0)
+        plt.close("all")
+
+    def test_print(self):
+        import contextlib
+        import io
+        import venn_gui
+        path = os.path.join(tempfile.mkdtemp(), "premises.venn")
+        with open(path, "w") as f:
+            f.write("All A's are B's\nSome C's are A's")
+        for exp, lines in [("Some C's are not B's",
+                            ["MAYBE TRUE\tSome C's are not B's",
+                             "\tSome C's are not B's is FALSE when only ABC has "
+                             "members"]),
+                           ("Some C's are B's", ["TRUE\tSome C's are B's",
+                                                 "\tNo counterexample"]),
+                           ("Some C's are D's", ["UNKNOWN\tSome C's are D's"])]:
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                venn_gui.VennGUI(["venn_gui.py", "-f", path, "--no_window", "-e", exp,
+                                  "--witness"]).run()
+            self.assertEqual(out.getvalue().splitlines(), lines)
+
+
+class QueryPlannerTestCase(unittest.TestCase):
+    def test_plan(self):
+        s = ExpressionSet()
+        s.add_premises("All A's are B's\nSome B's are C's\nAll D's are E's\nF")
+        s.parse_premises()
+        s.judge(Expression("Some A's are C's"))
+        planner = s.planner
+        self.assertEqual(planner.plan(Expression("Some C's are A's")), {"A", "B", "C"})
+        self.assertEqual(planner.plan(Expression("Some A's are F's")),
+                         {"A", "B", "C", "F"})
+        self.assertEqual(len(planner.projection(frozenset("ABC"))), 3)
+        s.judge(Expression("All B's are A's"))
+        self.assertEqual(list(planner.projections), [frozenset("ABC")])
+        self.assertEqual(s.judge(Expression("Some A's are D's")),
+                         s.judge_diagram(Expression("Some A's are D's")))
+
+    def test_whole_diagram(self):
+        import workload
+        generator = workload.WorkloadGenerator(seed=3, sets=(4, 5, 6),
+                                               premises=(1, 5), conclusions=4)
+        for problem in generator.generate(100):
+            if problem["conflicting"]:
+                continue
+            s = ExpressionSet()
+            s.add_premises("\n".join(problem["premises"]))
+            s.parse_premises()
+            for conclusion in problem["conclusions"]:
+                exp = Expression(conclusion)
+                self.assertEqual(s.judge(exp), s.judge_diagram(exp))
+                self.assertEqual(s.planner.verdict(exp), s.judge_diagram(exp)[0])
+
+
+class DiagramStackTestCase(unittest.TestCase):
+    def test_verdicts(self):
+        import benchmark
+        from diagram_stack import DiagramStack
+        sets = [benchmark.compiled(premises) for premises, _ in benchmark.syllogisms()]
+        sets += [benchmark.compiled(benchmark.chain_premises(size, 2 * size))
+                 for size in range(2, 7)]
+        sets.append(benchmark.compiled("All A's are B's\nSome D's are not C's"))
+        stack = DiagramStack(sets)
+        for conclusion in ["All A's are C's", "Some A's are C's", "Some C's are not A's",
+                           "All A's are not C's", "Some E's are not B's",
+                           "All D's are C's", "Some F's are A's"]:
+            exp = Expression(conclusion)
+            self.assertEqual(list(stack.verdicts(exp)),
+                             [s.evaluate(exp).verdict for s in sets], conclusion)
+
+    def test_empty(self):
+        from diagram_stack import evaluate_many
+        self.assertEqual(evaluate_many([], Expression("Some A's are B's")), [])
+
+
+class ResultStoreTestCase(unittest.TestCase):
+    def test_round_trip(self):
+        import batch_eval
+        import result_store
+        import workload
+        problems = list(workload.WorkloadGenerator(
+            seed=4, sets=(2, 3), conclusions=3, conflict_ratio=0.2).generate(50))
+        problems.append({"id": "bad", "premises": ["All A's are B's", "C"],
+                         "conclusions": ["Some A's are D's", "All A's are C's"]})
+        path = os.path.join(tempfile.mkdtemp(), "results.vres")
+        count, rows = batch_eval.evaluate(problems, path)
+        self.assertEqual((count, rows), (51, 152))
+        store = result_store.ResultStore(path)
+        self.assertEqual(len(store), 152)
+        verdicts = [store.verdicts[code] for code in store["verdict"]]
+        self.assertEqual(verdicts[-2:], ["UNKNOWN", "MAYBE TRUE"])
+        self.assertEqual(list(store["problem"][-2:]), [50, 50])
+        self.assertEqual(list(store["conclusion"][-2:]), [0, 1])
+        for problem in problems[:-1]:
+            if problem["conflicting"]:
+                continue
+            s = ExpressionSet()
+            s.add_premises("\n".join(problem["premises"]))
+            s.parse_premises()
+            ret = s.evaluate(Expression(problem["conclusions"][0]))
+            row = list(store["problem"]).index(problems.index(problem))
+            self.assertEqual((ret[0], ret[1]),
+                             (store["validity"][row], store["must"][row]))
+        # Conclusions that were not evaluated do not share the pair of MAYBE FALSE
+        for row, code in enumerate(store["verdict"]):
+            pair = (store["validity"][row], store["must"][row])
+            if store.verdicts[code] in ("CONFLICT", "ERROR"):
+                self.assertEqual(pair, (result_store.NO_PAIR, result_store.NO_PAIR))
+            else:
+                self.assertIn(pair, {(0, 0), (0, 1), (1, 0), (1, 1)})
+        self.assertEqual(result_store.verdict_pair("MAYBE FALSE"), (False, False))
+        conflicts = sum(len(p["conclusions"]) for p in problems if p.get("conflicting"))
+        distribution = store.distribution(by="verdict", of="expected")
+        self.assertEqual(distribution["CONFLICT"], {"CONFLICT": conflicts})
+        self.assertEqual(sum(sum(c.values()) for c in distribution.values()), 152)
+        by_pattern = store.distribution(chunk_rows=7)
+        self.assertEqual(by_pattern, store.distribution())
+        self.assertEqual(set(by_pattern), set(store.patterns))
+
+    def test_no_mood(self):
+        import batch_eval
+        import result_store
+        # The conclusions of a problem that could not be parsed have no mood
+        problems = [{"premises": ["All A's are B's"],
+                     "conclusions": ["Some A's are B's", "Some A's"]},
+                    {"premises": ["All A's"], "conclusions": ["All A's are B's"]}]
+        path = os.path.join(tempfile.mkdtemp(), "results.vres")
+        batch_eval.evaluate(problems, path)
+        store = result_store.ResultStore(path)
+        self.assertEqual(list(store["mood"]),
+                         [2, result_store.NO_MOOD, result_store.NO_MOOD])
+        self.assertEqual(store.distribution(by="mood", of="verdict"),
+                         {"I": {"MAYBE TRUE": 1},
+                          result_store.NO_MOOD: {"ERROR": 2}})
+
+    def test_wide_columns(self):
+        import result_store
+        # Conclusion numbers and patterns past 65535 do not wrap around
+        path = os.path.join(tempfile.mkdtemp(), "results.vres")
+        with result_store.ResultWriter(path) as writer:
+            for number in range(70000):
+                writer.append(number, 70000 + number, "TRUE", "A", 2, str(number))
+        store = result_store.ResultStore(path)
+        self.assertEqual(int(store["conclusion"][-1]), 139999)
+        self.assertEqual(int(store["pattern"][-1]), 69999)
+        self.assertEqual(store.patterns[store["pattern"][-1]], "69999")
+
+    def test_grade_errors(self):
+        import batch_eval
+        from expression_set import MAX_SETS
+        names = [chr(ord("A") + i) for i in range(MAX_SETS + 1)]
+        too_many = {"premises": ["All {}'s are {}'s".format(a, b)
+                                 for a, b in zip(names, names[1:])],
+                    "conclusions": ["Some A's are B's"]}
+        self.assertEqual(batch_eval.grade(too_many)[2], [(None, "ERROR")])
+        missing = {"premises": ["@include missing.venn"],
+                   "conclusions": ["Some A's are B's"], "directory": tempfile.mkdtemp()}
+        self.assertEqual(batch_eval.grade(missing), (0, "", [(None, "ERROR")]))
+        conflict = {"premises": ["All A's are B's", "Some A's are not B's"],
+                    "conclusions": ["Some A's are B's"]}
+        self.assertEqual(batch_eval.grade(conflict), (2, "AO", [("I", "CONFLICT")]))
+
+
+class PremiseBankTestCase(unittest.TestCase):
+    def test_bank(self):
+        import json
+        import batch_eval
+        import premise_bank
+        import workload
+        problems = list(workload.WorkloadGenerator(seed=6, conclusions=2).generate(30))
+        directory = tempfile.mkdtemp()
+        source = os.path.join(directory, "problems.jsonl")
+        with open(source, "w") as f:
+            f.writelines(json.dumps(problem) + "\n" for problem in problems[:20])
+        path = os.path.join(directory, "bank.jsonl")
+        self.assertEqual(premise_bank.main(["premise_bank.py", "build", path, source]), 0)
+        self.assertEqual(premise_bank.append(path, problems[20:25]), 5)
+        with self.assertRaises(ValueError):
+            premise_bank.append(path, problems[:1])
+        # Problems written by another program are found by indexing the bank again
+        with open(path, "a") as f:
+            f.writelines(json.dumps(problem) + "\n" for problem in problems[25:])
+        with premise_bank.PremiseBank(path) as bank:
+            self.assertEqual(len(bank), 30)
+            self.assertEqual(bank.ids, [problem["id"] for problem in problems])
+            problem = bank[problems[27]["id"]]
+            self.assertEqual(problem["premises"], problems[27]["premises"])
+            self.assertEqual(problem["expected"], problems[27]["expected"])
+        self.assertEqual([p["conclusions"] for p in batch_eval.read_problems(path)],
+                         [p["conclusions"] for p in problems])
+
+    def test_changed_bank(self):
+        import json
+        import premise_bank
+        problems = [{"id": "p{}".format(i), "premises": ["All A's are B's"],
+                     "conclusions": []} for i in range(4)]
+        path = os.path.join(tempfile.mkdtemp(), "bank.jsonl")
+        premise_bank.append(path, problems[:2])
+        # Another program writes a last line without a line break
+        with open(path, "a") as f:
+            f.write(json.dumps(problems[2]))
+        self.assertEqual(premise_bank.append(path, problems[3:]), 1)
+        with premise_bank.PremiseBank(path) as bank:
+            self.assertEqual(bank.ids, ["p0", "p1", "p2", "p3"])
+        # A bank changed without changing its size is indexed again
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data.replace(b'"p1"', b'"q1"'))
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+        with premise_bank.PremiseBank(path) as bank:
+            self.assertEqual(bank.ids, ["p0", "q1", "p2", "p3"])
+            self.assertEqual(bank["q1"]["id"], "q1")
+
+    def test_bank_with_include(self):
+        import batch_eval
+        import premise_bank
+        source = tempfile.mkdtemp()
+        with open(os.path.join(source, "library.premises"), "w") as f:
+            f.write("All A's are B's")
+        with open(os.path.join(source, "p1.venn"), "w") as f:
+            f.write("@include library.premises\nSome C's are A's")
+        with open(os.path.join(source, "p1.conclusions"), "w") as f:
+            f.write("Some C's are B's")
+        # The bank is in another directory than the included file
+        path = os.path.join(tempfile.mkdtemp(), "bank.jsonl")
+        self.assertEqual(premise_bank.main(["premise_bank.py", "build", path, source]), 0)
+        with premise_bank.PremiseBank(path) as bank:
+            self.assertEqual(bank["p1"]["directory"], os.path.abspath(source))
+            self.assertEqual(batch_eval.grade(bank["p1"]), (3, "AI", [("I", "TRUE")]))
+
+
+class BenchmarkTestCase(unittest.TestCase):
+    def test_syllogisms(self):
+        import benchmark
+        problems = benchmark.syllogisms()
+        self.assertEqual(len(set(problems)), 256)
+        for premises, conclusion in problems:
+            benchmark.compiled(premises).evaluate(Expression(conclusion))
+
+    def test_distinct_premises(self):
+        import benchmark
+        for size in range(2, 7):
+            count = 3 * size * (size - 1) // 2 + size - 1
+            s = benchmark.compiled(benchmark.distinct_premises(size, count))
+            self.assertEqual((len(s.relations), len(s.members)), (count, size))
+            with self.assertRaises(ValueError):
+                benchmark.distinct_premises(size, count + 1)
+
+    def test_removed_inputs(self):
+        import contextlib
+        import benchmark
+        # A case whose setup is a context manager leaves it once it is measured
+        events = []
+
+        @contextlib.contextmanager
+        def setup():
+            events.append("enter")
+            yield lambda: events.append("call")
+            events.append("exit")
+
+        benchmark.CASES["removed_inputs"] = (2, setup)
+        try:
+            benchmark.measure("removed_inputs", repeat=3)
+        finally:
+            del benchmark.CASES["removed_inputs"]
+        self.assertEqual(events, ["enter"] + ["call"] * 7 + ["exit"])
+        self.assertIsInstance(benchmark.bench_startup(),
+                              contextlib.AbstractContextManager)
+
+    def test_compare(self):
+        import benchmark
+        baseline = {"results": {"a": {"median": 1.0}, "b": {"median": 1.0}}}
+        current = {"results": {"a": {"median": 1.1}, "b": {"median": 1.5},
+                               "c": {"median": 9.0}}}
+        self.assertEqual([r[0] for r in benchmark.compare(current, baseline, 0.25)],
+                         ["b"])
+        self.assertEqual(benchmark.over_budget(current, {"a": 1.0, "c": 10.0}),
+                         [("a", 1.0, 1.1)])
+
+
+class StartupTestCase(unittest.TestCase):
+    def test_no_window_imports(self):
+        import subprocess
+        import sys
+        path = os.path.join(tempfile.mkdtemp(), "premises.venn")
+        with open(path, "w") as f:
+            f.write("All A's are B's\nSome C's are A's")
+        code = ("import sys, venn_gui\n"
+                "venn_gui.VennGUI(sys.argv).run()\n"
+                "print(sorted({'tkinter', 'matplotlib'} & set(sys.modules)))")
+        output = subprocess.run(
+            [sys.executable, "-c", code, "-f", path, "--no_window",
+             "-e", "Some C's are B's"], check=True, capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        self.assertEqual(output.split("\n"), ["TRUE\tSome C's are B's", "[]", ""])
+
+    def test_animation_backend(self):
+        import venn_gui
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "premises.venn")
+        with open(path, "w") as f:
+            f.write("All A's are B's\nSome C's are A's")
+        # Writing the animation alone does not use the display backend either
+        backends = []
+        load_pyplot = venn_gui.load_pyplot
+        venn_gui.load_pyplot = lambda backend=None: backends.append(backend)
+        try:
+            gui = venn_gui.VennGUI(["venn_gui.py", "-f", path, "--no_window",
+                                    "--animation", os.path.join(directory, "steps.gif")])
+            self.assertEqual(gui.run(), 0)
+        finally:
+            venn_gui.load_pyplot = load_pyplot
+        self.assertEqual(backends, ["Agg"])
+        self.assertTrue(os.path.exists(os.path.join(directory, "steps.gif")))
+
+
+class VisualRegressionTestCase(unittest.TestCase):
+    def test_cases(self):
+        results = visual_regression.run(list(visual_regression.CASES), jobs=2,
+                                        update=UPDATE_GOLDEN,
+                                        out_dir=tempfile.mkdtemp())
+        failed = [(name, message) for name, status, ratio, message in results
+                  if status not in ("pass", "updated")]
+        self.assertEqual(failed, [])
+
+    def test_diff(self):
+        premises, exp = visual_regression.CASES["cross"]
+        golden = visual_regression.render(premises, exp)
+        # Moving an X mark or changing a hatch pattern must be caught
+        ratio, mask = visual_regression.compare(
+            visual_regression.render(premises, exp, highlight_some=False), golden)
+        self.assertGreater(ratio, visual_regression.MAX_RATIO)
+        ratio, mask = visual_regression.compare(
+            visual_regression.render(premises, "Some C's are not B's"), golden)
+        self.assertGreater(ratio, visual_regression.MAX_RATIO)
+        diff = visual_regression.diff_image(golden, mask)
+        self.assertEqual(tuple(diff[mask][0]), (255, 0, 0, 255))
+
+
+class WorkloadTestCase(unittest.TestCase):
+    def test_reference_model(self):
+        import workload
+        model = workload.ReferenceModel(3)
+        names = ["A", "B", "C"]
+        premises = [("A", "B", "A"), ("B", "C", "A")]
+        self.assertEqual(model.verdict(names, premises, ("A", "C", "A")), "TRUE")
+        self.assertEqual(model.verdict(names, premises, ("A", "C", "E")), "FALSE")
+        self.assertEqual(model.verdict(names, premises, ("C", "A", "E")), "MAYBE TRUE")
+        self.assertEqual(model.verdict(names, [("A", "B", "I"), ("B", "C", "I")],
+                                       ("A", "C", "I")), "MAYBE TRUE")
+        self.assertEqual(model.verdict(names, [("A", "B", "E"), ("B", "A", "I")],
+                                       ("A", "C", "I")), "CONFLICT")
+
+    def test_engine_agrees(self):
+        import batch_eval
+        import workload
+        from diagram_stack import evaluate_many
+        generator = workload.WorkloadGenerator(seed=2, sets=(2, 3, 4), conclusions=4)
+        for problem in generator.generate(200):
+            verdicts = [verdict for _, verdict in batch_eval.grade(problem)[2]]
+            self.assertEqual(verdicts, problem["expected"], problem["premises"])
+        # An X in the support of an "All" argument does not make it TRUE
+        s = ExpressionSet()
+        s.add_premises("Some C's are A's\nSome C's are not A's")
+        s.parse_premises()
+        for conclusion, verdict in [("All C's are A's", "FALSE"),
+                                    ("All A's are C's", "MAYBE TRUE")]:
+            self.assertEqual(s.judge(Expression(conclusion))[0], verdict)
+            self.assertEqual(evaluate_many([s], Expression(conclusion))[0].key,
+                             verdict)
+
+    def test_deterministic(self):
+        import workload
+        generator = workload.WorkloadGenerator(seed=5, sets=(2, 3, 4), name_length=2,
+                                               duplicate_ratio=0.3,
+                                               symmetric_ratio=0.3)
+        problems = list(generator.generate(20))
+        self.assertEqual(problems, list(generator.generate(20)))
+        self.assertEqual(problems[7], generator.problem(7))
+
+    def test_conflicts(self):
+        import workload
+        for ratio in (0, 1):
+            generator = workload.WorkloadGenerator(seed=1, conflict_ratio=ratio)
+            for problem in generator.generate(30):
+                s = ExpressionSet()
+                s.add_premises("\n".join(problem["premises"]))
+                if ratio:
+                    self.assertEqual(problem["expected"][0], "CONFLICT")
+                    self.assertRaises(ValueError, s.parse_premises)
+                else:
+                    self.assertNotEqual(problem["expected"][0], "CONFLICT")
+                    s.parse_premises()
+
+
 if __name__ == '__main__':
     unittest.main()
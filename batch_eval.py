@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from expression import Expression
+from expression_set import ExpressionSet
+import premise_bank
+from result_store import ResultStore, ResultWriter
+
+
+def mood(exp: Expression):
+    """
+    :return: the mood of a statement: A (All are), E (All are not), I (Some are) or
+             O (Some are not)
+    """
+    if exp.lhs.all:
+        return "E" if exp.rhs.neg else "A"
+    return "O" if exp.rhs.neg else "I"
+
+
+def read_problems(path: str):
+    """
+    :param path: a JSON lines file of problems (see workload.py), a bank of problems
+                 (see premise_bank.py), or a directory of <id>.venn premises files
+                 with <id>.conclusions files
+    :return: an iterator of problems: dicts with id, premises, conclusions and,
+             if known, expected and the directory included files are relative to
+    """
+    if premise_bank.is_bank(path):
+        with premise_bank.PremiseBank(path) as bank:
+            yield from bank
+    elif os.path.isdir(path):
+        for filename in sorted(os.listdir(path)):
+            if not filename.endswith(".venn"):
+                continue
+            problem_id = filename[:-len(".venn")]
+            with open(os.path.join(path, filename), "r", encoding="utf8") as f:
+                premises = [line.strip() for line in f if line.strip() != ""]
+            conclusions = []
+            filename = os.path.join(path, problem_id + ".conclusions")
+            if os.path.exists(filename):
+                with open(filename, "r", encoding="utf8") as f:
+                    conclusions = [line.strip() for line in f if line.strip() != ""]
+            yield {"id": problem_id, "premises": premises, "conclusions": conclusions,
+                   "directory": path}
+    else:
+        with open(path, "r", encoding="utf8") as f:
+            for line in f:
+                if line.strip() != "":
+                    yield json.loads(line)
+
+
+def grade(problem):
+    """
+    :param problem: a problem of read_problems
+    :return: the number of sets, the premise pattern (the sorted moods of the
+             premises, e.g. "AAI"), a list of (mood, verdict) of the conclusions
+             (the mood is None for conclusions that could not be parsed)
+    """
+    s = ExpressionSet()
+    pattern = ""
+    try:
+        s.add_premises("\n".join(problem["premises"]),
+                       directory=problem.get("directory"))
+        pattern = "".join(sorted(mood(exp) for exp in s.relations))
+        s.parse_premises()
+        conflict = False
+    except ValueError:
+        # Only conflicting premises are a conflict, not a diagram of a wrong size
+        # or an included file with too many sets
+        if not any(True for _ in s.conflicts()):
+            return len(s), pattern, [(None, "ERROR")] * len(problem["conclusions"])
+        conflict = True
+    except (OSError, SyntaxError, TypeError):
+        return len(s), pattern, [(None, "ERROR")] * len(problem["conclusions"])
+    ret = []
+    for conclusion in problem["conclusions"]:
+        try:
+            exp = Expression(conclusion)
+        except SyntaxError:
+            ret.append((None, "ERROR"))
+            continue
+        if conflict:
+            ret.append((mood(exp), "CONFLICT"))
+        else:
+            result = s.judge(exp)[0]
+            ret.append((mood(exp), result if result is not None else "UNKNOWN"))
+    return len(s), pattern, ret
+
+
+def evaluate(problems, path: str, meta=None):
+    """
+    Grade the conclusions of the problems and write the verdicts to a result file
+    :param problems: an iterable of problems of read_problems
+    :param path: the path of the result file
+    :param meta: a dict of extra information kept in the result file
+    :return: the number of problems and the number of conclusions graded
+    """
+    count = 0
+    with ResultWriter(path, meta=meta) as writer:
+        for number, problem in enumerate(problems):
+            sets, pattern, verdicts = grade(problem)
+            expected = problem.get("expected") or [None] * len(verdicts)
+            for index, ((exp_mood, verdict), want) in enumerate(
+                    zip(verdicts, expected)):
+                writer.append(number, index, verdict, exp_mood, sets, pattern, want)
+            count += 1
+        rows = writer.rows
+    return count, rows
+
+
+def summary(path: str, by="pattern", of="verdict", out=sys.stdout):
+    """
+    Print the distribution of a column of a result file grouped by another column
+    """
+    store = ResultStore(path)
+    distribution = store.distribution(by, of)
+    values = sorted({value for counts in distribution.values() for value in counts},
+                    key=str)
+    print("\t".join([by] + [str(value) for value in values] + ["total"]), file=out)
+    for key in sorted(distribution, key=str):
+        counts = distribution[key]
+        print("\t".join([str(key)] + [str(counts.get(value, 0)) for value in values]
+                        + [str(sum(counts.values()))]), file=out)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Grade the conclusions of many "
+                                                 "problems into a result file")
+    parser.add_argument("input", help="A JSON lines file of problems (see "
+                                      "workload.py), a bank (see premise_bank.py) "
+                                      "or a directory of .venn and "
+                                      ".conclusions files, or a result file with "
+                                      "--summary", type=str)
+    parser.add_argument("-o", "--output", help="The result file to write",
+                        type=str, default="results.vres")
+    parser.add_argument("--summary", help="Print the distribution of the verdicts "
+                                          "of a result file", action="store_true")
+    parser.add_argument("--by", help="The column the summary is grouped by "
+                                     "(default pattern)",
+                        type=str, default="pattern")
+    parser.add_argument("--of", help="The column counted in the summary "
+                                     "(default verdict)",
+                        type=str, default="verdict")
+    args = parser.parse_args(argv[1:])
+
+    if args.summary:
+        summary(args.input, args.by, args.of)
+        return 0
+    start = time.perf_counter()
+    count, rows = evaluate(read_problems(args.input), args.output,
+                           meta={"source": os.path.abspath(args.input)})
+    print("Graded {} conclusions of {} problems in {:.1f} s".format(
+        rows, count, time.perf_counter() - start), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,325 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from expression import Expression
+from expression_set import ExpressionSet
+from workload import MOODS
+
+# Registered benchmark cases: name -> (number of calls per repeat, setup function)
+# A setup function prepares the inputs and returns the function being timed, or a
+# context manager giving the function for inputs that are removed after the case
+CASES = dict()
+
+# Budgets (in seconds per call) of cases: a run fails if a case is slower
+BUDGETS = {"startup_no_window": 0.3, "startup_export": 3.0}
+
+# The order of terms (subject, predicate) of the major and the minor premise.
+# The minor term is A, the middle term is B and the major term is C (the usual
+# S, M, P cannot be used: Token strips the trailing "s" of "S's")
+FIGURES = {1: (("B", "C"), ("A", "B")), 2: (("C", "B"), ("A", "B")),
+           3: (("B", "C"), ("B", "A")), 4: (("C", "B"), ("B", "A"))}
+
+
+def case(name, number=1):
+    """
+    Register a benchmark case
+    :param name: the name of the case in the results
+    :param number: how many times the timed function is called in each repeat
+    """
+    def register(setup):
+        CASES[name] = (number, setup)
+        return setup
+    return register
+
+
+def syllogisms():
+    """
+    :return: a list of (premises, conclusion) of all 256 categorical syllogisms
+    """
+    ret = []
+    for major, minor, conclusion in itertools.product(MOODS, MOODS, MOODS):
+        for figure, (major_terms, minor_terms) in FIGURES.items():
+            premises = MOODS[major].format(*major_terms) + "\n" + \
+                       MOODS[minor].format(*minor_terms)
+            ret.append((premises, MOODS[conclusion].format("A", "C")))
+    return ret
+
+
+def chain_premises(size: int, count: int):
+    """
+    :param size: the number of sets
+    :param count: the number of premise lines
+    :return: a paragraph of consistent premises relating neighbouring sets
+    """
+    names = [chr(ord("A") + i) for i in range(size)]
+    pool = []
+    for lhs, rhs in zip(names, names[1:]):
+        pool.append(MOODS["A"].format(lhs, rhs))
+        pool.append(MOODS["I"].format(rhs, lhs))
+    return "\n".join(pool[i % len(pool)] for i in range(count))
+
+
+def distinct_premises(size: int, count: int):
+    """
+    throw a ValueError if there are not so many different premises
+    :param size: the number of sets
+    :param count: the number of premise lines, at most 3 * size * (size - 1) / 2
+                  + size - 1
+    :return: a paragraph of consistent premises, all different from each other.
+             The first premises put each set inside the next one, so all sets
+             appear from size - 1 premises on, every pair of sets shares an
+             area and only the later set of a pair can have members outside the
+             other
+    """
+    names = [chr(ord("A") + i) for i in range(size)]
+    pool = [MOODS["A"].format(lhs, rhs) for lhs, rhs in zip(names, names[1:])]
+    for i, j in itertools.combinations(range(size), 2):
+        pool.append(MOODS["I"].format(names[i], names[j]))
+        pool.append(MOODS["I"].format(names[j], names[i]))
+        pool.append(MOODS["O"].format(names[j], names[i]))
+    if count > len(pool):
+        raise ValueError("ERROR: There are only {} different premises of {} "
+                         "sets".format(len(pool), size))
+    return "\n".join(pool[:count])
+
+
+def compiled(premises: str):
+    """
+    :return: a parsed ExpressionSet of the premises
+    """
+    s = ExpressionSet()
+    s.add_premises(premises)
+    s.parse_premises()
+    return s
+
+
+# ===============================================================================
+#                                 Cases
+# ===============================================================================
+@case("parse_expression", number=2000)
+def bench_parse_expression():
+    expressions = [conclusion for _, conclusion in syllogisms()]
+    items = itertools.cycle(expressions)
+    return lambda: Expression.parse(next(items))
+
+
+@case("parse_premises", number=200)
+def bench_parse_premises():
+    pairs = itertools.cycle(syllogisms())
+    return lambda: compiled(next(pairs)[0])
+
+
+@case("evaluate_syllogisms", number=1)
+def bench_evaluate_syllogisms():
+    problems = [(compiled(premises), Expression(conclusion))
+                for premises, conclusion in syllogisms()]
+
+    def run():
+        for s, exp in problems:
+            s.evaluate(exp)
+    return run
+
+
+@case("evaluate_bank", number=5)
+def bench_evaluate_bank():
+    # Two groups of three connected sets: arguments within a group are evaluated on
+    # a diagram of three sets (see QueryPlanner)
+    s = compiled("All A's are B's\nSome B's are C's\n"
+                 "All D's are E's\nSome E's are not F's")
+    problems = [Expression(MOODS[mood].format(lhs, rhs)) for mood in MOODS
+                for lhs, rhs in itertools.permutations("ABCDEF", 2)]
+    return lambda: [s.judge(exp) for exp in problems]
+
+
+@case("evaluate_stack", number=5)
+def bench_evaluate_stack():
+    # One argument checked against the premises of every syllogism, on all of the
+    # diagrams at once (see DiagramStack)
+    from diagram_stack import DiagramStack
+    stack = DiagramStack([compiled(premises) for premises, _ in syllogisms()])
+    exp = Expression(MOODS["A"].format("A", "C"))
+    return lambda: stack.verdicts(exp)
+
+
+def bench_render(size, export=False):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    s = compiled(chain_premises(size, 2 * (size - 1)))
+    exp = Expression(MOODS["A"].format("A", chr(ord("A") + size - 1)))
+    s.display_diagram()  # Computes the layout of the diagram once
+    plt.close("all")
+
+    def run():
+        fig = plt.figure()
+        s.display_diagram()
+        s.evaluate(exp, show=True)
+        if export:
+            fig.savefig(io.BytesIO(), format="png")
+        else:
+            fig.canvas.draw()
+        plt.close(fig)
+    return run
+
+
+case("create_diagram", number=10)(lambda: bench_render(3))
+case("savefig_png", number=10)(lambda: bench_render(3, export=True))
+
+# Scaling sweeps
+for count in (5, 10, 25, 50):
+    case("sweep_premises_{}".format(count), number=max(1, 500 // count))(
+        lambda count=count: lambda: compiled(distinct_premises(6, count)))
+for size in range(2, 7):
+    def bench_sets(size=size):
+        premises = chain_premises(size, 2 * (size - 1))
+        exp = Expression(MOODS["I"].format("A", chr(ord("A") + size - 1)))
+        return lambda: compiled(premises).evaluate(exp)
+    case("sweep_sets_{}_evaluate".format(size), number=50)(bench_sets)
+    case("sweep_sets_{}_render".format(size), number=3)(
+        lambda size=size: bench_render(size))
+
+
+@contextlib.contextmanager
+def bench_startup(*args):
+    """ Run venn_gui.py in a new interpreter, as shell scripts do """
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "premises.venn")
+        with open(filename, "w", encoding="utf8") as f:
+            f.write(chain_premises(3, 4))
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "venn_gui.py")
+        command = [sys.executable, script, "-f", filename, "--no_window"] + \
+            [arg.format(directory) for arg in args]
+        yield lambda: subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+
+
+case("startup_no_window", number=5)(
+    lambda: bench_startup("-e", MOODS["I"].format("A", "C")))
+case("startup_export", number=2)(
+    lambda: bench_startup("-e", MOODS["I"].format("A", "C"),
+                          "--export", os.path.join("{}", "diagram.png")))
+
+
+# ===============================================================================
+#                               Running
+# ===============================================================================
+def measure(name, repeat=5):
+    """
+    :return: timing statistics of a case, in seconds per call
+    """
+    number, setup = CASES[name]
+    context = setup()
+    if not isinstance(context, contextlib.AbstractContextManager):
+        context = contextlib.nullcontext(context)
+    with context as func:
+        func()  # Warm up
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            times.append((time.perf_counter() - start) / number)
+    return {"median": statistics.median(times), "min": min(times),
+            "max": max(times), "number": number, "repeat": repeat}
+
+
+def run(names, repeat=5, out=sys.stdout):
+    """
+    :return: a dict of metadata and results of the cases
+    """
+    results = dict()
+    for name in names:
+        results[name] = measure(name, repeat)
+        print("{:32s} {:12.3f} ms".format(name, results[name]["median"] * 1000),
+              file=out)
+    return {"meta": {"python": platform.python_version(),
+                     "platform": platform.platform(),
+                     "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+            "results": results}
+
+
+def compare(current, baseline, threshold=0.25):
+    """
+    :param current: results of run
+    :param baseline: results of an earlier run
+    :param threshold: the relative slowdown regarded as a regression
+    :return: a list of (name, baseline seconds, current seconds, ratio) of the
+             cases slower than the baseline by more than threshold
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["median"]
+        ratio = result["median"] / before if before > 0 else float("inf")
+        if ratio > 1 + threshold:
+            regressions.append((name, before, result["median"], ratio))
+    return regressions
+
+
+def over_budget(current, budgets=BUDGETS):
+    """
+    :param current: results of run
+    :param budgets: a dict of case names -> the largest seconds per call allowed
+    :return: a list of (name, budget seconds, current seconds) of the cases slower
+             than their budgets
+    """
+    return [(name, budgets[name], result["median"])
+            for name, result in current["results"].items()
+            if name in budgets and result["median"] > budgets[name]]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks of parsing, "
+                                                 "evaluation and rendering")
+    parser.add_argument("-k", "--filter", help="Only run cases whose name "
+                                               "contains this string", type=str)
+    parser.add_argument("-r", "--repeat", help="Number of repeats of each case",
+                        type=int, default=5)
+    parser.add_argument("-o", "--output", help="Write the results to a json file",
+                        type=str)
+    parser.add_argument("--compare", help="Compare the results with a json file "
+                                          "of an earlier run", type=str)
+    parser.add_argument("--threshold", help="The relative slowdown regarded as a "
+                                            "regression (default 0.25)",
+                        type=float, default=0.25)
+    parser.add_argument("--list", help="List the cases", action="store_true")
+    args = parser.parse_args(argv[1:])
+
+    names = [name for name in CASES if not args.filter or args.filter in name]
+    if args.list:
+        print("\n".join(names))
+        return 0
+    results = run(names, args.repeat)
+    status = 0
+    for name, budget, seconds in over_budget(results):
+        print("OVER BUDGET {}: {:.3f} ms > {:.3f} ms".format(
+            name, seconds * 1000, budget * 1000), file=sys.stderr)
+        status = 1
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after, ratio in regressions:
+            print("REGRESSION {}: {:.3f} ms -> {:.3f} ms ({:+.0%})".format(
+                name, before * 1000, after * 1000, ratio - 1), file=sys.stderr)
+        if regressions:
+            return 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
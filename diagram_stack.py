@@ -0,0 +1,112 @@
+import numpy as np
+
+from expression import Expression
+from expression_set import MAX_SETS, Verdict
+
+REGIONS = 1 << MAX_SETS  # Region masks of every diagram fit in this many columns
+
+
+class DiagramStack(object):
+    def __init__(self, expression_sets):
+        """
+        Evaluates one argument on many diagrams at once.
+
+        The black areas and the "Some" premises of the diagrams are stacked into
+        boolean arrays with a row for each diagram and a column for each region
+        mask, where bit n - 1 - i of a mask is set for the region inside the i-th
+        set (in sorted order) of a diagram of n sets, as in the ids of
+        ExpressionSet.all_label. The sets of an argument are found in every
+        diagram by their names, so the verdicts of all diagrams take a few array
+        operations instead of a parse and is_area_definite for each diagram.
+        :param expression_sets: a list of parsed ExpressionSets
+        """
+        self.count = len(expression_sets)
+        self.names = dict()  # name of a set -> its number in the table
+        # The number of each set of a diagram in names, -1 for no set
+        self.table = np.full((self.count, MAX_SETS), -1, dtype=np.int32)
+        self.sizes = np.zeros(self.count, dtype=np.int64)  # The number of sets
+        self.black = np.zeros((self.count, REGIONS), dtype=bool)
+        crosses, owners = [], []
+        for k, s in enumerate(expression_sets):
+            members = sorted(s.members)
+            self.sizes[k] = len(members)
+            for i, name in enumerate(members):
+                self.table[k, i] = self.names.setdefault(name, len(self.names))
+            self.black[k, [int(s.all_label[area_label], 2)
+                           for area_label in s.black]] = True
+            for area_labels in s.cross:
+                crosses.append([int(s.all_label[area_label], 2)
+                                for area_label in area_labels])
+                owners.append(k)
+        masks = np.arange(REGIONS)
+        # The regions each diagram has: every mask but 0 that fits its sets
+        self.exists = (masks != 0) & (masks[None, :] >> self.sizes[:, None] == 0)
+        # A row for the areas of each "Some" premise, and the diagram it belongs to
+        self.cross = np.zeros((len(crosses), REGIONS), dtype=bool)
+        for row, columns in enumerate(crosses):
+            self.cross[row, columns] = True
+        self.owner = np.array(owners, dtype=np.int64)
+        # The areas of each "Some" premise that are not black
+        self.cross_left = self.cross & ~self.black[self.owner]
+
+    def __len__(self):
+        return self.count
+
+    def inside(self, name: str):
+        """
+        :param name: the name of a set
+        :return: a (diagrams, regions) boolean array of the regions inside the set,
+                 a boolean array of the diagrams that have the set
+        """
+        match = self.table == self.names.get(name, -2)
+        known = match.any(axis=1)
+        bits = np.where(known, self.sizes - 1 - match.argmax(axis=1), 0)
+        regions = (np.arange(REGIONS)[None, :] >> bits[:, None] & 1).astype(bool)
+        return regions & known[:, None] & self.exists, known
+
+    def is_area_definite(self, target, circle=None):
+        """
+        The same as ExpressionSet.is_area_definite for every diagram
+        :param target: a (diagrams, regions) boolean array of the areas checked
+        :param circle: the areas of the subject of an "All" argument, or None
+        :return: a boolean array of the diagrams whose target is sure to be TRUE
+        """
+        # A "Some" premise whose areas left are all in the target
+        covered = ~(self.cross_left & ~target[self.owner]).any(axis=1)
+        ret = np.bincount(self.owner[covered], minlength=self.count) > 0
+        if circle is not None:
+            ret |= ~(circle & ~self.black & ~target).any(axis=1)
+        return ret
+
+    def verdicts(self, exp: Expression):
+        """
+        This function works out the verdict of an argument on every diagram
+        :param exp: the expression being validated
+        :return: an array of the Verdict codes, one for each diagram
+        """
+        lhs, lhs_known = self.inside(exp.lhs.name)
+        rhs, rhs_known = self.inside(exp.rhs.name)
+        # See ExpressionSet.parse
+        support = lhs & (rhs != exp.rhs.neg)
+        valid_support = support & ~self.black
+        ret = np.empty(self.count, dtype=np.uint8)
+        if exp.lhs.some:
+            ret[:] = Verdict.MAYBE_TRUE
+            ret[self.is_area_definite(valid_support)] = Verdict.TRUE
+            ret[~valid_support.any(axis=1)] = Verdict.NO_TRUE
+        else:
+            valid_against = lhs & (rhs == exp.rhs.neg) & ~self.black
+            ret[:] = Verdict.MAYBE_TRUE
+            ret[self.is_area_definite(valid_against, lhs)] = Verdict.FALSE
+            ret[~valid_against.any(axis=1)] = Verdict.TRUE
+        ret[~(lhs_known & rhs_known)] = Verdict.UNKNOWN
+        return ret
+
+
+def evaluate_many(expression_sets, exp: Expression):
+    """
+    :param expression_sets: a list of parsed ExpressionSets
+    :param exp: the expression being validated
+    :return: a list of the Verdict of the argument on each diagram
+    """
+    return [Verdict(code) for code in DiagramStack(expression_sets).verdicts(exp)]
@@ -1,5 +1,10 @@
+import enum
+import itertools
+
 from expression import Expression, Token
 
+MAX_SETS = 6  # The largest number of sets a diagram can have
+
 results = {
     "TRUE": {"validity": True, "must": True, "color": "green", "pattern": "///",
              "reason": "This is a TRUE statement. The green shadow in the "
@@ -18,6 +23,9 @@ results = {
     "FALSE": {"validity": False, "must": True, "color": "red", "pattern": "xxx",
               "reason": "This is a FALSE statement. The red shadow in the "
                         "diagram shows all areas that refutes the statement."},
+    # No argument is judged MAYBE FALSE any more: an "All" argument that is neither
+    # TRUE nor FALSE is MAYBE TRUE. It stays so that the Verdict codes, which are
+    # stored in result files, keep their values
     "MAYBE FALSE": {"validity": False, "must": False,
                     "color": "red", "pattern": "+",
                     "reason": "This statement may be FALSE but not necessarily "
@@ -27,9 +35,183 @@ results = {
 }
 
 
+class Verdict(enum.IntEnum):
+    """
+    The verdict of an argument as a small integer code. The codes of the verdicts
+    in results follow their order in results
+    """
+    TRUE = 0
+    MAYBE_TRUE = 1
+    NO_TRUE = 2
+    FALSE = 3
+    MAYBE_FALSE = 4
+    UNKNOWN = 5  # The argument uses set names that are not in the diagram
+
+    @property
+    def key(self):
+        """
+        :return: the key of the verdict in results, or None for UNKNOWN
+        """
+        return None if self is Verdict.UNKNOWN else self.name.replace("_", " ")
+
+    @staticmethod
+    def from_key(key):
+        """
+        :param key: a key of results, or None for an argument with unknown set names
+        :return: the Verdict
+        """
+        return VERDICT_OF_KEY[key]
+
+
+VERDICT_OF_KEY = {v.key: v for v in Verdict}  # Key in results (or None) -> Verdict
+# Verdict -> (<if the expression could be TRUE>, <if the expression must be TRUE>)
+VALIDITY = tuple((results[v.key]["validity"], results[v.key]["must"])
+                 if v.key is not None else (False, True) for v in Verdict)
+
+
+class EvaluationResult(object):
+    """
+    The result of ExpressionSet.evaluate. Only the verdict is worked out when it is
+    created; the reason and the premises behind it are derived when they are used.
+    It can still be used as the tuple (<if the expression could be TRUE>,
+    <if the expression must be TRUE>, reason) that evaluate used to return.
+    """
+    __slots__ = ("expression_set", "exp", "verdict", "marked")
+    FIELDS = ("validity", "must", "reason")  # The items of the tuple
+
+    def __init__(self, expression_set, exp, verdict, marked):
+        """
+        :param expression_set: the ExpressionSet the argument was evaluated on
+        :param exp: the expression being validated
+        :param verdict: a Verdict
+        :param marked: a set of area labels supporting/refuting the argument
+        """
+        self.expression_set = expression_set
+        self.exp = exp
+        self.verdict = verdict
+        self.marked = marked
+
+    @property
+    def validity(self):
+        """
+        :return: if the expression could be TRUE
+        """
+        return VALIDITY[self.verdict][0]
+
+    @property
+    def must(self):
+        """
+        :return: if the expression must be TRUE
+        """
+        return VALIDITY[self.verdict][1]
+
+    @property
+    def reason(self):
+        """
+        :return: the verdict stated by a string
+        """
+        if self.verdict is Verdict.UNKNOWN:
+            unknown = {self.exp.lhs.name, self.exp.rhs.name} - \
+                      self.expression_set.members
+            return "Set name(s) not found: " + str(unknown).strip("{").strip("}")
+        return results[self.verdict.key]["reason"]
+
+    @property
+    def mask(self):
+        """
+        :return: the marked areas as a bit mask, with bit i set for the area whose
+                 id is i in binary
+        """
+        ret = 0
+        for area_label in self.marked:
+            ret |= 1 << int(self.expression_set.all_label[area_label], 2)
+        return ret
+
+    def premises(self):
+        """
+        :return: a list of "All" premises that make marked areas black, a list of
+                 "Some" premises that put a X on marked areas, in the order the
+                 premises were added
+        """
+        blacks, crosses = set(), set()
+        for area_label in self.marked:
+            area_blacks, area_crosses = self.expression_set.area_premises(area_label)
+            blacks.update(area_blacks)
+            crosses.update(area_crosses)
+        order = list(self.expression_set.relations)
+        return sorted(blacks, key=order.index), sorted(crosses, key=order.index)
+
+    def __iter__(self):
+        return iter((self.validity, self.must, self.reason))
+
+    def __len__(self):
+        return 3
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self)[index]
+        return getattr(self, EvaluationResult.FIELDS[index])
+
+    def __eq__(self, other):
+        if isinstance(other, EvaluationResult):
+            return tuple(self) == tuple(other) and self.marked == other.marked
+        return tuple(self) == other
+
+    def __hash__(self):
+        # Equal to the tuple it stands for, so it hashes as that tuple
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return "<EvaluationResult {} {}>".format(self.verdict.name, str(self.exp))
+
+    def witness(self, holds=False):
+        """
+        :param holds: find a world where the argument is true instead of false
+        :return: the Witness of ExpressionSet.witness
+        """
+        return self.expression_set.witness(self.exp, holds)
+
+
+class Witness(object):
+    """
+    A world consistent with the premises: every area is either inhabited or empty
+    """
+    __slots__ = ("exp", "holds", "inhabited", "empty")
+
+    def __init__(self, exp, holds, inhabited, empty):
+        """
+        :param exp: the argument the world was built for
+        :param holds: if the argument is true in this world
+        :param inhabited: a set of labels of the areas that have members
+        :param empty: a set of labels of the areas without members
+        """
+        self.exp = exp
+        self.holds = holds
+        self.inhabited = inhabited
+        self.empty = empty
+
+    def __str__(self):
+        return "{} is {} when only {} {} members".format(
+            self.exp, "TRUE" if self.holds else "FALSE",
+            ", ".join(sorted(self.inhabited, key=lambda a: (len(a), a))) or "no area",
+            "has" if len(self.inhabited) == 1 else "have")
+
+
+def normalize_premises(premises: str):
+    """
+    :param premises: a paragraph of premises separated by newline characters
+    :return: the premises without blank lines and surrounding spaces, so that
+             paragraphs with the same premises are equal
+    """
+    lines = [line.strip() for line in premises.split("\n")]
+    return "\n".join(line for line in lines if line != "")
+
+
 class ExpressionSet(object):
     def __init__(self):
-        self.relations = set()  # A set of Expression objects
+        # A dict of Expression objects -> None, used as a set that keeps the order in
+        # which the premises were added
+        self.relations = dict()
         self.members = set()  # A set of strings representing members (A,B,C...)
         # all_label is a dict of all labels in the diagram -> the patch id
         # {A,B,AB... -> "100", "010", "110"...}
@@ -43,9 +225,21 @@ class ExpressionSet(object):
         # by "All" arguments. None of the area in this set can be TRUE
         # {A -> All A's are B's,  AC -> All A's are B's... }
         self.black = dict()
-        # The venn diagram plot
-        import venn_diagram
-        self.venn_diagram = venn_diagram.VennDiagramPlt(self)
+        # The QueryPlanner of the parsed diagram
+        self.planner = None
+        # The venn diagram plot, created when it is first used so that evaluating
+        # without a diagram does not import matplotlib
+        self._venn_diagram = None
+
+    @property
+    def venn_diagram(self):
+        """
+        :return: the VennDiagramPlt drawing this diagram
+        """
+        if self._venn_diagram is None:
+            import venn_diagram
+            self._venn_diagram = venn_diagram.VennDiagramPlt(self)
+        return self._venn_diagram
 
     def __contains__(self, key):
         """
@@ -89,36 +283,77 @@ class ExpressionSet(object):
         Add a expression (relation between sets) or a set to the diagram
         throw a SyntaxError if the expression is Syntax Incorrect
         throw a TypeError if the item being added has an incompatible type
-        throw a ValueError if the diagram would contain more than three sets
+        throw a ValueError if the diagram would contain more than MAX_SETS sets
         :param exp: (str): the name of a set
                     (Expression): a relation between sets
         """
         if isinstance(exp, Expression):
-            self.relations.add(exp)
+            self.relations[exp] = None
             self.members.add(exp.lhs.name)
             self.members.add(exp.rhs.name)
         elif isinstance(exp, str):
             self.members.add(Token(exp).name)
         else:
             raise TypeError("ERROR: Unknown type inserted.")
-        if len(self.members) > 3:
-            raise ValueError("ERROR: Only two or three sets can be supported but "
-                             "the program got " + str(self.members))
+        if len(self.members) > MAX_SETS:
+            raise ValueError("ERROR: Only two to {} sets can be supported but the "
+                             "program got {}".format(MAX_SETS, self.members))
+
+    def extend(self, other):
+        """
+        Add the sets and the relations of another diagram
+        throw a ValueError if the diagram would contain more than MAX_SETS sets
+        :param other: an ExpressionSet
+        """
+        for exp in other.relations:
+            self.relations[exp] = None
+        self.members.update(other.members)
+        if len(self.members) > MAX_SETS:
+            raise ValueError("ERROR: Only two to {} sets can be supported but the "
+                             "program got {}".format(MAX_SETS, self.members))
 
-    def add_premises(self, premises: str):
+    def copy(self):
+        """
+        :return: a copy of the diagram with its own query planner and plot, so that
+                 it can be evaluated on one thread while this one is drawn on
+                 another. The premises of each area are shared, they do not change
+                 once the premises are parsed
+        """
+        ret = ExpressionSet()
+        ret.relations = dict(self.relations)
+        ret.members = set(self.members)
+        ret.all_label = dict(self.all_label)
+        ret.cross = dict(self.cross)
+        ret.black = dict(self.black)
+        return ret
+
+    def add_premises(self, premises: str, directory=None, libraries=None):
         """
         Parse a paragraph of premises and add expressions (relation between sets) or
-        set names to the diagram
+        set names to the diagram. A line "@include <path>" adds the premises of
+        another file, which is compiled once (see premise_library)
         throw a SyntaxError if the expression is Syntax Incorrect
         throw a TypeError if the item being added has an incompatible type
-        throw a ValueError if the diagram would contain more than three sets
+        throw a ValueError if the diagram would contain more than MAX_SETS sets
         :param premises: (str):  a paragraph contains set names or relations between
                                  sets, separated by newline character
+        :param directory: the directory included paths are relative to (the current
+                          directory if None)
+        :param libraries: the LibraryCache compiling included files
+                          (premise_library.LIBRARIES if None)
         """
         for line in premises.split("\n"):
             line = line.strip()
             if line == "": continue
-            if "are" in line or "is" in line:
+            if line.startswith("@"):
+                import premise_library
+                if not premise_library.is_include(line):
+                    raise SyntaxError("Unknown directive \"{}\"".format(line))
+                if libraries is None:
+                    libraries = premise_library.LIBRARIES
+                self.extend(libraries.load(
+                    premise_library.include_path(line, directory)).expression_set)
+            elif "are" in line or "is" in line:
                 self.append(Expression(line))  # self.collection
             else:
                 self.append(line)  # Expression
@@ -175,22 +410,21 @@ class ExpressionSet(object):
         "Not" statements
         """
         # Create venn diagram
+        # Each area is labeled by the names of the sets it belongs to, and its id
+        # has a 1 for each of these sets. e.g. for three sets:
+        # {A: '100' (up-left), B: '010' (up-right), C: '001' (down),
+        #  AB: '110', AC: '101', BC: '011', ABC: '111'}
         labels = tuple(sorted(self.members))
-        if len(labels) == 2:
-            self.all_label = {labels[0]: "10",  # A (left)
-                              labels[1]: "01",  # B (right)
-                             labels[0] + labels[1]: "11"}  # A ∩ B
-        elif len(labels) == 3:
-            self.all_label = {labels[0]: '100',  # A (up-left)
-                              labels[1]: '010',  # B (up-right)
-                              labels[2]: '001',  # C (down)
-                             labels[0] + labels[1]: '110',  # A ∩ B
-                             labels[0] + labels[2]: '101',  # A ∩ C
-                             labels[1] + labels[2]: '011',  # B ∩ C
-                             labels[0] + labels[1] + labels[2]: '111'}  # A ∩ B ∩ C
-        else:
-            raise ValueError("ERROR: Currently only at two or three items can be "
-                             "supported but got " + str(labels))
+        if not 2 <= len(labels) <= MAX_SETS:
+            raise ValueError("ERROR: Currently only two to {} items can be "
+                             "supported but got {}".format(MAX_SETS, labels))
+        self.all_label = dict()
+        for count in range(1, len(labels) + 1):
+            for combine in itertools.combinations(range(len(labels)), count):
+                self.all_label["".join(labels[i] for i in combine)] = \
+                    "".join("1" if i in combine else "0" for i in range(len(labels)))
+
+        self.planner = None
 
         # Parse relations
         for exp in self.relations:
@@ -213,13 +447,34 @@ class ExpressionSet(object):
                     self.black[area_label].append(exp)
 
         # Check for conflicts
+        for some_exps, black_intersection_exps in self.conflicts():
+            raise ValueError("Error: conflicts happens between " + str([str(x) for x in some_exps]) + " and " + str([str(x) for x in black_intersection_exps]))
+
+    def conflicts(self):
+        """
+        This function finds every "Some" premise whose areas are all disabled
+        :return: an iterator of (the "Some" premises marking a X on the same areas,
+                 the set of the "All" premises disabling these areas)
+        """
         for label_pair in self.cross:
             if len(list(filter(lambda x: x not in self.black, label_pair))) == 0:
                 black_intersection_exps = set()
                 for label in label_pair:
                     if label in self.black:
                         black_intersection_exps = black_intersection_exps.union(set(self.black[label]))
-                raise ValueError("Error: conflicts happens between " + str([str(x) for x in self.cross[label_pair]]) + " and " + str([str(x) for x in black_intersection_exps]))
+                yield self.cross[label_pair], black_intersection_exps
+
+    def area_premises(self, area_label: str):
+        """
+        :param area_label: the label of an area (A, AB...)
+        :return: a list of "All" premises that make the area black, a list of "Some"
+                 premises that put a X on the area
+        """
+        crosses = []
+        for label_pair, exps in self.cross.items():
+            if area_label in label_pair:
+                crosses.extend(exps)
+        return list(self.black.get(area_label, [])), crosses
 
     def is_area_definite(self, target: set, lhs: Token):
         """
@@ -244,20 +499,31 @@ class ExpressionSet(object):
                 return True
         return False
 
-    def evaluate(self, exp: Expression, show=False, show_exp=True):
+    def judge(self, exp: Expression):
         """
-        This function evaluates the validity of an argument
+        This function works out the verdict of an argument without drawing anything.
+        The argument is evaluated on the sets connected to it only (see QueryPlanner)
         :param exp: the expression being validated
-        :param show: if the result should be displayed on the diagram
-        :param show_exp: if the argument should be displayed on the diagram
-                         Only when show==True will this be effective
-        :return: <if the expression could be TRUE>, <if the expression must be TRUE>,
-                reason stated by a string
+        :return: the key of the verdict in results (None if the expression uses
+                 unknown set names), a set of area labels that should be marked on
+                 the diagram
+        """
+        if self.planner is None:
+            from query_planner import QueryPlanner
+            self.planner = QueryPlanner(self)
+        return self.planner.judge(exp)
+
+    def judge_diagram(self, exp: Expression):
+        """
+        This function works out the verdict of an argument on the whole diagram
+        :param exp: the expression being validated
+        :return: the key of the verdict in results (None if the expression uses
+                 unknown set names), a set of area labels that should be marked on
+                 the diagram
         """
         # Unknown set names
         if exp.lhs.name not in self.members or exp.rhs.name not in self.members:
-            unknown = {exp.lhs.name, exp.rhs.name} - self.members
-            return False, True, "Set name(s) not found: "+str(unknown).strip("{").strip("}")
+            return None, set()
 
         # Get area code results for the expression being validated
         support, against = self.parse(exp)
@@ -276,33 +542,83 @@ class ExpressionSet(object):
             else:
                 result = "MAYBE TRUE"
         else:
-            # Definitely false -> at least one of against is not black
-            # Possibly false -> again covers part of an X / support are all unknown
-            # Definitely true -> has valid support area
-            if self.is_area_definite(valid_support_area, exp.lhs):
+            # Definitely true -> against are all black (an X in the support does not
+            # make the against areas empty)
+            # Definitely false -> against covers an X, or the whole lhs circle left
+            # Possibly true -> otherwise
+            if len(valid_against_area) == 0:
                 result = "TRUE"
             elif self.is_area_definite(valid_against_area, exp.lhs):
                 result = "FALSE"
-            elif not self.is_area_definite(valid_support_area, exp.lhs):
-                result = "MAYBE TRUE"
             else:
-                result = "MAYBE FALSE"
+                result = "MAYBE TRUE"
 
-        if show:
-            if result == "NO TRUE":
-                marked = set(support)
-            elif result == "TRUE" or result == "MAYBE TRUE":
-                marked = set(valid_support_area)
-            else:
-                marked = against
-            self.venn_diagram.mark_area(marked,
-                                        color=results[result]["color"],
-                                        pattern=results[result]["pattern"])
-            self.venn_diagram.show_validatity(results[result]["validity"] and results[result]["must"])
-            if show_exp:
-                self.venn_diagram.show_argument(exp)
-
-        return results[result]["validity"], results[result]["must"], results[result]["reason"]
-
-    def display_diagram(self, highlight_some=True):
-        self.venn_diagram.create_diagram(highlight_some)
\ No newline at end of file
+        if result == "NO TRUE":
+            marked = set(support)
+        elif result == "TRUE" or result == "MAYBE TRUE":
+            marked = set(valid_support_area)
+        else:
+            marked = against
+        return result, marked
+
+    def evaluate(self, exp: Expression, show=False, show_exp=True):
+        """
+        This function evaluates the validity of an argument
+        :param exp: the expression being validated
+        :param show: if the result should be displayed on the diagram
+        :param show_exp: if the argument should be displayed on the diagram
+                         Only when show==True will this be effective
+        :return: an EvaluationResult, which unpacks to <if the expression could be
+                 TRUE>, <if the expression must be TRUE>, reason stated by a string
+        """
+        result, marked = self.judge(exp)
+        if show and result is not None:
+            self.venn_diagram.show_result(result, marked, exp if show_exp else None)
+        return EvaluationResult(self, exp, Verdict.from_key(result), marked)
+
+    def witness(self, exp: Expression, holds=False):
+        """
+        This function builds a world where the argument is false (a counterexample)
+        or true. The world is read off the diagram: an area is inhabited only if a
+        "Some" premise or the argument needs it, so no search is needed
+        :param exp: the expression being validated
+        :param holds: find a world where the argument is true instead of false
+        :return: a Witness, or None if the premises leave no such world (or the
+                 argument uses unknown set names)
+        """
+        if exp.lhs.name not in self.members or exp.rhs.name not in self.members:
+            return None
+        support, against = self.parse(exp)
+        # The areas of which one must have members, the areas that must be empty
+        if exp.lhs.some:
+            # Some A is B is true when an area of A and B has members
+            required, excluded = (set(support), set()) if holds else \
+                (set(), set(support))
+        else:
+            # All A is B is false when an area of A outside B has members
+            required, excluded = (set(), against) if holds else (against, set())
+        # Areas with an X of more "Some" premises are chosen first, so that few
+        # areas are inhabited
+        crosses = dict.fromkeys(self.all_label, 0)
+        for area_labels in self.cross:
+            for area_label in area_labels:
+                crosses[area_label] += 1
+        inhabited = set()
+        if required:
+            allowed = [label for label in self.all_label
+                       if label in required and label not in self.black]
+            if len(allowed) == 0:
+                return None
+            inhabited.add(max(allowed, key=crosses.get))
+        for area_labels in self.cross:
+            if inhabited.intersection(area_labels):
+                continue
+            allowed = [label for label in area_labels
+                       if label not in self.black and label not in excluded]
+            if len(allowed) == 0:
+                return None
+            inhabited.add(max(allowed, key=crosses.get))
+        return Witness(exp, holds, inhabited, set(self.all_label) - inhabited)
+
+    def display_diagram(self, highlight_some=True, euler=False):
+        self.venn_diagram.create_diagram(highlight_some, euler)
\ No newline at end of file
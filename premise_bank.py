@@ -0,0 +1,277 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+
+MAGIC = b"VENNIDX\x02"
+STAMP = struct.Struct("<QQ")  # Size and mtime_ns of the bank the index was written for
+ENTRY = struct.Struct("<QIH")  # Offset, length and id length of a problem in a bank
+INDEX_SUFFIX = ".idx"
+
+
+def index_path(path: str):
+    """
+    :return: the path of the index of a bank
+    """
+    return path + INDEX_SUFFIX
+
+
+def stamp(path: str):
+    """
+    :return: the size and modification time (in ns) of a bank
+    """
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def encode(problem):
+    """
+    :param problem: a dict with id, premises and, optionally, conclusions, expected
+                    (see workload.py) and the directory included files are relative to
+    :return: the line of the problem in a bank
+    """
+    import premise_library
+    if not isinstance(problem.get("id"), str) or problem["id"] == "":
+        raise ValueError("ERROR: A problem needs an id")
+    record = {"id": problem["id"], "premises": list(problem["premises"]),
+              "conclusions": list(problem.get("conclusions", []))}
+    if problem.get("expected") is not None:
+        record["expected"] = list(problem["expected"])
+    # Included paths stay relative to the directory of the problem, not of the bank
+    if any(premise_library.is_include(line.strip()) for line in record["premises"]):
+        record["directory"] = os.path.abspath(problem.get("directory") or os.getcwd())
+    return json.dumps(record, ensure_ascii=False).encode("utf8") + b"\n"
+
+
+def read_index(path: str):
+    """
+    :param path: the path of an index file
+    :return: the stamp of the bank the index was written for (see stamp), a list of
+             (id, offset, length) of the problems, in the order of the bank
+    """
+    entries = []
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise ValueError("ERROR: {} is not a bank index".format(path))
+    position = len(MAGIC) + STAMP.size
+    written_for = STAMP.unpack_from(data, len(MAGIC))
+    while position < len(data):
+        offset, length, id_length = ENTRY.unpack_from(data, position)
+        position += ENTRY.size
+        problem_id = data[position:position + id_length].decode("utf8")
+        position += id_length
+        entries.append((problem_id, offset, length))
+    return written_for, entries
+
+
+def write_stamp(path: str):
+    """ Record the current size and modification time of a bank in its index """
+    with open(index_path(path), "r+b") as f:
+        f.seek(len(MAGIC))
+        f.write(STAMP.pack(*stamp(path)))
+
+
+def write_entries(f, entries):
+    """ Write (id, offset, length) entries to an open index file """
+    for problem_id, offset, length in entries:
+        encoded = problem_id.encode("utf8")
+        f.write(ENTRY.pack(offset, length, len(encoded)) + encoded)
+
+
+def scan(path: str):
+    """
+    This function reads a whole bank to work out its index
+    :return: a list of (id, offset, length) of the problems
+    """
+    entries, offset = [], 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip() != b"":
+                entries.append((json.loads(line)["id"], offset, len(line)))
+            offset += len(line)
+    return entries
+
+
+def build_index(path: str):
+    """
+    This function writes the index of a bank from the bank itself
+    :return: the entries of the index
+    """
+    written_for = stamp(path)
+    entries = scan(path)
+    with open(index_path(path), "wb") as f:
+        f.write(MAGIC + STAMP.pack(*written_for))
+        write_entries(f, entries)
+    return entries
+
+
+def append(path: str, problems):
+    """
+    Add problems to the end of a bank (a new bank if it does not exist) and to its
+    index, without reading the problems already there
+    throw a ValueError if an id is already in the bank
+    :param path: the path of the bank
+    :param problems: an iterable of problems
+    :return: the number of problems added
+    """
+    if os.path.exists(path):
+        # Reading the entries also repairs the index
+        ids = {problem_id for problem_id, _, _ in PremiseBank.entries(path)}
+        modes = "a+b", "r+b"
+    else:
+        ids, modes = set(), ("wb", "wb")
+    count = 0
+    with open(path, modes[0]) as bank, open(index_path(path), modes[1]) as index:
+        if modes[1] == "wb":
+            index.write(MAGIC + STAMP.pack(0, 0))
+        index.seek(0, os.SEEK_END)
+        # A last line written by another program may have no line break
+        bank.seek(0, os.SEEK_END)
+        if bank.tell() > 0:
+            bank.seek(-1, os.SEEK_END)
+            if bank.read(1) != b"\n":
+                bank.write(b"\n")
+        for problem in problems:
+            line = encode(problem)
+            if problem["id"] in ids:
+                raise ValueError("ERROR: Problem {} is already in {}".format(
+                    problem["id"], path))
+            ids.add(problem["id"])
+            offset = bank.tell()
+            bank.write(line)
+            write_entries(index, [(problem["id"], offset, len(line))])
+            count += 1
+    # The index is only up to date once every problem is written
+    write_stamp(path)
+    return count
+
+
+class PremiseBank(object):
+    def __init__(self, path: str):
+        """
+        A file of many problems, one JSON line each (the format read by
+        batch_eval.read_problems), with an index of the byte offset of every
+        problem in <path>.idx. The bank is memory-mapped, so reading a problem by
+        its id only reads its own line.
+        :param path: the path of the bank
+        """
+        self.path = path
+        self.index = dict()  # id -> (offset, length)
+        self.ids = []  # ids in the order of the bank
+        for problem_id, offset, length in PremiseBank.entries(path):
+            self.index[problem_id] = (offset, length)
+            self.ids.append(problem_id)
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if size > 0 else b""
+
+    @staticmethod
+    def entries(path: str):
+        """
+        :return: the entries of the index of a bank. The index is built again if it
+                 is missing or was not written for the size and modification time
+                 the bank has now, e.g. after the bank was changed by another
+                 program
+        """
+        try:
+            written_for, entries = read_index(index_path(path))
+        except (OSError, ValueError, struct.error):
+            written_for, entries = None, None
+        if entries is None or written_for != stamp(path):
+            entries = build_index(path)
+        return entries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, problem_id):
+        return problem_id in self.index
+
+    def record(self, problem_id):
+        """
+        :return: the problem with an id as it is stored in the bank (see encode)
+        """
+        offset, length = self.index[problem_id]
+        return json.loads(self.map[offset:offset + length])
+
+    def __getitem__(self, problem_id):
+        """
+        :return: the problem with an id (a dict of id, premises, conclusions, the
+                 directory included files are relative to and, if known, expected)
+        """
+        problem = self.record(problem_id)
+        problem.setdefault("directory", os.path.dirname(os.path.abspath(self.path)))
+        return problem
+
+    def __iter__(self):
+        """
+        :return: an iterator of the problems in the order of the bank
+        """
+        for problem_id in self.ids:
+            yield self[problem_id]
+
+
+def is_bank(path: str):
+    """
+    :return: True if a file is a bank with an index
+    """
+    return os.path.isfile(path) and os.path.exists(index_path(path))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Build and read banks of problems")
+    parser.add_argument("command", help="build: write a new bank of the inputs, "
+                                        "append: add the inputs to a bank, "
+                                        "get: print problems by their ids, "
+                                        "list: print the ids of the problems",
+                        choices=["build", "append", "get", "list"])
+    parser.add_argument("bank", help="The bank file", type=str)
+    parser.add_argument("items", help="JSON lines files or directories of .venn "
+                                      "files (build, append) or ids (get)",
+                        nargs="*")
+    args = parser.parse_args(argv[1:])
+
+    if args.command in ("build", "append"):
+        from batch_eval import read_problems
+        if args.command == "build":
+            for path in (args.bank, index_path(args.bank)):
+                if os.path.exists(path):
+                    os.remove(path)
+        try:
+            count = sum(append(args.bank, read_problems(item)) for item in args.items)
+        except (OSError, ValueError) as e:
+            print(e, file=sys.stderr)
+            return 1
+        print("Added {} problems to {}".format(count, args.bank), file=sys.stderr)
+        return 0
+    with PremiseBank(args.bank) as bank:
+        if args.command == "list":
+            for problem_id in bank.ids:
+                print(problem_id)
+            return 0
+        for problem_id in args.items:
+            if problem_id not in bank:
+                print("ERROR: No problem {} in {}".format(problem_id, args.bank),
+                      file=sys.stderr)
+                return 1
+            print(json.dumps(bank.record(problem_id), ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,250 @@
+"""
+Diagnostics of each line of the premises box.
+
+PremiseChecker finds the syntax errors, the sets that do not fit in the diagram and
+the conflicting premises of every line, not only the first error found by
+ExpressionSet.add_premises and parse_premises. It keeps the parsed statements of
+each line of the last text checked, so checking the text again after an edit only
+parses the lines between the first and the last line changed.
+
+DiagnosticView shows the diagnostics in a Tk Text widget, as tags underlining the
+lines and as markers in a canvas next to it. Only the lines whose diagnostic
+changed are tagged again, and only the markers of the visible lines are drawn, so
+it does not depend on the length of the text.
+"""
+import premise_library
+from expression import Expression, Token
+from expression_set import ExpressionSet, MAX_SETS
+
+SYNTAX = "syntax"  # The line cannot be parsed
+SETS = "sets"  # The line uses a set beyond the MAX_SETS sets of the diagram
+CONFLICT = "conflict"  # The premises of the line conflict with other premises
+KINDS = (SYNTAX, SETS, CONFLICT)  # A line shows the first kind of problem it has
+
+# The options of the Text tag and the color of the marker of each kind
+TAG_OPTIONS = {SYNTAX: {"underline": True, "foreground": "red"},
+               SETS: {"underline": True, "foreground": "darkorange"},
+               CONFLICT: {"underline": True, "background": "#ffe4e1"}}
+MARKER_COLORS = {SYNTAX: "red", SETS: "darkorange", CONFLICT: "#8B0000"}
+MAX_REFERENCES = 3  # The other premises named in the message of a conflict
+
+
+def tag_name(kind: str):
+    """
+    :return: the name of the Text tag of a kind of diagnostic
+    """
+    return "diagnostic_" + kind
+
+
+def parse_statement(statement: str, directory=None):
+    """
+    Parse a statement in the same way as ExpressionSet.add_premises
+    throw a SyntaxError, or an OSError or ValueError for an included file
+    :param statement: a stripped statement
+    :param directory: the directory included paths are relative to
+    :return: an Expression, the name of a set, or the ExpressionSet of an included
+             file
+    """
+    if statement.startswith("@"):
+        if not premise_library.is_include(statement):
+            raise SyntaxError("Unknown directive \"{}\"".format(statement))
+        return premise_library.LIBRARIES.load(
+            premise_library.include_path(statement, directory)).expression_set
+    elif "are" in statement or "is" in statement:
+        return Expression(statement)
+    return Token(statement).name
+
+
+def parse_line(line: str, directory=None):
+    """
+    :param line: a line of the premises box, statements may be separated by ";"
+    :param directory: the directory included paths are relative to
+    :return: a list of the parsed statements of the line (see parse_statement), and
+             an error message or None
+    """
+    items = []
+    for statement in line.split(";"):
+        statement = statement.strip()
+        if statement == "":
+            continue
+        try:
+            items.append(parse_statement(statement, directory))
+        except (OSError, SyntaxError, ValueError) as e:
+            return items, str(e)
+    return items, None
+
+
+class PremiseChecker(object):
+    def __init__(self, directory=None):
+        """
+        :param directory: the directory included paths are relative to (the current
+                          directory if None)
+        """
+        self.directory = directory
+        self.lines = []  # The lines of the last text checked
+        self.parsed = []  # The result of parse_line for each of these lines
+        self.reparsed = 0  # The number of lines parsed by the last check
+
+    def check(self, text: str):
+        """
+        This function finds the problems of every line of a text
+        :param text: the text of the premises box
+        :return: a dict of line number (starting at 1, as in Tk) -> (kind, message)
+        """
+        lines = text.split("\n")
+        # Only the lines between the common beginning and end of the texts changed
+        first = 0
+        while first < min(len(lines), len(self.lines)) and \
+                lines[first] == self.lines[first]:
+            first += 1
+        last = 0
+        while last < min(len(lines), len(self.lines)) - first and \
+                lines[-1 - last] == self.lines[-1 - last]:
+            last += 1
+        changed = [parse_line(line, self.directory)
+                   for line in lines[first:len(lines) - last]]
+        self.parsed = self.parsed[:first] + changed + \
+            self.parsed[len(self.parsed) - last:]
+        self.lines = lines
+        self.reparsed = len(changed)
+        # Included files may have changed even if the line did not
+        for number, line in enumerate(lines):
+            if premise_library.INCLUDE in line and not first <= number < \
+                    len(lines) - last:
+                self.parsed[number] = parse_line(line, self.directory)
+                self.reparsed += 1
+        return self.diagnose()
+
+    def diagnose(self):
+        """
+        :return: the diagnostics of the lines parsed by check (see check)
+        """
+        diagnostics = dict()
+        names = dict()  # name of a set -> the order in which the sets first appear
+        occurrences = dict()  # Expression -> the line numbers it is on
+        for number, (items, error) in enumerate(self.parsed, start=1):
+            if error is not None:
+                diagnostics[number] = (SYNTAX, error)
+            line_names = []
+            for item in items:
+                if isinstance(item, Expression):
+                    line_names.extend([item.lhs.name, item.rhs.name])
+                elif isinstance(item, ExpressionSet):
+                    line_names.extend(sorted(item.members))
+                else:
+                    line_names.append(item)
+            extra = [name for name in line_names
+                     if names.setdefault(name, len(names)) >= MAX_SETS]
+            if extra:
+                diagnostics.setdefault(number, (
+                    SETS, "Set \"{}\" cannot be added: only {} sets can be "
+                          "supported".format(extra[0], MAX_SETS)))
+                continue
+            for item in items:
+                relations = item.relations if isinstance(item, ExpressionSet) else \
+                    [item] if isinstance(item, Expression) else []
+                for exp in relations:
+                    occurrences.setdefault(exp, []).append(number)
+
+        # The conflicts of the premises of the sets that fit in the diagram
+        s = ExpressionSet()
+        s.members = {name for name, order in names.items() if order < MAX_SETS}
+        for exp in occurrences:
+            s.relations[exp] = None
+        if len(s.members) < 2:
+            return diagnostics
+        try:
+            s.parse_premises()
+        except ValueError:
+            pass
+        for some_exps, all_exps in s.conflicts():
+            all_exps = sorted(all_exps, key=lambda e: occurrences[e][0])
+            for exps, others in ((some_exps, all_exps), (all_exps, some_exps)):
+                references = ", ".join("\"{}\" (line {})".format(
+                    other, occurrences[other][0]) for other in others[:MAX_REFERENCES])
+                if len(others) > MAX_REFERENCES:
+                    references += " and {} more".format(len(others) - MAX_REFERENCES)
+                for exp in exps:
+                    for number in occurrences[exp]:
+                        diagnostics.setdefault(number, (
+                            CONFLICT, "Conflicts with {}".format(references)))
+        return diagnostics
+
+
+class DiagnosticView(object):
+    def __init__(self, text, gutter, on_message=None):
+        """
+        :param text: the tkinter Text widget of the premises
+        :param gutter: a narrow tkinter Canvas next to the text, for the markers
+        :param on_message: a function called with the message of a line when the
+                           mouse moves over a line with a problem
+        """
+        self.text = text
+        self.gutter = gutter
+        self.on_message = on_message
+        self.diagnostics = dict()  # The diagnostics shown, see PremiseChecker.check
+        for kind in KINDS:
+            self.text.tag_configure(tag_name(kind), **TAG_OPTIONS[kind])
+            self.text.tag_bind(tag_name(kind), "<Enter>", self.hover)
+            self.text.tag_bind(tag_name(kind), "<Motion>", self.hover)
+        self.gutter.bind("<Configure>", lambda event: self.redraw(), add="+")
+
+    def apply(self, diagnostics):
+        """
+        This function shows new diagnostics, only the lines whose diagnostic changed
+        are tagged again
+        :param diagnostics: the result of PremiseChecker.check
+        """
+        for number in set(self.diagnostics) | set(diagnostics):
+            old, new = self.diagnostics.get(number), diagnostics.get(number)
+            if old == new:
+                continue
+            start, end = "{}.0".format(number), "{}.end".format(number)
+            if old is not None:
+                self.text.tag_remove(tag_name(old[0]), start, end)
+            if new is not None:
+                self.text.tag_add(tag_name(new[0]), start, end)
+        self.diagnostics = diagnostics
+        self.redraw()
+
+    def line_at(self, index: str):
+        """
+        :param index: an index of the text, e.g. "@0,0"
+        :return: the number of the line of the index
+        """
+        return int(self.text.index(index).split(".")[0])
+
+    def redraw(self):
+        """
+        This function draws a marker in the gutter next to each visible line with
+        a problem, it is called again after the text scrolls
+        """
+        self.gutter.delete("marker")
+        if len(self.diagnostics) == 0:
+            return
+        first = self.line_at("@0,0")
+        last = self.line_at("@0,{}".format(self.text.winfo_height()))
+        for number in range(first, last + 1):
+            if number not in self.diagnostics:
+                continue
+            info = self.text.dlineinfo("{}.0".format(number))
+            if info is None:
+                continue
+            _, y, _, height, _ = info
+            middle = y + height / 2
+            self.gutter.create_oval(3, middle - 4, 11, middle + 4, outline="",
+                                    fill=MARKER_COLORS[self.diagnostics[number][0]],
+                                    tags="marker")
+
+    def message(self, number: int):
+        """
+        :return: the message of the problem of a line, or None
+        """
+        diagnostic = self.diagnostics.get(number)
+        return "Line {}: {}".format(number, diagnostic[1]) if diagnostic else None
+
+    def hover(self, event):
+        """ Report the problem of the line under the mouse """
+        message = self.message(self.line_at("@{},{}".format(event.x, event.y)))
+        if message is not None and self.on_message is not None:
+            self.on_message(message)
@@ -0,0 +1,154 @@
+import collections
+import hashlib
+import os
+
+from expression_set import ExpressionSet
+from venn_watch import FileWatcher
+
+INCLUDE = "@include"  # A premise line "@include <path>" adds the premises of a file
+
+
+def is_include(line: str):
+    """
+    :return: True if a premise line is an include directive
+    """
+    return line.startswith(INCLUDE) and line[len(INCLUDE):len(INCLUDE) + 1] in ("", " ")
+
+
+def include_path(line: str, directory=None):
+    """
+    :param line: an include directive, the path may be quoted
+    :param directory: the directory relative paths start from (the current
+                      directory if None)
+    :return: the absolute path of the included file
+    """
+    path = line[len(INCLUDE):].strip().strip('"')
+    if path == "":
+        raise SyntaxError("Invalid include directive \"{}\"".format(line))
+    return os.path.abspath(os.path.join(directory or os.getcwd(), path))
+
+
+class Library(object):
+    def __init__(self, path, signature, text):
+        """
+        A premises file that can be included by others
+        :param path: the absolute path of the file
+        :param signature: the signature of the file (see FileWatcher.signature)
+        :param text: the content of the file
+        """
+        self.path = path
+        self.signature = signature
+        directory = os.path.dirname(path)
+        lines = [line.strip() for line in text.split("\n")]
+        self.includes = [include_path(line, directory) for line in lines
+                         if is_include(line)]
+        self.premises = "\n".join(line for line in lines if not is_include(line))
+        self.text_digest = hashlib.sha1(text.encode("utf8")).hexdigest()
+        self.digest = None  # The digest of the file and everything it includes
+        self.expression_set = None  # The compiled premises, not parsed
+
+
+class LibraryCache(object):
+    def __init__(self, cache_size=256):
+        """
+        Compiles premise files with their includes. The compiled premises of a file
+        are kept by a digest of its content and of the digests of the files it
+        includes, so a file is only compiled again when itself or one of the files
+        it depends on changes, and compiling a file only parses its own lines.
+        :param cache_size: the number of compiled files and parsed diagrams kept
+        """
+        self.cache_size = cache_size
+        self.libraries = dict()  # absolute path -> the last Library loaded
+        # digest -> the ExpressionSet of the premises of a file and its includes
+        self.compiled = collections.OrderedDict()
+        self.diagrams = collections.OrderedDict()  # digest -> a parsed ExpressionSet
+
+    def remember(self, cache, digest, value):
+        """ Keep a value in one of the caches, dropping the least recently used """
+        cache[digest] = value
+        cache.move_to_end(digest)
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def load(self, path: str, loading=()):
+        """
+        This function compiles a premises file and the files it includes
+        throw a ValueError if a file includes itself
+        :param path: the path of the file
+        :param loading: the files being loaded that include this one
+        :return: the Library of the file
+        """
+        path = os.path.abspath(path)
+        if path in loading:
+            raise ValueError("ERROR: {} includes itself".format(path))
+        signature = FileWatcher.signature(path)
+        library = self.libraries.get(path)
+        if library is None or signature is None or library.signature != signature:
+            with open(path, 'r', encoding='utf8') as f:
+                library = Library(path, signature, f.read())
+        dependencies = [self.load(include, loading + (path,))
+                        for include in library.includes]
+        digest = hashlib.sha1(" ".join(
+            [library.text_digest] + [d.digest for d in dependencies]).encode(
+            "utf8")).hexdigest()
+        if digest in self.compiled:
+            self.compiled.move_to_end(digest)
+        else:
+            s = ExpressionSet()
+            for dependency in dependencies:
+                s.extend(dependency.expression_set)
+            try:
+                s.add_premises(library.premises)
+            except SyntaxError as e:
+                raise SyntaxError("{}: {}".format(path, e))
+            self.remember(self.compiled, digest, s)
+        library.digest, library.expression_set = digest, self.compiled[digest]
+        self.libraries[path] = library
+        return library
+
+    def diagram(self, path: str):
+        """
+        :param path: the path of a premises file
+        :return: the parsed ExpressionSet of the file, shared by the callers until
+                 the file or a file it includes changes
+        """
+        library = self.load(path)
+        if library.digest in self.diagrams:
+            self.diagrams.move_to_end(library.digest)
+        else:
+            s = ExpressionSet()
+            s.extend(library.expression_set)
+            s.parse_premises()
+            self.remember(self.diagrams, library.digest, s)
+        return self.diagrams[library.digest]
+
+    def dependents(self, paths):
+        """
+        :param paths: paths of loaded files
+        :return: the set of the absolute paths of these files and of every loaded
+                 file including them, directly or not
+        """
+        included_by = collections.defaultdict(set)
+        for library in self.libraries.values():
+            for include in library.includes:
+                included_by[include].add(library.path)
+        ret = set()
+        pending = [os.path.abspath(path) for path in paths]
+        while pending:
+            path = pending.pop()
+            if path not in ret:
+                ret.add(path)
+                pending.extend(included_by[path])
+        return ret
+
+    def stale(self):
+        """
+        :return: the set of the loaded files that changed since they were loaded,
+                 and of the files that include them
+        """
+        return self.dependents(path for path, library in self.libraries.items()
+                               if FileWatcher.signature(path) != library.signature)
+
+
+# The libraries included by premises added with ExpressionSet.add_premises
+LIBRARIES = LibraryCache()
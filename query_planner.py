@@ -0,0 +1,134 @@
+import collections
+
+from expression import Expression
+
+
+class QueryPlanner(object):
+    def __init__(self, expression_set, cache_size=64):
+        """
+        Evaluates arguments on the smallest sub-diagram that can affect them.
+
+        Sets that are not connected to the sets of an argument through shared
+        premises cannot change its verdict: every "All" premise only makes areas
+        of its own sets black, and every "Some" premise keeps an area of its own
+        sets, so the other sets only multiply the areas of the diagram without
+        changing which of them are empty. An argument is therefore evaluated on a
+        diagram of the sets connected to its two sets only.
+        :param expression_set: a parsed ExpressionSet
+        :param cache_size: the number of projected diagrams kept
+        """
+        self.expression_set = expression_set
+        self.cache_size = cache_size
+        self.component = None  # name of a set -> frozenset of the connected sets
+        # frozenset of names -> (projected ExpressionSet, dict of its labels -> a
+        # list of labels of the whole diagram, filled on first use)
+        self.projections = collections.OrderedDict()
+
+    def connect(self):
+        """
+        This function finds the groups of sets connected by premises
+        """
+        parent = {name: name for name in self.expression_set.members}
+
+        def find(name):
+            while parent[name] != name:
+                parent[name] = parent[parent[name]]
+                name = parent[name]
+            return name
+
+        for exp in self.expression_set.relations:
+            parent[find(exp.lhs.name)] = find(exp.rhs.name)
+        groups = collections.defaultdict(set)
+        for name in parent:
+            groups[find(name)].add(name)
+        self.component = dict()
+        for group in groups.values():
+            group = frozenset(group)
+            for name in group:
+                self.component[name] = group
+
+    def plan(self, exp: Expression):
+        """
+        :param exp: an argument using known set names
+        :return: a frozenset of the names of the sets that can affect the argument
+        """
+        if self.component is None:
+            self.connect()
+        return self.component[exp.lhs.name] | self.component[exp.rhs.name]
+
+    def projection(self, members: frozenset):
+        """
+        :param members: names of sets returned by plan
+        :return: a parsed ExpressionSet of the sets and the premises between them,
+                 which is the whole diagram if nothing can be left out
+        """
+        if len(members) < 2 or members == self.expression_set.members:
+            return self.expression_set
+        if members in self.projections:
+            self.projections.move_to_end(members)
+            return self.projections[members][0]
+        from expression_set import ExpressionSet
+        s = ExpressionSet()
+        for name in members:
+            s.append(name)
+        for exp in self.expression_set.relations:
+            if exp.lhs.name in members:
+                s.append(exp)
+        s.parse_premises()
+        self.projections[members] = (s, None)
+        if len(self.projections) > self.cache_size:
+            self.projections.popitem(last=False)
+        return s
+
+    def lift(self, members: frozenset, marked: set):
+        """
+        :param members: names of sets of a projection
+        :param marked: a set of area labels of the projection
+        :return: the set of area labels of the whole diagram inside these areas
+        """
+        s, areas = self.projections[members]
+        if areas is None:
+            # The id of an area has a 1 for each set it belongs to, in the sorted
+            # order of the names of the sets
+            names = sorted(self.expression_set.members)
+            index = [names.index(name) for name in sorted(members)]
+            labels = {area_id: area_label for area_label, area_id in s.all_label.items()}
+            areas = collections.defaultdict(list)
+            for area_label, area_id in self.expression_set.all_label.items():
+                projected = "".join(area_id[i] for i in index)
+                if projected in labels:
+                    areas[labels[projected]].append(area_label)
+            self.projections[members] = (s, areas)
+        ret = set()
+        for area_label in marked:
+            ret.update(areas[area_label])
+        return ret
+
+    def verdict(self, exp: Expression):
+        """
+        :param exp: the expression being validated
+        :return: the key of the verdict in results, or None if the expression uses
+                 unknown set names
+        """
+        if exp.lhs.name not in self.expression_set.members or \
+                exp.rhs.name not in self.expression_set.members:
+            return None
+        return self.projection(self.plan(exp)).judge_diagram(exp)[0]
+
+    def judge(self, exp: Expression):
+        """
+        :param exp: the expression being validated
+        :return: the same as ExpressionSet.judge_diagram on the whole diagram
+        """
+        if exp.lhs.name not in self.expression_set.members or \
+                exp.rhs.name not in self.expression_set.members:
+            return None, set()
+        members = self.plan(exp)
+        s = self.projection(members)
+        result, marked = s.judge_diagram(exp)
+        if s is not self.expression_set:
+            marked = self.lift(members, marked)
+            if result == "TRUE" or result == "MAYBE TRUE":
+                # Only the areas left by the premises of the other sets are valid
+                marked = marked - self.expression_set.black.keys()
+        return result, marked
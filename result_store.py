@@ -0,0 +1,227 @@
+import json
+import os
+import struct
+
+import numpy as np
+
+from expression_set import results
+
+MAGIC = b"VENNRES\x01"
+ALIGNMENT = 64  # Columns start at multiples of this many bytes
+
+# Verdicts are stored as their index in this list. The verdicts of results come
+# first; the others are for arguments with unknown set names, premises that
+# conflict with each other and problems that could not be parsed
+VERDICTS = list(results) + ["UNKNOWN", "CONFLICT", "ERROR"]
+NO_VERDICT = 255  # The expected verdict of a problem without one
+NO_PAIR = 255  # The validity and must of a CONFLICT or ERROR, which were not evaluated
+NO_MOOD = 255  # The mood of a conclusion that could not be parsed
+
+# Column name -> dtype. Every column holds one fixed-width item per conclusion
+COLUMNS = {
+    "problem": "<u4",  # The number of the problem in the graded corpus
+    "conclusion": "<u4",  # The number of the conclusion in the problem
+    "validity": "u1",  # <if the conclusion could be TRUE> of evaluate, or NO_PAIR
+    "must": "u1",  # <if the conclusion must be TRUE> of evaluate, or NO_PAIR
+    "verdict": "u1",  # Index in VERDICTS
+    "expected": "u1",  # Index in VERDICTS of the expected verdict, or NO_VERDICT
+    "mood": "u1",  # Index in "AEIO" of the mood of the conclusion, or NO_MOOD
+    "sets": "u1",  # The number of sets of the problem
+    "pattern": "<u4",  # Index in the "patterns" list of the header
+}
+
+
+def verdict_pair(verdict: str):
+    """
+    :return: the <validity>, <must> pair ExpressionSet.evaluate returns for a verdict,
+             or NO_PAIR twice for conclusions that were not evaluated
+    """
+    if verdict in results:
+        return results[verdict]["validity"], results[verdict]["must"]
+    if verdict == "UNKNOWN":
+        # evaluate reports unknown set names as (False, True)
+        return False, True
+    return NO_PAIR, NO_PAIR
+
+
+class ResultWriter(object):
+    def __init__(self, path: str, chunk_rows=65536, meta=None):
+        """
+        Writes graded conclusions to a columnar result file. The rows are written to
+        one temporary file per column as they come, and the columns are put
+        together after a header when the writer is closed.
+        :param path: the path of the result file
+        :param chunk_rows: the number of rows kept in memory before being written
+        :param meta: a dict of extra information kept in the header
+        """
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.meta = meta if meta is not None else dict()
+        self.rows = 0
+        self.patterns = dict()  # pattern -> its index
+        self.buffers = {name: [] for name in COLUMNS}
+        self.files = {name: open("{}.{}.tmp".format(path, name), "wb")
+                      for name in COLUMNS}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close(discard=exc_type is not None)
+
+    def append(self, problem: int, conclusion: int, verdict: str, mood: str,
+               sets: int, pattern: str, expected=None):
+        """
+        Add a graded conclusion
+        :param problem: the number of the problem
+        :param conclusion: the number of the conclusion in the problem
+        :param verdict: a verdict in VERDICTS
+        :param mood: the mood of the conclusion (A, E, I or O), or None if it could
+                     not be parsed
+        :param sets: the number of sets of the problem
+        :param pattern: the premise pattern of the problem, e.g. "AI"
+        :param expected: the expected verdict in VERDICTS, or None
+        """
+        if pattern not in self.patterns:
+            self.patterns[pattern] = len(self.patterns)
+        validity, must = verdict_pair(verdict)
+        row = {"problem": problem, "conclusion": conclusion, "validity": validity,
+               "must": must, "verdict": VERDICTS.index(verdict),
+               "expected": NO_VERDICT if expected is None else VERDICTS.index(expected),
+               "mood": NO_MOOD if mood is None else "AEIO".index(mood), "sets": sets,
+               "pattern": self.patterns[pattern]}
+        for name, value in row.items():
+            self.buffers[name].append(value)
+        self.rows += 1
+        if len(self.buffers["problem"]) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        """ Write the buffered rows to the temporary column files """
+        for name, dtype in COLUMNS.items():
+            np.asarray(self.buffers[name], dtype=dtype).tofile(self.files[name])
+            self.buffers[name] = []
+
+    def close(self, discard=False):
+        """
+        Put the header and the columns together in the result file
+        :param discard: remove the temporary files without writing the result file
+        """
+        if not discard:
+            self.flush()
+        for f in self.files.values():
+            f.close()
+        try:
+            if not discard:
+                self.assemble()
+        finally:
+            for name in COLUMNS:
+                os.remove("{}.{}.tmp".format(self.path, name))
+
+    def assemble(self):
+        """ Write the header and copy the temporary column files after it """
+        columns, offset = [], 0
+        for name, dtype in COLUMNS.items():
+            columns.append({"name": name, "dtype": dtype, "offset": offset})
+            size = self.rows * np.dtype(dtype).itemsize
+            offset += -(-size // ALIGNMENT) * ALIGNMENT
+        header = {"rows": self.rows, "columns": columns, "verdicts": VERDICTS,
+                  "patterns": sorted(self.patterns, key=self.patterns.get),
+                  "meta": self.meta}
+        text = json.dumps(header).encode("utf8")
+        start = -(-(len(MAGIC) + 4 + len(text)) // ALIGNMENT) * ALIGNMENT
+        text += b" " * (start - len(MAGIC) - 4 - len(text))
+        with open(self.path, "wb") as out:
+            out.write(MAGIC + struct.pack("<I", len(text)) + text)
+            for column in columns:
+                out.seek(start + column["offset"])
+                with open("{}.{}.tmp".format(self.path, column["name"]), "rb") as f:
+                    while True:
+                        data = f.read(1 << 20)
+                        if not data:
+                            break
+                        out.write(data)
+            out.truncate(start + offset)
+
+
+class ResultStore(object):
+    def __init__(self, path: str):
+        """
+        Opens a result file written by ResultWriter. The columns are memory-mapped,
+        so they are only read from the disk when they are used.
+        :param path: the path of the result file
+        """
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError("ERROR: {} is not a result file".format(path))
+            length, = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(length).decode("utf8"))
+        start = len(MAGIC) + 4 + length
+        self.rows = header["rows"]
+        self.verdicts = header["verdicts"]
+        self.patterns = header["patterns"]
+        self.meta = header["meta"]
+        self.columns = dict()
+        for column in header["columns"]:
+            if self.rows == 0:
+                self.columns[column["name"]] = np.zeros(0, dtype=column["dtype"])
+            else:
+                self.columns[column["name"]] = np.memmap(
+                    path, dtype=column["dtype"], mode="r",
+                    offset=start + column["offset"], shape=(self.rows,))
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        """
+        :return: a read-only array of a column
+        """
+        return self.columns[name]
+
+    def labels(self, by: str):
+        """
+        :return: the names of the values of a column
+        """
+        if by == "pattern":
+            return self.patterns
+        if by in ("verdict", "expected"):
+            return self.verdicts
+        if by == "mood":
+            return list("AEIO")
+        return None
+
+    def distribution(self, by="pattern", of="verdict", chunk_rows=1 << 22):
+        """
+        Count the rows for each pair of values of two columns, reading the columns
+        a chunk at a time
+        :param by: the column the rows are grouped by
+        :param of: the column counted in each group
+        :return: a dict of the values of by -> a dict of the values of of -> count.
+                 Values are named by labels, values without a name (e.g. NO_VERDICT)
+                 are kept as numbers
+        """
+        if self.rows == 0:
+            return dict()
+        keys, values = self.columns[by], self.columns[of]
+        width = 256 if values.dtype.itemsize == 1 else int(values.max()) + 1
+        counts = np.zeros(0, dtype=np.int64)
+        for start in range(0, self.rows, chunk_rows):
+            key = keys[start:start + chunk_rows].astype(np.int64)
+            code = key * width + values[start:start + chunk_rows]
+            chunk = np.bincount(code)
+            if len(chunk) > len(counts):
+                chunk[:len(counts)] += counts
+                counts = chunk
+            else:
+                counts[:len(chunk)] += chunk
+        def name(labels, value):
+            return labels[value] if labels and value < len(labels) else value
+
+        key_labels, value_labels = self.labels(by), self.labels(of)
+        ret = dict()
+        for code in np.flatnonzero(counts):
+            key, value = divmod(int(code), width)
+            ret.setdefault(name(key_labels, key), dict())[
+                name(value_labels, value)] = int(counts[code])
+        return ret
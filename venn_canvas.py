@@ -0,0 +1,248 @@
+"""
+A diagram drawn directly as the items of a Tk canvas, without matplotlib.
+
+The regions, edges and names of the sets are created once for each layout of
+venn_regions. Showing other premises or another verdict only changes the fill and
+the stipple of these items, so Tk redraws the diagram without rasterizing a whole
+figure. Only the X symbols of "Some" premises are created again, when the premises
+change.
+"""
+import numpy as np
+
+import expression_set
+import venn_regions
+
+# The stipple bitmap of Tk drawn for each hatch pattern of expression_set.results
+STIPPLES = {"///": "gray50", "..": "gray12", "xxx": "gray75", "+": "gray25"}
+MARGIN = 20  # Pixels around the diagram, captions are drawn in the bottom margin
+CAPTION_HEIGHT = 50  # Pixels below the diagram kept for the captions
+
+
+def layout_name(size: int, black_mask=None):
+    """
+    :param size: the number of sets
+    :param black_mask: the black regions (see venn_regions.black_mask) for an Euler
+                       layout of two or three sets, or None for a Venn layout
+    :return: the name of the layout in venn_regions used for a number of sets
+    """
+    if black_mask is not None and size in venn_regions.EULER_SIZES:
+        return venn_regions.euler_name(size, black_mask)
+    if size in venn_regions.CIRCLE_LAYOUT:
+        return venn_regions.CIRCLE_LAYOUT[size]
+    if size in venn_regions.DEFAULT_LAYOUT:
+        return venn_regions.DEFAULT_LAYOUT[size]
+    raise ValueError("ERROR: Currently only two to {} items can be supported but got "
+                     "{}".format(max(venn_regions.DEFAULT_LAYOUT), size))
+
+
+class TkVennDiagram(object):
+    def __init__(self, canvas):
+        """
+        :param canvas: the tkinter Canvas the diagram is drawn on
+        """
+        self.canvas = canvas
+        self.expression_set = None
+        self.highlight_some = True
+        self.layout = None
+        self.regions = dict()  # region id -> polygon items of the pieces of a region
+        self.hatches = dict()  # region id -> polygon items of the hatch of a verdict
+        self.set_labels = []  # text items of the names of the sets
+        self.captions = []  # text items of the verdict and the argument
+        self.points = dict()  # item -> its points in the coordinates of the layout
+        self.marked = set()  # region ids whose hatch is shown
+        # (scale, x offset, y offset) from the layout to canvas pixels
+        self.transform = (1.0, 0.0, 0.0)
+        self.canvas.bind("<Configure>", lambda event: self.resize(), add="+")
+
+    def create_items(self, name):
+        """
+        This function creates the items of a layout, replacing those of the
+        previous one
+        :param name: the name of the layout
+        """
+        self.canvas.delete("all")
+        self.layout = venn_regions.get_layout(name)
+        self.regions, self.hatches, self.points = dict(), dict(), dict()
+        self.marked = set()
+        for region_id, rings in self.layout.polygons.items():
+            # The regions of the layouts have no holes, every ring is a piece
+            self.regions[region_id] = [self.add_polygon(ring, fill="white", outline="")
+                                       for ring in rings]
+        for region_id, rings in self.layout.polygons.items():
+            self.hatches[region_id] = [self.add_polygon(ring, state="hidden", width=2)
+                                       for ring in rings]
+        for outline in self.layout.outlines:
+            self.add_polygon(outline, fill="", outline="black", width=1.5)
+        self.set_labels = []
+        for pos in self.layout.set_label_pos:
+            self.set_labels.append(self.canvas.create_text(0, 0, text="",
+                                                           font=("", 14)))
+            self.points[self.set_labels[-1]] = np.array([pos])
+        self.captions = [self.canvas.create_text(0, 0, text="", font=("", 16, "bold")),
+                         self.canvas.create_text(0, 0, text="", font=("", 11))]
+        self.resize()
+
+    def add_polygon(self, points, **options):
+        """
+        :param points: an array of points in the coordinates of the layout
+        :return: a new polygon item
+        """
+        item = self.canvas.create_polygon(0, 0, 0, 0, 0, 0, **options)
+        self.points[item] = np.asarray(points)
+        return item
+
+    def resize(self):
+        """
+        This function fits the diagram in the canvas and moves every item
+        """
+        if self.layout is None:
+            return
+        width = max(self.canvas.winfo_width(), 1)
+        height = max(self.canvas.winfo_height(), 1)
+        xmin, xmax, ymin, ymax = self.layout.extent
+        scale = max(min((width - 2 * MARGIN) / (xmax - xmin),
+                        (height - 2 * MARGIN - CAPTION_HEIGHT) / (ymax - ymin)), 1e-6)
+        x_offset = (width - scale * (xmax - xmin)) / 2 - scale * xmin
+        y_offset = (height - CAPTION_HEIGHT - scale * (ymax - ymin)) / 2 + scale * ymax
+        self.transform = (scale, x_offset, y_offset)
+        for item, points in self.points.items():
+            self.canvas.coords(item, *self.to_canvas(points).ravel())
+        self.canvas.coords(self.captions[0], width / 2, height - MARGIN - 18)
+        self.canvas.coords(self.captions[1], width / 2, height - MARGIN)
+
+    def to_canvas(self, points):
+        """
+        :param points: an array of points in the coordinates of the layout
+        :return: the array of these points in canvas pixels
+        """
+        scale, x_offset, y_offset = self.transform
+        points = np.asarray(points, dtype=float)
+        return np.column_stack([x_offset + scale * points[:, 0],
+                                y_offset - scale * points[:, 1]])
+
+    def show(self, s: expression_set.ExpressionSet, highlight_some=True, euler=False):
+        """
+        This function displays the diagram of the premises
+        :param s: a parsed ExpressionSet
+        :param highlight_some: a flag to determine whether to highlight "Some"
+                               premises using a background color
+        :param euler: a flag to draw an Euler diagram, which leaves out the areas
+                      disabled by "All" premises
+        """
+        name = layout_name(len(s.members), venn_regions.black_mask(
+            s.all_label[area_label] for area_label in s.black) if euler else None)
+        if self.layout is None or self.layout.name != name:
+            self.create_items(name)
+        self.expression_set, self.highlight_some = s, highlight_some
+        self.clear_marks()
+        for item, label in zip(self.set_labels, sorted(s.members)):
+            self.canvas.itemconfigure(item, text=label)
+        colors = dict(zip(s.all_label, venn_regions.area_colors(len(s.members))))
+        highlighted = {area_label for area_labels in s.cross
+                       for area_label in area_labels} if highlight_some else set()
+        for area_label, region_id in s.all_label.items():
+            if area_label in s.black:
+                fill = "black"
+            elif area_label in highlighted:
+                fill = colors[area_label]
+            else:
+                fill = "white"
+            # Areas left out of an Euler layout have no items
+            for item in self.regions.get(region_id, []):
+                self.canvas.itemconfigure(item, fill=fill)
+        self.canvas.delete("cross")
+        for area_labels in s.cross:
+            self.mark_regions(area_labels)
+
+    def mark_regions(self, area_labels: tuple):
+        """
+        This function marks a "X" symbol in each area that is not black and links
+        them by a line, in the same way as VennDiagramPlt.mark_regions
+        :param area_labels: labels of areas (A,B...)
+        """
+        s = self.expression_set
+        positions = [np.array(self.layout.label_pos[s.all_label[area_label]])
+                     for area_label in area_labels if area_label not in s.black]
+        if len(positions) == 0:
+            return
+        path = [positions.pop(0)]
+        while positions:
+            nearest = min(range(len(positions)),
+                          key=lambda i: np.hypot(*(positions[i] - path[-1])))
+            path.append(positions.pop(nearest))
+        if len(path) > 1:
+            item = self.canvas.create_line(0, 0, 0, 0, fill="black", tags="cross")
+            self.points[item] = np.array(path)
+        for pos in path:
+            item = self.canvas.create_text(0, 0, text="X", font=("", 12, "bold"),
+                                           tags="cross")
+            self.points[item] = np.array([pos])
+        self.forget_deleted()
+        self.resize()
+
+    def forget_deleted(self):
+        """ Forget the points of items that are no longer on the canvas """
+        alive = set(self.canvas.find_all())
+        for item in [item for item in self.points if item not in alive]:
+            del self.points[item]
+
+    def show_result(self, result: str, marked: set, exp=None):
+        """
+        This function displays the verdict of an argument on the diagram
+        :param result: the key of the verdict in expression_set.results
+        :param marked: a set containing the area labels supporting/refuting the
+                       argument
+        :param exp: the argument being validated, or None if it should not be
+                    displayed
+        """
+        verdict = expression_set.results[result]
+        self.clear_marks()
+        for area_label in marked:
+            region_id = self.expression_set.all_label[area_label]
+            for item in self.hatches.get(region_id, []):
+                self.canvas.itemconfigure(item, state="normal", fill=verdict["color"],
+                                          outline=verdict["color"],
+                                          stipple=STIPPLES[verdict["pattern"]])
+            self.marked.add(region_id)
+        if verdict["validity"] and verdict["must"]:
+            self.canvas.itemconfigure(self.captions[0], text="VALID ARGUMENT",
+                                      fill="#228B22")
+        else:
+            self.canvas.itemconfigure(self.captions[0], text="INVALID ARGUMENT",
+                                      fill="#8B0000")
+        self.canvas.itemconfigure(self.captions[1],
+                                  text=str(exp) if exp is not None else "")
+
+    def clear_marks(self):
+        """
+        This function hides everything drawn by show_result
+        """
+        for region_id in self.marked:
+            for item in self.hatches.get(region_id, []):
+                self.canvas.itemconfigure(item, state="hidden")
+        self.marked = set()
+        for item in self.captions:
+            self.canvas.itemconfigure(item, text="")
+
+    def clear(self):
+        """ Remove the diagram from the canvas """
+        self.canvas.delete("all")
+        self.layout, self.expression_set = None, None
+        self.points, self.marked = dict(), set()
+
+    def area_at(self, x, y):
+        """
+        :param x: x coordinate in canvas pixels
+        :param y: y coordinate in canvas pixels
+        :return: the label of the area (A, AB...) at the point, or None if the
+                 point is outside of all sets
+        """
+        if self.expression_set is None:
+            return None
+        scale, x_offset, y_offset = self.transform
+        region_id = self.layout.region_at((x - x_offset) / scale,
+                                          (y_offset - y) / scale)
+        for area_label, patch_id in self.expression_set.all_label.items():
+            if patch_id == region_id:
+                return area_label
+        return None
@@ -1,10 +1,23 @@
+import functools
+import os
 import sys
 import numpy as np
 
 import matplotlib.pyplot as plt
+from matplotlib.lines import Line2D
+from matplotlib.patches import Patch, PathPatch
+from matplotlib.text import Annotation
+from matplotlib.path import Path
 from matplotlib_venn import *
 
 import expression_set
+import venn_regions
+
+# Formats export_bytes encodes from the pixels of the Agg renderer -> the name of
+# the format for matplotlib.image.imsave
+RASTER_FORMATS = {"png": "png", "jpg": "jpeg", "jpeg": "jpeg", "tif": "tiff",
+                  "tiff": "tiff", "webp": "webp"}
+
 
 def hex_to_rgba(hex_):
     hex_ = hex_.lstrip('#')
@@ -13,35 +26,172 @@ def hex_to_rgba(hex_):
     return tuple(rgb + [0])
 
 
+class RegionVenn(object):
+    def __init__(self, layout_name, subsets=None, set_labels=None, ax=None):
+        """
+        A diagram drawn from the precomputed regions of a layout in venn_regions,
+        with the same interface as the diagrams of matplotlib_venn
+        :param layout_name: the name of the layout
+        :param subsets: not used, the layout is fixed
+        :param set_labels: the names of the sets
+        :param ax: the matplotlib axes to draw on
+        """
+        ax = ax if ax is not None else plt.gca()
+        self.layout = venn_regions.get_layout(layout_name)
+        self.patches, self.labels = dict(), dict()
+        for region_id, rings in self.layout.polygons.items():
+            path = Path.make_compound_path(*[Path(ring, closed=True)
+                                             for ring in rings])
+            self.patches[region_id] = PathPatch(path, facecolor="white",
+                                                edgecolor=(0, 0, 0, 0))
+            # add_artist does not update the data limits, they are set below
+            ax.add_artist(self.patches[region_id])
+            self.labels[region_id] = ax.text(*self.layout.label_pos[region_id], "",
+                                             ha="center", va="center")
+        self.set_labels = [ax.text(*pos, label, ha="center", va="center",
+                                   fontsize=14)
+                           for pos, label in zip(self.layout.set_label_pos,
+                                                 set_labels or [])]
+        xmin, xmax, ymin, ymax = self.layout.extent
+        ax.set_xlim(xmin, xmax)
+        ax.set_ylim(ymin, ymax)
+        ax.set_aspect("equal")
+        ax.set_axis_off()
+
+    def get_patch_by_id(self, region_id):
+        # None for a region left out of an Euler layout, as in matplotlib_venn
+        return self.patches.get(region_id)
+
+    def get_label_by_id(self, region_id):
+        return self.labels.get(region_id)
+
+
+class CopiedVenn(object):
+    def __init__(self, diagram, copies, region_ids):
+        """
+        The patches and labels of a diagram copied to other axes (see
+        VennDiagramPlt.copy_to), with the same interface as the diagrams of
+        matplotlib_venn
+        :param diagram: the diagram copied
+        :param copies: a dict of each artist of the diagram -> its copy
+        :param region_ids: the ids of the regions of the diagram
+        """
+        self.patches, self.labels = dict(), dict()
+        for region_id in region_ids:
+            patch = diagram.get_patch_by_id(region_id)
+            if patch is not None:
+                self.patches[region_id] = copies[patch]
+            label = diagram.get_label_by_id(region_id)
+            if label is not None:
+                self.labels[region_id] = copies[label]
+
+    def get_patch_by_id(self, region_id):
+        return self.patches.get(region_id)
+
+    def get_label_by_id(self, region_id):
+        return self.labels.get(region_id)
+
+
+def region_outlines(layout_name, subsets=None, ax=None):
+    """
+    This function draws the edge of every set of a layout in venn_regions
+    :return: a list of the edge patches
+    """
+    ax = ax if ax is not None else plt.gca()
+    outlines = []
+    for outline in venn_regions.get_layout(layout_name).outlines:
+        outlines.append(PathPatch(Path(outline, closed=True), fill=False,
+                                  linewidth=1.5, zorder=2))
+        ax.add_artist(outlines[-1])
+    return outlines
+
+
+_hit_rasters = dict()  # number of sets -> RegionRaster of the matplotlib_venn layout
+
+
+def patch_raster(diagram, size, resolution=400):
+    """
+    This function rasterizes the area patches of a matplotlib_venn diagram
+    :param diagram: a diagram created by venn2/venn3
+    :param size: the number of sets
+    :param resolution: the number of pixels along the longer side of the raster
+    :return: a RegionRaster mapping a point of the diagram to its area id
+    """
+    paths = dict()
+    for mask in venn_regions.region_masks(size):
+        patch = diagram.get_patch_by_id(venn_regions.region_id(mask, size))
+        if patch is not None:
+            paths[mask] = patch.get_path().transformed(patch.get_patch_transform())
+    points = np.vstack([path.vertices for path in paths.values()])
+    (xmin, ymin), (xmax, ymax) = points.min(axis=0), points.max(axis=0)
+    step = max(xmax - xmin, ymax - ymin) / resolution
+    x = np.arange(xmin, xmax + step, step)
+    y = np.arange(ymin, ymax + step, step)
+    grid = np.column_stack([a.ravel() for a in np.meshgrid(x, y)])
+    raster = np.zeros(len(grid), dtype=np.uint8)
+    for mask, path in paths.items():
+        raster[path.contains_points(grid)] = mask
+    return venn_regions.RegionRaster(size, (x[0], x[-1], y[0], y[-1]),
+                                     raster.reshape(len(y), len(x)))
+
+
 venn = {
     2: {
         "venn": venn2,
         "circles": venn2_circles,
         "subsets": (1, 1, 0.5),
-        'colors': list(map(hex_to_rgba, ["#ff7f7f", "#7fbf7f", "#d8ab7f"]))
+        'colors': list(map(hex_to_rgba, venn_regions.area_colors(2)))
     },
     3: {
         "venn": venn3,
         "circles": venn3_circles,
         "subsets": (1, 1, 0.5, 1, 0.5, 0.5, 0.1),
-        "colors": list(
-            map(hex_to_rgba, ["#ff7f7f", "#7fbf7f", "#7f7fff", "#d8ab7f",
-                              "#d87fd8", "#7fabd8", "#b298b2"]))
+        "colors": list(map(hex_to_rgba, venn_regions.area_colors(3)))
     }
 }
+for size, layout_name in venn_regions.DEFAULT_LAYOUT.items():
+    venn[size] = {
+        "venn": functools.partial(RegionVenn, layout_name),
+        "circles": functools.partial(region_outlines, layout_name),
+        "subsets": None,
+        "colors": list(map(hex_to_rgba, venn_regions.area_colors(size)))
+    }
 
 
 class VennDiagramPlt(object):
-    def __init__(self, parent: expression_set.ExpressionSet):
+    def __init__(self, parent: expression_set.ExpressionSet, ax=None, panel=False):
+        """
+        :param parent: the expression set being displayed
+        :param ax: the matplotlib axes to draw on (the current axes if None)
+        :param panel: if the diagram is one panel of a larger figure, so captions
+                      are placed below the axes instead of the figure bottom
+        """
         self.expression_set = parent
         self.venn_diagram = None  # The venn diagram objects
+        self.colors = dict()  # area label -> the color highlighting "Some" premises
+        self.ax = ax
+        self.panel = panel
+        self.euler = False  # If the diagram leaves out black areas (see create_diagram)
+        # Artists and patch states changed by the result of an evaluation, so that
+        # they can be removed without redrawing the whole diagram
+        self.overlay = []
+        self.marked = dict()
 
-    def create_diagram(self, highlight_some=True):
+    def axes(self):
+        """
+        :return: the matplotlib axes the diagram is drawn on
+        """
+        return self.ax if self.ax is not None else plt.gca()
+
+    def create_diagram(self, highlight_some=True, euler=False):
         """
         This function displays the diagram according to the area codes generated in
         the expression set
         :param highlight_some: a flag to determine whether to highlight "Some"
                                premises using a background color
+        :param euler: a flag to draw an Euler diagram of two or three sets, which
+                      leaves out the areas disabled by "All" premises instead of
+                      painting them black (see venn_regions.get_euler_layout)
         """
         if len(self.expression_set.all_label) == 0 and len(
                 self.expression_set.members) != 0:
@@ -50,20 +200,48 @@ class VennDiagramPlt(object):
 
         # Create venn diagram basic structure
         labels = tuple(sorted(self.expression_set.members))
-        if not 2 <= len(labels) <= 3:
-            raise ValueError("ERROR: Currently only at two or three items can be "
-                             "supported but got " + str(labels))
-        colors = dict(zip(self.expression_set.all_label.keys(),
-                          venn[len(self.expression_set)]["colors"]))
+        if len(labels) not in venn:
+            raise ValueError("ERROR: Currently only two to {} items can be "
+                             "supported but got {}".format(max(venn), labels))
 
         # Draw the venn diagram in matplotlib
         plt.ion()
-        c = venn[len(self.expression_set)]["circles"](
-            subsets=venn[len(self.expression_set)]["subsets"])  # Edge
-        self.venn_diagram = venn[len(self.expression_set)]["venn"](
-            subsets=venn[len(self.expression_set)]["subsets"], set_labels=labels)
-        for area_label, color in zip(self.expression_set.all_label,
-                                     colors):  # Set areas to white
+        self.euler = euler and len(labels) in venn_regions.EULER_SIZES
+        self.draw_base()
+
+        # Hightlight "Some" premises using a background color
+        for area_label_pair in self.expression_set.cross:
+            self.draw_cross(area_label_pair, highlight_some)
+
+        # Disabled areas should be marked black
+        for area_label in self.expression_set.black:
+            self.draw_black(area_label)
+
+    def draw_base(self):
+        """
+        This function draws the outlines and the white areas of the diagram
+        """
+        labels = tuple(sorted(self.expression_set.members))
+        self.colors = dict(zip(self.expression_set.all_label.keys(),
+                               venn[len(self.expression_set)]["colors"]))
+        self.overlay, self.marked = [], dict()
+        if self.euler:
+            layout_name = venn_regions.euler_name(
+                len(labels), venn_regions.black_mask(
+                    self.expression_set.all_label[area_label]
+                    for area_label in self.expression_set.black))
+            region_outlines(layout_name, ax=self.ax)  # Edge
+            self.venn_diagram = RegionVenn(layout_name, set_labels=labels, ax=self.ax)
+        else:
+            c = venn[len(self.expression_set)]["circles"](
+                subsets=venn[len(self.expression_set)]["subsets"], ax=self.ax)  # Edge
+            self.venn_diagram = venn[len(self.expression_set)]["venn"](
+                subsets=venn[len(self.expression_set)]["subsets"], set_labels=labels,
+                ax=self.ax)
+        for area_label in self.expression_set.all_label:  # Set areas to white
+            if self.venn_diagram.get_patch_by_id(
+                    self.expression_set.all_label[area_label]) is None:
+                continue  # Left out of an Euler diagram
             self.venn_diagram.get_patch_by_id(
                 self.expression_set.all_label[area_label]).set_alpha(1.0)
             self.venn_diagram.get_patch_by_id(
@@ -74,35 +252,63 @@ class VennDiagramPlt(object):
             self.venn_diagram.get_label_by_id(
                 self.expression_set.all_label[area_label]).set_text("")
 
-        # Areas
-        area_colors, texts = [], []
+    def draw_cross(self, area_label_pair: tuple, highlight_some=True):
+        """
+        This function draws the X of a "Some" premise
+        :param area_label_pair: the labels of the areas in which one should exist
+        :param highlight_some: whether to fill the areas with a background color
+        :return: a list of the artists of the X symbols
+        """
+        artists = []
+        if len(area_label_pair) == 2 or isinstance(self.venn_diagram, RegionVenn):
+            artists = self.mark_intersect(area_label_pair)
+        if highlight_some:
+            for area_label in area_label_pair:
+                if area_label not in self.expression_set.black:
+                    area = self.venn_diagram.get_patch_by_id(
+                        self.expression_set.all_label[area_label])
+                    area.set_alpha(1.0)
+                    area.set_facecolor(self.colors[area_label])
+        return artists
 
-        def color_area(area_label: str):
-            for exp in exps:
-                area = self.venn_diagram.get_patch_by_id(
-                    self.expression_set.all_label[area_label])
-                area.set_alpha(1.0)
-                area.set_facecolor(colors[area_label])
-                area_colors.append(area)
-                texts.append(str(exp))
+    def draw_black(self, area_label: str):
+        """
+        This function marks an area disabled by "All" premises black
+        :param area_label: the label of the area
+        """
+        area = self.venn_diagram.get_patch_by_id(
+            self.expression_set.all_label[area_label])
+        if area is None:
+            return  # Left out of an Euler diagram
+        area.set_alpha(1.0)
+        area.set_facecolor('black')
 
-        # Hightlight "Some" premises using a background color
-        for area_label_pair, exps in self.expression_set.cross.items():
-            if len(area_label_pair) == 2:
-                self.mark_intersect(area_label_pair)
-            if highlight_some:
-                for area_label in area_label_pair:
-                    color_area(area_label)
+    def hit_index(self):
+        """
+        :return: a RegionRaster of the diagram, shared by all diagrams with the
+                 same number of sets
+        """
+        if isinstance(self.venn_diagram, RegionVenn):
+            return self.venn_diagram.layout
+        size = len(self.expression_set.members)
+        if size not in _hit_rasters:
+            _hit_rasters[size] = patch_raster(self.venn_diagram, size)
+        return _hit_rasters[size]
 
-        # Disabled areas should be marked black
-        for area_label, exps in self.expression_set.black.items():
-            for exp in exps:
-                area = self.venn_diagram.get_patch_by_id(
-                    self.expression_set.all_label[area_label])
-                area.set_alpha(1.0)
-                area.set_facecolor('black')
-                area_colors.append(area)
-                texts.append(str(exp))
+    def area_at(self, x, y):
+        """
+        :param x: x coordinate (in data coordinates of the axes)
+        :param y: y coordinate (in data coordinates of the axes)
+        :return: the label of the area (A, AB...) at the point, or None if the
+                 point is outside of all sets
+        """
+        if self.venn_diagram is None:
+            return None
+        region_id = self.hit_index().region_at(x, y)
+        for area_label, patch_id in self.expression_set.all_label.items():
+            if patch_id == region_id:
+                return area_label
+        return None
 
     def get_intersect_pos(self, areas: tuple):
         """
@@ -188,9 +394,14 @@ class VennDiagramPlt(object):
         """
         This function marks "X" symbol(s) on the edge line(s) between areas
         :param area_labels: labels of areas (A,B...)
+        :return: a list of the artists drawn
         """
+        if isinstance(self.venn_diagram, RegionVenn):
+            # The positions of get_intersect_pos only fit matplotlib_venn diagrams
+            return self.mark_regions(area_labels)
+        artists = []
         if len(area_labels) < 2:
-            return
+            return artists
         for i in range(len(area_labels)):
             for j in range(i + 1, len(area_labels)):
                 pos, rot = self.get_intersect_pos((area_labels[i], area_labels[j]))
@@ -205,15 +416,47 @@ class VennDiagramPlt(object):
                 else:
                     color = "black"
                     pos2 = None
+                ax = self.axes()
                 if pos2 is not None:
-                    plt.arrow(*(np.array(pos)+[0,0.03]), *((np.array(pos2)-np.array(pos))*0.5), head_width=0.02)
-                    plt.annotate('X', xy=pos2, rotation=rot2, xytext=(0, 0),
-                                 weight='bold', size=size, ha='center',
-                                 textcoords='offset points')
+                    artists.append(ax.arrow(*(np.array(pos)+[0,0.03]), *((np.array(pos2)-np.array(pos))*0.5), head_width=0.02))
+                    artists.append(ax.annotate('X', xy=pos2, rotation=rot2, xytext=(0, 0),
+                                               weight='bold', size=size, ha='center',
+                                               textcoords='offset points'))
                 # Draw the cross on the diagram
-                plt.annotate('X', xy=pos, rotation=rot, xytext=(0, 0), weight='bold',
-                             size=size, color=color, ha='center',
-                             textcoords='offset points')
+                artists.append(ax.annotate('X', xy=pos, rotation=rot, xytext=(0, 0),
+                                           weight='bold', size=size, color=color,
+                                           ha='center', textcoords='offset points'))
+        return artists
+
+    def mark_regions(self, area_labels: tuple):
+        """
+        This function marks a "X" symbol in each area that is not black and links
+        them by a line, for diagrams whose areas are not next to each other
+        :param area_labels: labels of areas (A,B...)
+        :return: a list of the artists drawn
+        """
+        positions = [np.array(self.venn_diagram.get_label_by_id(
+            self.expression_set.all_label[area_label]).get_position())
+            for area_label in area_labels
+            if area_label not in self.expression_set.black]
+        if len(positions) == 0:
+            return []
+        # Visit the areas in a short path so that the line does not zigzag
+        path = [positions.pop(0)]
+        while positions:
+            nearest = min(range(len(positions)),
+                          key=lambda i: np.hypot(*(positions[i] - path[-1])))
+            path.append(positions.pop(nearest))
+        ax = self.axes()
+        artists = []
+        if len(path) > 1:
+            artists.extend(ax.plot(*np.array(path).T, color="black", linewidth=1,
+                                   zorder=3))
+        for pos in path:
+            artists.append(ax.annotate('X', xy=pos, xytext=(0, 0), weight='bold',
+                                       size=8, ha='center', va='center',
+                                       textcoords='offset points', zorder=4))
+        return artists
 
     def mark_area(self, area: set, color="red", pattern='xxx'):
         """
@@ -228,12 +471,65 @@ class VennDiagramPlt(object):
                         '..' for possibly true
         """
         for area_label in area:
-            self.venn_diagram.get_patch_by_id(
-                self.expression_set.all_label[area_label]).set_edgecolor(color)
-            self.venn_diagram.get_patch_by_id(
-                self.expression_set.all_label[area_label]).set_linewidth(2)
-            self.venn_diagram.get_patch_by_id(
-                self.expression_set.all_label[area_label]).set_hatch(pattern)
+            patch = self.venn_diagram.get_patch_by_id(
+                self.expression_set.all_label[area_label])
+            if patch is None:
+                continue  # Left out of an Euler diagram
+            if patch not in self.marked:
+                self.marked[patch] = (patch.get_edgecolor(), patch.get_linewidth(),
+                                      patch.get_hatch())
+            patch.set_edgecolor(color)
+            patch.set_linewidth(2)
+            patch.set_hatch(pattern)
+
+    def clear_marks(self):
+        """
+        This function removes everything drawn by show_result, leaving the diagram
+        of the premises as created by create_diagram
+        """
+        for patch, (color, linewidth, pattern) in self.marked.items():
+            patch.set_edgecolor(color)
+            patch.set_linewidth(linewidth)
+            patch.set_hatch(pattern)
+        for artist in self.overlay:
+            artist.remove()
+        self.overlay, self.marked = [], dict()
+
+    def show_result(self, result: str, marked: set, exp=None):
+        """
+        This function displays the verdict of an argument on the diagram
+        :param result: the key of the verdict in expression_set.results
+        :param marked: a set containing the area labels supporting/refuting the
+                       argument
+        :param exp: the argument being validated, or None if it should not be
+                    displayed
+        """
+        verdict = expression_set.results[result]
+        self.mark_area(marked, color=verdict["color"], pattern=verdict["pattern"])
+        self.show_validatity(verdict["validity"] and verdict["must"])
+        if exp is not None:
+            self.show_argument(exp)
+
+    def caption(self, text, row, size):
+        """
+        This function writes a line of text under the diagram
+        :param text: the text
+        :param row: 0 for the bottom line, 1 for the line above it
+        :param size: the font size of a full size diagram
+        """
+        if self.panel:
+            annotation = self.axes().annotate(
+                text, xy=(0.5, -0.04 - 0.12 * (1 - row)), rotation=0,
+                xytext=(0, 0), xycoords='axes fraction', size=size * 0.5,
+                ha='center', va='top', textcoords='offset points',
+                annotation_clip=False)
+        else:
+            annotation = self.axes().annotate(
+                text, xy=(0.5, 0.02 + 0.06 * row), rotation=0, xytext=(0, 0),
+                xycoords='figure fraction', size=size, ha='center',
+                textcoords='offset points')
+        self.overlay.append(annotation)
+        return annotation
 
     def show_validatity(self, is_valid: bool):
         """
@@ -246,17 +542,441 @@ class VennDiagramPlt(object):
         else:
             text = "  INVALID ARGUMENT"
             color = hex_to_rgba("#8B0000")
-        plt.annotate(text, xy=(0.5, 0.02), rotation=0, xytext=(0, 0),
-                     xycoords='figure fraction',
-                     size=22,
-                     ha='center', textcoords='offset points')
+        self.caption(text, 0, 22)
 
     def show_argument(self, exp):
         """
         This function displays the expression being validated on the diagram
         :param exp: the argument being validated
         """
-        plt.annotate(str(exp), xy=(0.5, 0.08), rotation=0, xytext=(0, 0),
-                     xycoords='figure fraction',
-                     size=13,
-                     ha='center', textcoords='offset points')
\ No newline at end of file
+        self.caption(str(exp), 1, 13)
+
+    def show_witness(self, witness):
+        """
+        This function displays a world built by ExpressionSet.witness: a dot in each
+        inhabited area and a gray hatch on the other areas that are not black
+        :param witness: a Witness
+        """
+        ax = self.axes()
+        for area_label in witness.inhabited:
+            pos = self.venn_diagram.get_label_by_id(
+                self.expression_set.all_label[area_label]).get_position()
+            self.overlay.append(ax.annotate('\u25cf', xy=pos, xytext=(0, 0),
+                                            size=14, ha='center', va='center',
+                                            color='#1f4fbf', zorder=5,
+                                            textcoords='offset points'))
+        self.mark_area(witness.empty - self.expression_set.black.keys(),
+                       color="gray", pattern="--")
+        self.caption("  EXAMPLE" if witness.holds else "  COUNTEREXAMPLE", 0, 22)
+        self.show_argument(witness.exp)
+
+    # ===============================================================================
+    #                              Batch export
+    # ===============================================================================
+    def export_conclusions(self, conclusions, filename, ncols=4, highlight_some=True,
+                           multipage=None, euler=False):
+        """
+        This function evaluates several arguments against the premises and exports
+        all of them at once. The premises are only parsed once; each argument only
+        adds its hatching and text to the diagram of the premises
+        :param conclusions: a list of Expression objects being validated
+        :param filename: the exported file
+        :param ncols: the number of panels in each row of the grid
+        :param highlight_some: a flag to determine whether to highlight "Some"
+                               premises using a background color
+        :param multipage: if True, each argument is a page of a pdf file instead of
+                          a panel of a grid. Defaults to True for ".pdf" files
+        :param euler: a flag to draw Euler diagrams (see create_diagram)
+        """
+        if len(self.expression_set.all_label) == 0:
+            self.expression_set.parse_premises()
+        if multipage is None:
+            multipage = filename.lower().endswith(".pdf")
+        if multipage:
+            self.export_pages(conclusions, filename, highlight_some, euler)
+        else:
+            self.export_grid(conclusions, filename, ncols, highlight_some, euler)
+
+    def show_conclusion(self, exp):
+        """
+        This function displays the verdict of an argument on the diagram without
+        changing the result of the expression set
+        :param exp: the argument being validated
+        """
+        result, marked = self.expression_set.judge(exp)
+        if result is None:
+            self.caption("Set name(s) not found", 0, 22)
+            self.show_argument(exp)
+        else:
+            self.show_result(result, marked, exp)
+
+    def export_grid(self, conclusions, filename, ncols=4, highlight_some=True,
+                    euler=False):
+        """
+        This function draws every argument as a panel of a grid in a single figure
+        :param conclusions: a list of Expression objects being validated
+        :param filename: the exported image file
+        :param ncols: the number of panels in each row of the grid
+        :param highlight_some: a flag to determine whether to highlight "Some"
+                               premises
+        :param euler: a flag to draw Euler diagrams (see create_diagram)
+        """
+        ncols = max(1, min(ncols, len(conclusions)))
+        nrows = max(1, -(-len(conclusions) // ncols))
+        fig = plt.figure(figsize=(3.2 * ncols, 3.6 * nrows))
+        # The diagram of the premises is drawn once, the other panels copy it
+        base = VennDiagramPlt(self.expression_set, ax=fig.add_subplot(nrows, ncols, 1),
+                              panel=True)
+        base.create_diagram(highlight_some, euler)
+        panels = [base] + [base.copy_to(fig.add_subplot(nrows, ncols, i + 1))
+                           for i in range(1, len(conclusions))]
+        for panel, exp in zip(panels, conclusions):
+            panel.show_conclusion(exp)
+        fig.subplots_adjust(hspace=0.45)
+        fig.savefig(filename)
+        plt.close(fig)
+
+    def copy_to(self, ax):
+        """
+        This function copies the diagram drawn by create_diagram to other axes,
+        without computing its layout again
+        :param ax: the matplotlib axes of the copy
+        :return: the VennDiagramPlt of the copy
+        """
+        copy = VennDiagramPlt(self.expression_set, ax=ax, panel=self.panel)
+        copy.euler, copy.colors = self.euler, self.colors
+        source = self.axes()
+        copies = dict()  # artist of this diagram -> its copy
+        texts = set(source.texts)
+        for artist in source.get_children():
+            if isinstance(artist, Patch) and artist is not source.patch:
+                # add_artist does not update the data limits, they are copied below
+                copies[artist] = ax.add_artist(PathPatch(
+                    artist.get_path().transformed(artist.get_patch_transform()),
+                    facecolor=artist.get_facecolor(), edgecolor=artist.get_edgecolor(),
+                    linewidth=artist.get_linewidth(), linestyle=artist.get_linestyle(),
+                    hatch=artist.get_hatch(), fill=artist.get_fill(),
+                    zorder=artist.get_zorder(), visible=artist.get_visible()))
+            elif isinstance(artist, Annotation):
+                copies[artist] = ax.annotate(
+                    artist.get_text(), xy=artist.xy, xycoords=artist.xycoords,
+                    xytext=artist.xyann, textcoords=artist.anncoords,
+                    fontproperties=artist.get_fontproperties(),
+                    color=artist.get_color(), rotation=artist.get_rotation(),
+                    ha=artist.get_ha(), va=artist.get_va(), zorder=artist.get_zorder())
+            elif artist in texts:  # Not the titles of the axes
+                copies[artist] = ax.text(
+                    *artist.get_position(), artist.get_text(),
+                    fontproperties=artist.get_fontproperties(),
+                    color=artist.get_color(), rotation=artist.get_rotation(),
+                    ha=artist.get_ha(), va=artist.get_va(), zorder=artist.get_zorder(),
+                    visible=artist.get_visible())
+            elif isinstance(artist, Line2D):
+                copies[artist] = ax.plot(
+                    *artist.get_data(), color=artist.get_color(),
+                    linewidth=artist.get_linewidth(), zorder=artist.get_zorder(),
+                    scalex=False, scaley=False)[0]
+        ax.set_xlim(source.get_xlim())
+        ax.set_ylim(source.get_ylim())
+        ax.set_aspect(source.get_aspect())
+        if not source.axison:
+            ax.set_axis_off()
+        copy.venn_diagram = CopiedVenn(self.venn_diagram, copies,
+                                       self.expression_set.all_label.values())
+        return copy
+
+    def export_pages(self, conclusions, filename, highlight_some=True, euler=False):
+        """
+        This function writes every argument as a page of a pdf file. The diagram of
+        the premises is drawn once and only the marks of each argument are replaced
+        between pages
+        :param conclusions: a list of Expression objects being validated
+        :param filename: the exported pdf file
+        :param highlight_some: a flag to determine whether to highlight "Some"
+                               premises
+        :param euler: a flag to draw an Euler diagram (see create_diagram)
+        """
+        from matplotlib.backends.backend_pdf import PdfPages
+        fig = plt.figure()
+        page = VennDiagramPlt(self.expression_set, ax=fig.add_subplot())
+        page.create_diagram(highlight_some, euler)
+        with PdfPages(filename) as pdf:
+            for exp in conclusions:
+                page.show_conclusion(exp)
+                pdf.savefig(fig)
+                page.clear_marks()
+        plt.close(fig)
+
+    def export_bytes(self, formats=("png",)):
+        """
+        This function exports the figure of the diagram in several formats at once,
+        without writing any file. The figure is rasterized once for each resolution:
+        every raster format of the same resolution is encoded from the same pixels
+        of the Agg renderer, and vector formats are written to memory buffers
+        :param formats: a list of formats ("png", "svg", "pdf"...), a raster format
+                        may have a resolution after "@", e.g. "png@200". A format
+                        without a resolution uses the resolution of savefig
+        :return: a dict of each format in formats -> the bytes of the file, in the
+                 order of formats
+        """
+        import io
+        import matplotlib
+        import matplotlib.image
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = self.axes().figure
+        default_dpi = matplotlib.rcParams["savefig.dpi"]
+        if default_dpi == "figure":
+            default_dpi = fig.dpi
+        raster = dict()  # resolution -> raster formats
+        vector = []
+        for spec in formats:
+            fmt, _, dpi = spec.lower().partition("@")
+            if fmt in RASTER_FORMATS:
+                try:
+                    dpi = float(dpi) if dpi else float(default_dpi)
+                except ValueError:
+                    raise ValueError("ERROR: Invalid resolution in \"{}\"".format(spec))
+                raster.setdefault(dpi, []).append((spec, fmt))
+            elif fmt in fig.canvas.get_supported_filetypes() and dpi == "":
+                vector.append((spec, fmt))
+            else:
+                raise ValueError("ERROR: Unsupported export format \"{}\"".format(spec))
+
+        ret = dict()
+        # The canvas of the window (if any) is kept away from the renderings
+        window_canvas, figure_dpi = fig.canvas, fig.dpi
+        canvas = FigureCanvasAgg(fig)
+        try:
+            for dpi, specs in raster.items():
+                fig.set_dpi(dpi)
+                canvas.draw()
+                pixels = canvas.buffer_rgba()
+                for spec, fmt in specs:
+                    buffer = io.BytesIO()
+                    matplotlib.image.imsave(buffer, pixels,
+                                            format=RASTER_FORMATS[fmt],
+                                            origin="upper", dpi=dpi)
+                    ret[spec] = buffer.getvalue()
+            fig.set_dpi(figure_dpi)
+            for spec, fmt in vector:
+                buffer = io.BytesIO()
+                fig.savefig(buffer, format=fmt)
+                ret[spec] = buffer.getvalue()
+        finally:
+            fig.set_dpi(figure_dpi)
+            fig.set_canvas(window_canvas)
+        return {spec: ret[spec] for spec in formats}
+
+    # ===============================================================================
+    #                              Animation export
+    # ===============================================================================
+    def animation_frames(self, highlight_some=True, figsize=None, dpi=None):
+        """
+        This function draws how the diagram is built premise by premise, in the order
+        the premises were added. Only the diagram without premises is drawn in full:
+        it has black outlines and names on white areas, so an area changing color is
+        painted by multiplying its pixels by the new color. Every mark and caption
+        is drawn once, alone, on a transparent layer; the pixels around each change
+        are then laid again from the kept marks over the painted areas
+        :param highlight_some: a flag to determine whether to highlight "Some"
+                               premises
+        :param figsize: the size of the frames in inches (the default figure size if
+                        None)
+        :param dpi: the resolution of the frames (the default resolution if None)
+        :return: a list of (height, width, 4) uint8 arrays of RGBA pixels: the empty
+                 diagram and the diagram after each premise
+        """
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from matplotlib.text import Text
+        from matplotlib.transforms import Bbox
+        if len(self.expression_set.all_label) == 0:
+            self.expression_set.parse_premises()
+        # The premises are applied one by one to a copy of the diagram without them
+        staged = expression_set.ExpressionSet()
+        staged.members = set(self.expression_set.members)
+        staged.all_label = dict(self.expression_set.all_label)
+        fig = Figure(figsize=figsize, dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        painter = VennDiagramPlt(staged, ax=fig.add_subplot())
+        painter.draw_base()
+        ax = painter.axes()
+        canvas.draw()
+        base = set(ax.get_children())
+        frame = np.asarray(canvas.buffer_rgba()).copy()
+        blank = frame[..., :3].astype(np.float32)  # The diagram without premises
+        frames = [frame.copy()]
+        # The mask of the area at the center of every pixel. The axes are not
+        # rotated, so the x of a pixel only depends on its column
+        height, width = frame.shape[:2]
+        inverse = ax.transData.inverted()
+        x = inverse.transform(np.column_stack([np.arange(width) + 0.5,
+                                               np.zeros(width)]))[:, 0]
+        y = inverse.transform(np.column_stack([np.zeros(height),
+                                               height - np.arange(height) - 0.5]))[:, 1]
+        index = painter.hit_index().masks_at(x[None, :], y[:, None])
+        colors = np.ones((2 ** len(staged.members), 3), dtype=np.float32)
+        # From now on the canvas only has the marks, on a transparent background.
+        # Every mark is drawn once, alone, and its pixels are kept
+        renderer = canvas.get_renderer()
+        renderer.clear()
+        marked = np.asarray(canvas.buffer_rgba())
+        sprites = dict()  # mark -> its pixels, its colors and their opacity
+        extents = dict()  # artist -> its window extent, artists are never moved
+
+        def extent(artist):
+            if artist not in extents:
+                extents[artist] = artist.get_window_extent(renderer)
+            return extents[artist]
+
+        def window(box):
+            # The whole pixels around a box, as rows and columns
+            x0, y0, x1, y1 = box.extents
+            x0, y0 = max(int(np.floor(x0)) - 2, 0), max(int(np.floor(y0)) - 2, 0)
+            x1, y1 = min(int(np.ceil(x1)) + 2, width), min(int(np.ceil(y1)) + 2, height)
+            return slice(height - max(y1, y0), height - y0), slice(x0, max(x1, x0))
+
+        def look(artist):
+            # What decides the pixels of a mark
+            if isinstance(artist, Text):
+                return (artist.get_text(), str(artist.get_color()), artist.get_rotation(),
+                        artist.get_fontsize(), artist.get_weight(),
+                        extent(artist).bounds)
+            if isinstance(artist, Line2D):
+                return (artist.get_xydata().tobytes(), str(artist.get_color()),
+                        artist.get_linewidth())
+            return artist
+
+        def sprite(artist):
+            pixels = window(extent(artist))
+            rows, cols = pixels
+            marked[pixels] = 0
+            if rows.start < rows.stop and cols.start < cols.stop:
+                clip_box, clip_on = artist.get_clip_box(), artist.get_clip_on()
+                artist.set_clip_box(Bbox.from_extents(cols.start, height - rows.stop,
+                                                      cols.stop, height - rows.start))
+                artist.set_clip_on(True)
+                artist.draw(renderer)
+                artist.set_clip_box(clip_box)
+                artist.set_clip_on(clip_on)
+            layer = marked[pixels].astype(np.float32)
+            return pixels, layer[..., :3], layer[..., 3:] / np.float32(255)
+
+        def compose(pixels, overlay):
+            # Lay the marks, in the order of a full draw, over the painted areas
+            rows, cols = pixels
+            out = blank[pixels] * colors[index[pixels]]
+            for artist in overlay:
+                (mark_rows, mark_cols), rgb, alpha = sprites[artist]
+                r0, r1 = max(rows.start, mark_rows.start), min(rows.stop, mark_rows.stop)
+                c0, c1 = max(cols.start, mark_cols.start), min(cols.stop, mark_cols.stop)
+                if r0 >= r1 or c0 >= c1:
+                    continue
+                inside = (slice(r0 - rows.start, r1 - rows.start),
+                          slice(c0 - cols.start, c1 - cols.start))
+                part = (slice(r0 - mark_rows.start, r1 - mark_rows.start),
+                        slice(c0 - mark_cols.start, c1 - mark_cols.start))
+                out[inside] = rgb[part] * alpha[part] + out[inside] * (1 - alpha[part])
+            frame[pixels + (slice(0, 3),)] = np.rint(out)
+
+        marks = dict()  # area labels of a "Some" premise -> the artists of its X
+        caption = None
+        total = len(self.expression_set.relations)
+        for number, exp in enumerate(self.expression_set.relations, start=1):
+            changed, moved = set(), []  # moved: marks added, or boxes of removed ones
+            support, against = self.expression_set.parse(exp)
+            if exp.lhs.some:
+                if support not in staged.cross:
+                    staged.cross[support] = []
+                    marks[support] = painter.draw_cross(support, highlight_some)
+                    moved.extend(marks[support])
+                    if highlight_some:
+                        changed.update(set(support) - staged.black.keys())
+                staged.cross[support].append(exp)
+            if exp.lhs.all:
+                blacked = set(against) - staged.black.keys()
+                for area_label in against:
+                    staged.black.setdefault(area_label, []).append(exp)
+                for area_label in blacked:
+                    painter.draw_black(area_label)
+                changed.update(blacked)
+                # The X of a "Some" premise moves away from areas turned black
+                for area_labels in marks:
+                    if not blacked.intersection(area_labels):
+                        continue
+                    # The marks drawn at the same place again are kept
+                    kept = {look(artist): artist for artist in marks[area_labels]}
+                    marks[area_labels] = painter.draw_cross(area_labels,
+                                                            highlight_some)
+                    for i, artist in enumerate(marks[area_labels]):
+                        if kept.get(look(artist)) is not None:
+                            marks[area_labels][i] = kept.pop(look(artist))
+                            artist.remove()
+                        else:
+                            moved.append(artist)
+                    for artist in kept.values():
+                        moved.append(extent(artist))
+                        sprites.pop(artist)
+                        artist.remove()
+            if caption is not None:
+                moved.append(extent(caption))
+                sprites.pop(caption)
+                caption.remove()
+            caption = ax.annotate("{}/{}  {}".format(number, total, exp),
+                                  xy=(0.5, 0.08), xycoords='figure fraction',
+                                  size=13, ha='center', textcoords='offset points',
+                                  xytext=(0, 0))
+            moved.append(caption)
+
+            # Only the new marks are drawn, the pixels around every change are
+            # laid again from the kept ones
+            overlay = [artist for artist in ax.get_children()
+                       if artist not in base and artist.get_visible() and
+                       not (isinstance(artist, Text) and artist.get_text() == "")]
+            overlay.sort(key=lambda artist: artist.get_zorder())
+            windows = []
+            for artist in moved:
+                if isinstance(artist, Bbox):
+                    windows.append(window(artist))
+                else:
+                    sprites[artist] = sprite(artist)
+                    windows.append(sprites[artist][0])
+            for area_label in changed:
+                area = painter.venn_diagram.get_patch_by_id(staged.all_label[area_label])
+                colors[int(staged.all_label[area_label], 2)] = area.get_facecolor()[:3]
+                windows.append(window(extent(area)))
+            windows = {(rows.start, rows.stop, cols.start, cols.stop)
+                       for rows, cols in windows}
+            for r0, r1, c0, c1 in windows:
+                # A window inside another one is laid with it
+                if not any(other != (r0, r1, c0, c1) and other[0] <= r0 and
+                           r1 <= other[1] and other[2] <= c0 and c1 <= other[3]
+                           for other in windows):
+                    compose((slice(r0, r1), slice(c0, c1)), overlay)
+            frames.append(frame.copy())
+        return frames
+
+    def export_animation(self, filename, interval=1000, highlight_some=True):
+        """
+        This function exports how the diagram is built premise by premise
+        :param filename: a .gif or .png (animated png) file, or a directory in which
+                         every frame is written to a png file
+        :param interval: milliseconds each premise is shown (the last one is shown
+                         three times as long)
+        :param highlight_some: a flag to determine whether to highlight "Some"
+                               premises
+        """
+        from PIL import Image
+        images = [Image.fromarray(frame) for frame in
+                  self.animation_frames(highlight_some)]
+        extension = os.path.splitext(filename)[1].lower()
+        if extension in (".gif", ".png"):
+            if extension == ".gif":
+                images = [image.convert("RGB") for image in images]
+            durations = [interval] * (len(images) - 1) + [interval * 3]
+            images[0].save(filename, save_all=True, append_images=images[1:],
+                           duration=durations, loop=0)
+        else:
+            os.makedirs(filename, exist_ok=True)
+            for number, image in enumerate(images):
+                image.save(os.path.join(filename, "frame_{:03d}.png".format(number)))
@@ -1,18 +1,60 @@
 import argparse
+import functools
 import os
 import sys
-
-import tkinter as tk
-from tkinter.scrolledtext import ScrolledText
-
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
+import time
 
 from expression import Expression
-from expression_set import ExpressionSet
+from expression_set import ExpressionSet, normalize_premises
+import premise_library
+from venn_watch import FileWatcher, diagram_state
+
+# tkinter and matplotlib take most of the startup time, so they are only imported
+# when a window or an image is needed (see load_window and load_pyplot)
+tk = None
+ScrolledText = None
+FigureCanvasTkAgg = None
+BackgroundWorker = None
+plt = None
+
+
+def load_pyplot(backend=None):
+    """
+    Import matplotlib.pyplot as the global plt
+    :param backend: the matplotlib backend to use, e.g. "Agg" to draw images only
+    """
+    global plt
+    if plt is None:
+        import matplotlib
+        if backend is not None:
+            matplotlib.use(backend)
+        import matplotlib.pyplot
+        plt = matplotlib.pyplot
+    return plt
+
+
+def load_window(use_matplotlib=True):
+    """
+    Import tkinter and the Tk backend of matplotlib as globals
+    :param use_matplotlib: if False, matplotlib is not imported, the diagram is drawn
+                           on a Tk canvas
+    """
+    global tk, ScrolledText, FigureCanvasTkAgg, BackgroundWorker
+    import tkinter
+    import tkinter.filedialog
+    import tkinter.messagebox
+    import tkinter.scrolledtext
+    from venn_worker import BackgroundWorker
+    tk = tkinter
+    ScrolledText = tkinter.scrolledtext.ScrolledText
+    if use_matplotlib:
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        load_pyplot()
 
 
 class VennGUI(object):
+    PREVIEW_DELAY = 300  # Milliseconds after the last key stroke to update the diagram
+
     def __init__(self, argv):
         """
         :param argv: arguments for running the program
@@ -31,6 +73,43 @@ class VennGUI(object):
         parser.add_argument("--export", help="Export the result to an image file "
                                              "(Need -f and --no_window argument)",
                             type=str)
+        parser.add_argument("--conclusions", help="Read the arguments being validated "
+                                                  "from local file, one per line, and "
+                                                  "export all of them in one image "
+                                                  "(Need -f, --no_window and --export "
+                                                  "argument)",
+                            type=str)
+        parser.add_argument("--show_plot", help="Show the diagram in a matplotlib "
+                                                "window instead of printing the "
+                                                "verdicts (Need --no_window argument)",
+                            action="store_true")
+        parser.add_argument("--watch", help="Keep running and export again whenever "
+                                            "the premises or the conclusions file "
+                                            "changes (Need -f, --no_window and "
+                                            "--export argument)",
+                            action="store_true")
+        parser.add_argument("--interval", help="Seconds between checks of the "
+                                               "watched files (default 0.1)",
+                            type=float, default=0.1)
+        parser.add_argument("--witness", help="Show a world where the argument is "
+                                              "false instead of the verdict, or "
+                                              "print it after the verdict (Need "
+                                              "--no_window argument)",
+                            action="store_true")
+        parser.add_argument("--tk_canvas", help="Draw the diagram with Tk canvas "
+                                                "items instead of matplotlib, which "
+                                                "starts and redraws faster",
+                            action="store_true")
+        parser.add_argument("--animation", help="Export how the diagram is built "
+                                                "premise by premise to a .gif or .png "
+                                                "file, or to a directory of frames "
+                                                "(Need -f and --no_window argument)",
+                            type=str)
+        parser.add_argument("--euler", help="Draw an Euler diagram of two or three "
+                                            "sets, which leaves out the areas "
+                                            "disabled by \"All\" premises instead "
+                                            "of painting them black",
+                            action="store_true")
         self.args = parser.parse_args(argv[1:])
         # Basic components
         self.filename = ""
@@ -38,13 +117,20 @@ class VennGUI(object):
         self.collect = None
         self.root = None
         self.fig = None
+        self.canvas_diagram = None  # The TkVennDiagram with the --tk_canvas argument
         self.msg_text = None
         self.msg_label = None
         self.premises_box = None
+        self.checker = None  # The PremiseChecker of the premises box
+        self.diagnostic_view = None  # The DiagnosticView of the premises box
+        self.last_checked = None  # The premises of the latest check
         self.show_btn = None
         self.is_possible_highlight = None
         self.show_exp_in_diagram = None
         self.eval_box = None
+        self.worker = None
+        self.last_preview = None
+        self.shown = None  # The ExpressionSet and highlight option of the figure
         if not self.args.no_window:
             self.set_up()
 
@@ -54,23 +140,16 @@ class VennGUI(object):
     def run(self):
         """
         Start the GUI window
+        :return: the exit status
         """
         if self.args.no_window:
-            s = ExpressionSet()
-            if self.args.filename:
-                with open(self.args.filename, 'r', encoding='utf8') as f:
-                    premises = f.read()
-                s.add_premises(premises)
-                s.parse_premises()
-                s.display_diagram()
-                if self.args.eval:
-                    ret = s.evaluate(Expression(self.args.eval), show=True)
-                if self.args.export:
-                    plt.savefig(self.args.export)
-                else:
-                    plt.show(block=True)
-            else:
+            if not self.args.filename:
                 print("ERROR: No premises found.", file=sys.stderr)
+                return 1
+            elif self.args.watch and self.args.export:
+                self.watch()
+            else:
+                return self.run_without_window()
         else:
             if self.args.filename:
                 self.filepath = self.args.filename
@@ -83,12 +162,153 @@ class VennGUI(object):
             self.root.deiconify()
             self.root.mainloop()
 
+    # ===============================================================================
+    #                         Operations without a window
+    # ===============================================================================
+    def run_without_window(self):
+        """
+        Validate the arguments and export or print the result. Unless the diagram is
+        exported or shown, matplotlib is never imported.
+        :return: the exit status
+        """
+        try:
+            s = self.read_premises()
+            conclusions = self.read_conclusions()
+            if self.args.eval:
+                exp = Expression(self.args.eval)
+        except (OSError, SyntaxError, TypeError, ValueError) as e:
+            print(e, file=sys.stderr)
+            return 1
+        if self.args.animation and self.args.euler:
+            # The areas of an Euler diagram depend on all premises, not the first ones
+            print("ERROR: --euler cannot be used with --animation", file=sys.stderr)
+            return 1
+        if self.args.export or self.args.animation:
+            # Every path that writes files draws without a display
+            load_pyplot("Agg")
+            if self.args.export:
+                self.export(s, conclusions)
+            if self.args.animation:
+                s.venn_diagram.export_animation(self.args.animation)
+        elif self.args.show_plot:
+            load_pyplot()
+            s.display_diagram(euler=self.args.euler)
+            if self.args.eval:
+                s.evaluate(exp, show=True)
+            plt.show(block=True)
+        else:
+            arguments = conclusions if conclusions is not None else []
+            if self.args.eval:
+                arguments = [exp] + arguments
+            for exp in arguments:
+                result, marked = s.judge(exp)
+                print("{}\t{}".format(result if result else "UNKNOWN", exp))
+                if self.args.witness and result is not None:
+                    # Arguments with unknown set names have no world to look for
+                    witness = s.witness(exp)
+                    print("\t{}".format(witness if witness is not None else
+                                        "No counterexample"))
+            if len(arguments) == 0:
+                print(s, end="")
+        return 0
+
+    def read_premises(self):
+        """
+        :return: a parsed ExpressionSet of the premises file
+        """
+        with open(self.args.filename, 'r', encoding='utf8') as f:
+            premises = f.read()
+        s = ExpressionSet()
+        s.add_premises(premises,
+                       directory=os.path.dirname(os.path.abspath(self.args.filename)))
+        s.parse_premises()
+        return s
+
+    def read_conclusions(self):
+        """
+        :return: a list of the arguments in the conclusions file, or None if there is
+                 no conclusions file
+        """
+        if not self.args.conclusions:
+            return None
+        with open(self.args.conclusions, 'r', encoding='utf8') as f:
+            return [Expression(line.strip()) for line in f if line.strip() != ""]
+
+    def export(self, s, conclusions=None):
+        """
+        Export the diagram of the premises to the export file
+        :param s: a parsed ExpressionSet
+        :param conclusions: a list of arguments exported together, or None to export
+                            the diagram with the argument of the -e argument
+        """
+        if conclusions is not None:
+            s.venn_diagram.export_conclusions(conclusions, self.args.export,
+                                              euler=self.args.euler)
+            return
+        plt.clf()
+        s.display_diagram(euler=self.args.euler)
+        if self.args.eval:
+            exp = Expression(self.args.eval)
+            witness = s.witness(exp) if self.args.witness else None
+            if witness is not None:
+                s.venn_diagram.show_witness(witness)
+            else:
+                s.evaluate(exp, show=True)
+        plt.savefig(self.args.export)
+
+    def watch(self):
+        """
+        Export the diagram, then poll the premises and conclusions files and export
+        again when a file changes. Only the changed file is read again, and the
+        export is skipped if the diagram and the verdicts stay the same.
+        """
+        load_pyplot("Agg")
+        paths = [self.args.filename]
+        if self.args.conclusions:
+            paths.append(self.args.conclusions)
+        watcher = FileWatcher(paths)
+        s, conclusions, state = None, None, None
+        try:
+            while True:
+                changed = watcher.changed()
+                if self.args.filename not in changed and \
+                        premise_library.LIBRARIES.stale():
+                    # A file included by the premises changed
+                    changed.append(self.args.filename)
+                if changed:
+                    try:
+                        if self.args.filename in changed:
+                            s = self.read_premises()
+                        if self.args.conclusions in changed:
+                            conclusions = self.read_conclusions()
+                        if s is not None:
+                            arguments = conclusions if conclusions is not None else \
+                                [Expression(self.args.eval)] if self.args.eval else []
+                            verdicts = [(exp,) + s.judge(exp) for exp in arguments]
+                            if diagram_state(s, verdicts) != state:
+                                start = time.perf_counter()
+                                self.export(s, conclusions)
+                                state = diagram_state(s, verdicts)
+                                print("Exported {} ({:.0f} ms)".format(
+                                    self.args.export,
+                                    (time.perf_counter() - start) * 1000))
+                    except (OSError, SyntaxError, TypeError, ValueError) as e:
+                        print(e, file=sys.stderr)
+                time.sleep(self.args.interval)
+        except KeyboardInterrupt:
+            pass
+
     def clear(self):
         """ Empty the diagram, premises box and evaluation box """
         self.premises_box.delete('1.0', tk.END)
         self.msg_text.set("")
         self.eval_box.delete(0, tk.END)
-        plt.clf()
+        self.check_premises()
+        if self.canvas_diagram is not None:
+            self.canvas_diagram.clear()
+        else:
+            plt.clf()
+        self.shown = None
 
     def quit(self):
         """ Quit the program """
@@ -99,6 +319,7 @@ class VennGUI(object):
                 return
             if save_before_exit:
                 self.save()
+        self.worker.shutdown()
         self.root.quit()
 
     # ===============================================================================
@@ -107,18 +328,27 @@ class VennGUI(object):
     def set_up(self):
         """ Set up all GUI components """
         # Set up the venn
+        load_window(use_matplotlib=not self.args.tk_canvas)
         self.collect = ExpressionSet()
 
         # Set up GUI
         self.root = tk.Tk()
         self.root.title("Venn Diagram Interpreter")
         self.root.withdraw()
+        self.worker = BackgroundWorker(self.root)
         tk.Grid.rowconfigure(self.root, 0, weight=1)
         tk.Grid.columnconfigure(self.root, 0, weight=1)
-        self.fig = plt.figure(1)
-
-        canvas = FigureCanvasTkAgg(self.fig, master=self.root)
-        plot_widget = canvas.get_tk_widget()
+        if self.args.tk_canvas:
+            from venn_canvas import TkVennDiagram
+            plot_widget = tk.Canvas(self.root, width=640, height=480,
+                                    background="white", highlightthickness=0)
+            plot_widget.bind("<Button-1>", self.inspect_canvas_area)
+            self.canvas_diagram = TkVennDiagram(plot_widget)
+        else:
+            self.fig = plt.figure(1)
+            canvas = FigureCanvasTkAgg(self.fig, master=self.root)
+            canvas.mpl_connect("button_press_event", self.inspect_area)
+            plot_widget = canvas.get_tk_widget()
 
         # The main panel
         plot_widget.grid(row=0, column=0, columnspan=2,
@@ -135,7 +365,7 @@ class VennGUI(object):
                  text="Sytnax: (Use quote or a newline to separate)").grid(
             row=2, sticky="w", columnspan=2)
         tk.Label(self.root,
-                 text="\tSet (total 3 at most): The name of the set, "
+                 text="\tSet (total 6 at most): The name of the set, "
                       "use a quote(\"\") if it contains multiple words").grid(
             row=3, sticky="w", columnspan=2)
         tk.Label(self.root,
@@ -150,6 +380,20 @@ class VennGUI(object):
         self.premises_box.grid(row=FIRST_ROW_OF_PREMISE_BOX, column=0, sticky="nsew",
                                rowspan=PREMISE_BOX_HEIGHT)
 
+        # Problems of each line: underlined in the box, marked in a gutter on its left
+        from premise_diagnostics import DiagnosticView, PremiseChecker
+        gutter = tk.Canvas(self.premises_box.frame, width=14, highlightthickness=0)
+        gutter.pack(side=tk.LEFT, fill=tk.Y, before=self.premises_box)
+        self.checker = PremiseChecker()
+        self.diagnostic_view = DiagnosticView(self.premises_box, gutter,
+                                              self.show_line_message)
+
+        def premises_scrolled(first, last):
+            self.premises_box.vbar.set(first, last)
+            self.diagnostic_view.redraw()
+
+        self.premises_box.configure(yscrollcommand=premises_scrolled)
+
         def premises_modified(event):
             curr_title = self.root.title()
             if self.premises_box.edit_modified():
@@ -166,6 +410,7 @@ class VennGUI(object):
             return "break"
 
         self.premises_box.bind("<Tab>", focus_next_widget)
+        self.premises_box.bind("<KeyRelease>", self.preview, add="+")
 
         self.show_btn = tk.Button(self.root, text="Show diagram",
                                   command=self.show_diagram)
@@ -204,6 +449,7 @@ class VennGUI(object):
         self.eval_box.grid(row=FIRST_ROW_OF_PREMISE_BOX + PREMISE_BOX_HEIGHT + 3,
                            column=0, sticky="ew")
         self.eval_box.bind("<Return>", lambda e: self.evaluate_exp())
+        self.eval_box.bind("<KeyRelease>", self.preview, add="+")
 
         eval_btn = tk.Button(self.root, text="Evaluate", command=self.evaluate_exp)
         eval_btn.grid(row=FIRST_ROW_OF_PREMISE_BOX + PREMISE_BOX_HEIGHT + 3,
@@ -263,75 +509,285 @@ class VennGUI(object):
     # "Show" button
     def show_diagram(self):
         """ Displays the diagram with existing premises """
-        plt.clf()
-        self.msg_text.set("")
-        # Create the ExpressionSet object
-        self.collect = ExpressionSet()
-        if self.premises_box.get("1.0", tk.END) == "":
+        self.worker.cancel("preview")
+        self.last_preview = (self.premises_box.get("1.0", tk.END), None)
+        premises = self.last_preview[0]
+        directory = self.premises_directory()
+        self.worker.submit("preview", lambda: VennGUI.prepare(
+            premises, "", self.args.euler, directory), self.present)
+        self.check_premises()
+
+    # "Update" button
+    def evaluate_exp(self):
+        """ Evaluate an argument and displays the result """
+        self.worker.cancel("preview")
+        self.last_preview = (self.premises_box.get("1.0", tk.END), self.eval_box.get())
+        premises, conclusion = self.last_preview
+        directory = self.premises_directory()
+
+        def evaluate():
+            prepared = VennGUI.prepare(premises, conclusion, self.args.euler,
+                                       directory)
+            if prepared["collect"].empty():
+                prepared["message"], prepared["color"] = "The diagram is empty!", "red"
+            return prepared
+        self.worker.submit("preview", evaluate, self.present)
+
+    # Typing in the premises box or the evaluation box
+    def preview(self, event=None):
+        """
+        Evaluates the premises and the argument on the worker thread shortly after
+        the last edit, and displays the result when it is ready
+        """
+        premises, conclusion = self.premises_box.get("1.0", tk.END), self.eval_box.get()
+        if (premises, conclusion) == self.last_preview:
             return
+        self.last_preview = (premises, conclusion)
+        directory = self.premises_directory()
+        self.worker.submit("preview", lambda: VennGUI.prepare(
+            premises, conclusion, self.args.euler, directory), self.present,
+            delay=VennGUI.PREVIEW_DELAY)
+        self.check_premises()
+
+    def check_premises(self):
+        """
+        Finds the problems of each line of the premises on the worker thread and
+        marks them in the premises box. Only the lines changed since the last check
+        are parsed again
+        """
+        premises = self.premises_box.get("1.0", "end-1c")
+        # Included files may have changed even if the text did not
+        if premises == self.last_checked and premise_library.INCLUDE not in premises:
+            return
+        self.last_checked = premises
+        self.worker.submit("diagnostics", lambda: self.checker.check(premises),
+                           self.diagnostic_view.apply, delay=VennGUI.PREVIEW_DELAY)
+
+    def show_line_message(self, message):
+        """
+        Displays the problem of a line of the premises box under the mouse
+        :param message: the message of the problem
+        """
+        self.msg_text.set(message)
+        self.msg_label.configure(foreground="red")
+
+    def premises_directory(self):
+        """
+        :return: the directory of the premises file, which included paths are
+                 relative to, or None (the current directory) for a new file
+        """
+        return os.path.dirname(os.path.abspath(self.filepath)) if self.filepath \
+            else None
+
+    def set_filepath(self, filepath: str):
+        """
+        Change the premises file. The lines of the premises are checked again, as
+        their included paths may now lead to other files
+        :param filepath: the path of the file, or "" for a new file
+        """
+        from premise_diagnostics import PremiseChecker
+        self.filepath = filepath
+        self.filename = os.path.basename(filepath)
+        self.checker = PremiseChecker(self.premises_directory())
+        self.last_checked = None
+
+    @staticmethod
+    def library_digests(premises: str, directory=None):
+        """
+        :param premises: premises normalized by normalize_premises
+        :param directory: the directory included paths are relative to
+        :return: a tuple of the digests of the files the premises include (see
+                 premise_library.LibraryCache), or of the errors loading them
+        """
+        digests = []
+        for line in premises.split("\n"):
+            if not premise_library.is_include(line):
+                continue
+            try:
+                digests.append(premise_library.LIBRARIES.load(
+                    premise_library.include_path(line, directory)).digest)
+            except (OSError, SyntaxError, ValueError) as e:
+                digests.append(str(e))
+        return tuple(digests)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=16)
+    def compile_premises(premises: str, digests=(), directory=None):
+        """
+        Parses the premises. The result is cached, so that evaluating another
+        argument against the same premises does not parse them again
+        :param premises: premises normalized by normalize_premises
+        :param digests: the library_digests of the premises, so that the premises
+                        are parsed again after an included file changes
+        :param directory: the directory included paths are relative to
+        :return: a dict of
+                 "collect": the ExpressionSet of the premises
+                 "judge": a copy of collect that only prepare evaluates arguments
+                          on, so that the query planner of collect is not changed
+                          on the worker thread while the Tk thread draws it (None
+                          if the diagram cannot be drawn)
+                 "drawable": if the diagram of the premises can be drawn
+                 "message": an error message
+        """
+        compiled = {"collect": ExpressionSet(), "judge": None, "drawable": False,
+                    "message": ""}
+        collect = compiled["collect"]
         # Add all premises
         try:
-            self.collect.add_premises(self.premises_box.get("1.0", tk.END).replace(';', '\n'))
+            collect.add_premises(premises, directory=directory)
         except NameError as e:
-            self.msg_text.set(str(e))
-            self.msg_label.configure(foreground="red")
+            compiled["message"] = str(e)
         except TypeError as e:
             print(e, file=sys.stderr)
-            pass
+        except (OSError, ValueError, SyntaxError) as e:
+            compiled["message"] = str(e)
+            return compiled
+        if collect.empty() or len(collect) == 1:
+            return compiled
+        # Parse premises
+        try:
+            collect.parse_premises()
         except ValueError as e:
-            self.msg_text.set(str(e))
-            self.msg_label.configure(foreground="red")
-            return
+            compiled["message"] = str(e)
+            return compiled
+        compiled["judge"] = collect.copy()
+        compiled["drawable"] = True
+        return compiled
+
+    @staticmethod
+    def prepare(premises: str, conclusion: str, euler=False, directory=None):
+        """
+        Parses the premises and evaluates the argument. It does not touch any widget
+        or figure, so that it can run on the worker thread
+        :param premises: the text of the premises box
+        :param conclusion: the text of the evaluation box
+        :param euler: a flag to compute the Euler layout of the premises here, so
+                      that it is not fitted on the Tk thread when it is drawn
+        :param directory: the directory included paths are relative to (the current
+                          directory if None)
+        :return: a dict of
+                 "collect": the ExpressionSet of the premises
+                 "drawable": if the diagram of the premises can be drawn
+                 "message", "color": the message displayed under the diagram
+                 "exp", "result", "marked": the argument, the key of its verdict in
+                                            expression_set.results and the areas
+                                            to mark (None if nothing to evaluate)
+        """
+        premises = normalize_premises(premises.replace(';', '\n'))
+        prepared = dict(VennGUI.compile_premises(
+            premises, VennGUI.library_digests(premises, directory), directory))
+        prepared.update({"color": "red", "exp": None, "result": None, "marked": None})
+        collect, judge = prepared["collect"], prepared.pop("judge")
+        if euler and prepared["drawable"]:
+            import venn_regions
+            if len(collect) in venn_regions.EULER_SIZES:
+                venn_regions.get_euler_layout(len(collect), venn_regions.black_mask(
+                    collect.all_label[area_label] for area_label in collect.black))
+        if not prepared["drawable"] or conclusion.strip() == "":
+            return prepared
+        # Evaluate the argument
+        try:
+            exp = Expression(conclusion)
         except SyntaxError as e:
-            self.msg_text.set(str(e))
-            self.msg_label.configure(foreground="red")
+            prepared["message"] = str(e)
+            return prepared
+        evaluation = judge.evaluate(exp)
+        prepared["message"] = evaluation.reason
+        if evaluation.validity:
+            prepared["color"] = "green" if evaluation.must else "yellowgreen"
+        else:
+            prepared["color"] = "red" if evaluation.must else "darkorange"
+        prepared["exp"] = exp
+        prepared["result"] = evaluation.verdict.key
+        prepared["marked"] = evaluation.marked
+        return prepared
+
+    def present(self, prepared):
+        """
+        Displays the result of prepare. Drawing is only done here, on the Tk thread
+        :param prepared: the dict returned by prepare
+        """
+        self.collect = prepared["collect"]
+        self.msg_text.set(prepared["message"])
+        self.msg_label.configure(foreground=prepared["color"])
+        if not prepared["drawable"]:
             return
-        if self.collect.empty() or len(self.collect) == 1:
+        highlight = bool(self.is_possible_highlight.get())
+        if self.canvas_diagram is not None:
+            self.present_on_canvas(prepared, highlight)
             return
-        # Parse premises
-        try:
-            self.collect.parse_premises()
-        except ValueError as e:
-            self.msg_text.set(str(e))
-            self.msg_label.configure(foreground="red")
+        if self.shown == (self.collect, highlight):
+            # The figure already has the diagram of these premises
+            self.collect.venn_diagram.clear_marks()
+        else:
+            plt.clf()
+            self.collect.display_diagram(highlight_some=highlight,
+                                         euler=self.args.euler)
+            self.shown = (self.collect, highlight)
+        if prepared["result"] is not None:
+            self.collect.venn_diagram.show_result(
+                prepared["result"], prepared["marked"],
+                prepared["exp"] if self.show_exp_in_diagram.get() else None)
+        self.fig.canvas.flush_events()
+        self.fig.canvas.draw()
+        # Build the click lookup table while the window is idle
+        self.root.after_idle(self.collect.venn_diagram.hit_index)
+
+    def present_on_canvas(self, prepared, highlight):
+        """
+        Displays the result of prepare on the Tk canvas. The items of the diagram
+        are only changed when the premises or the highlight option change
+        :param prepared: the dict returned by prepare
+        :param highlight: whether "Some" premises are highlighted
+        """
+        if self.shown != (self.collect, highlight):
+            self.canvas_diagram.show(self.collect, highlight_some=highlight,
+                                     euler=self.args.euler)
+            self.shown = (self.collect, highlight)
+        if prepared["result"] is not None:
+            self.canvas_diagram.show_result(
+                prepared["result"], prepared["marked"],
+                prepared["exp"] if self.show_exp_in_diagram.get() else None)
+        else:
+            self.canvas_diagram.clear_marks()
+
+    # Click on the diagram
+    def inspect_area(self, event):
+        """ Shows the premises that make the clicked area black or put a X on it """
+        if event.inaxes is None or event.xdata is None or self.collect is None:
             return
-        self.collect.display_diagram(highlight_some=bool(self.is_possible_highlight.get()))
-        if not self.args.no_window:
-            self.fig.canvas.flush_events()
-            self.fig.canvas.draw()
+        self.describe_area(self.collect.venn_diagram.area_at(event.xdata, event.ydata))
 
-    # "Update" button
-    def evaluate_exp(self):
-        """ Evaluate an argument and displays the result """
-        self.show_diagram()
-        if self.collect.empty():
-            self.msg_text.set("The diagram is empty!")
-            self.msg_label.configure(foreground="red")
+    def inspect_canvas_area(self, event):
+        """ The same as inspect_area for a diagram drawn on the Tk canvas """
+        if self.collect is None:
             return
-        if self.eval_box.get() == "":
+        self.describe_area(self.canvas_diagram.area_at(event.x, event.y))
+
+    def describe_area(self, area_label):
+        """
+        Shows the premises that make an area black or put a X on it
+        :param area_label: the label of the area, or None for a point outside of
+                           all sets
+        """
+        if area_label is None:
             return
-        try:
-            ret, must, reason = self.collect.evaluate(
-                Expression(self.eval_box.get()), show=True, show_exp=self.show_exp_in_diagram.get())
-            self.msg_text.set(reason)
-            if ret:
-                if must:
-                    self.msg_label.configure(foreground="green")
-                else:
-                    self.msg_label.configure(foreground="yellowgreen")
-            else:
-                if must:
-                    self.msg_label.configure(foreground="red")
-                else:
-                    self.msg_label.configure(foreground="darkorange")
-            if self.args.no_window:
-                plt.show(block=True)
-            else:
-                self.fig.canvas.flush_events()
-                self.fig.canvas.draw()
-        except SyntaxError as e:
-            self.msg_text.set(str(e))
-            self.msg_label.configure(foreground="red")
+        members = sorted(self.collect.members)
+        patch_id = self.collect.all_label[area_label]
+        name = " ∩ ".join(m for m, bit in zip(members, patch_id) if bit == "1")
+        blacks, crosses = self.collect.area_premises(area_label)
+        if len(blacks) == 0 and len(crosses) == 0:
+            self.msg_text.set("Area {}: no premise affects this area.".format(name))
+        else:
+            reasons = []
+            if len(blacks) != 0:
+                reasons.append("empty because of " +
+                               ", ".join("\"{}\"".format(e) for e in blacks))
+            if len(crosses) != 0:
+                reasons.append("marked X by " +
+                               ", ".join("\"{}\"".format(e) for e in crosses))
+            self.msg_text.set("Area {}: {}.".format(name, "; ".join(reasons)))
+        self.msg_label.configure(foreground="black")
 
     # ===============================================================================
     #                         Local file operations
@@ -351,7 +807,7 @@ class VennGUI(object):
             print("ERROR File \"{}\" does not exist.".format(self.filepath),
                   file=sys.stderr)
             return
-        self.filename = os.path.basename(self.filepath)
+        self.set_filepath(self.filepath)
         with open(self.filepath, 'r', encoding='utf8') as f:
             text = f.read()
         self.premises_box.delete('1.0', tk.END)
@@ -369,7 +825,8 @@ class VennGUI(object):
                 defaultextension=".venn", filetypes=VennGUI.filetypes)
             if self.filepath == "":
                 return
-            self.filename = os.path.basename(self.filepath)
+            self.set_filepath(self.filepath)
+            self.check_premises()
         with open(self.filepath, "w", encoding='utf8') as text_file:
             text_file.write(self.premises_box.get("1.0", tk.END))
         self.msg_text.set("Successfully saved file \"{}\"".format(self.filename))
@@ -391,13 +848,12 @@ class VennGUI(object):
                 return
             if save_before_new:
                 self.save()
+        self.set_filepath("")
         self.clear()
         self.premises_box.edit_modified(False)
-        self.filename = ""
-        self.filepath = ""
         self.root.title("Venn Diagram Interpreter")
 
 
 if __name__ == '__main__':
     gui = VennGUI(sys.argv)
-    gui.run()
\ No newline at end of file
+    sys.exit(gui.run())
\ No newline at end of file
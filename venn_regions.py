@@ -0,0 +1,526 @@
+"""
+Region geometry of venn diagrams that are not drawn by matplotlib_venn.
+
+Every layout is a fixed list of convex shapes (ellipses or triangles). The polygons
+of all regions, a point inside each region and a raster of region ids are computed
+once with NumPy and cached on disk, so drawing a diagram never clips any polygon.
+This module does not depend on matplotlib.
+
+Euler layouts of two or three sets leave out the regions that "All" premises make
+empty instead of painting them black. The circles of the Euler layout of each mask
+of black regions are placed by a small NumPy optimizer, once, and the layout is
+cached on disk like the fixed layouts.
+"""
+import functools
+import hashlib
+import itertools
+import os
+
+import numpy as np
+
+CACHE_VERSION = 1
+RESOLUTION = 800  # Number of raster pixels along the longer side of a layout
+
+# Each shape is either ("ellipse", center x, center y, width, height, angle) or
+# ("triangle", x1, y1, x2, y2, x3, y3)
+LAYOUTS = {
+    "ellipse4": [("ellipse", 0.350, 0.400, 0.72, 0.45, 140.0),
+                 ("ellipse", 0.450, 0.500, 0.72, 0.45, 140.0),
+                 ("ellipse", 0.544, 0.500, 0.72, 0.45, 40.0),
+                 ("ellipse", 0.644, 0.400, 0.72, 0.45, 40.0)],
+    "ellipse5": [("ellipse", 0.428, 0.449, 0.87, 0.50, 155.0),
+                 ("ellipse", 0.469, 0.543, 0.87, 0.50, 82.0),
+                 ("ellipse", 0.558, 0.523, 0.87, 0.50, 10.0),
+                 ("ellipse", 0.578, 0.432, 0.87, 0.50, 118.0),
+                 ("ellipse", 0.489, 0.383, 0.87, 0.50, 46.0)],
+    "triangle6": [("triangle", 0.637, 0.921, 0.649, 0.274, 0.188, 0.667),
+                  ("triangle", 0.981, 0.769, 0.335, 0.191, 0.393, 0.671),
+                  ("triangle", 0.941, 0.397, 0.292, 0.475, 0.456, 0.747),
+                  ("triangle", 0.662, 0.119, 0.316, 0.548, 0.662, 0.700),
+                  ("triangle", 0.309, 0.081, 0.374, 0.718, 0.681, 0.488),
+                  ("triangle", 0.016, 0.626, 0.726, 0.687, 0.522, 0.327)]
+}
+
+# Circle layouts with the areas where matplotlib_venn puts them, for drawing two or
+# three sets without matplotlib
+LAYOUTS.update({
+    "circle2": [("ellipse", 0.35, 0.5, 0.5, 0.5, 0.0),
+                ("ellipse", 0.65, 0.5, 0.5, 0.5, 0.0)],
+    "circle3": [("ellipse", 0.38, 0.58, 0.5, 0.5, 0.0),
+                ("ellipse", 0.62, 0.58, 0.5, 0.5, 0.0),
+                ("ellipse", 0.50, 0.37, 0.5, 0.5, 0.0)]
+})
+
+# The layout used for each number of sets
+DEFAULT_LAYOUT = {4: "ellipse4", 5: "ellipse5", 6: "triangle6"}
+CIRCLE_LAYOUT = {2: "circle2", 3: "circle3"}
+
+# Colors highlighting "Some" premises. The areas of two or three sets have their
+# own colors, the color of an intersection of more sets is the mean of the colors
+# of its sets
+SET_COLORS = ["#ff7f7f", "#7fbf7f", "#7f7fff", "#ffbf40", "#bf7fbf", "#40bfbf"]
+AREA_COLORS = {
+    2: ["#ff7f7f", "#7fbf7f", "#d8ab7f"],
+    3: ["#ff7f7f", "#7fbf7f", "#7f7fff", "#d8ab7f", "#d87fd8", "#7fabd8", "#b298b2"]
+}
+
+# The Euler layouts: the number of sets they are built for, the radius of the
+# circles before they are fitted, the optimizer settings and the weight of each
+# term of its loss
+EULER_SIZES = (2, 3)
+EULER_RADIUS = 0.25
+EULER_GRID = 64  # Sample points along each side of the square the loss is measured on
+EULER_STEPS = 250
+EULER_STARTS = 3  # The circle layout and random placements the optimizer starts from
+EULER_MIN_AREA = 0.2  # Area of a region that is kept, in areas of an EULER_RADIUS circle
+EULER_WEIGHTS = {"black": 10.0, "kept": 50.0, "radius": 0.5, "compact": 0.05}
+
+_layouts = dict()  # Layouts already loaded by this process
+
+
+def region_id(mask: int, size: int):
+    """
+    :param mask: the bit mask of a region, the highest bit is the first set
+    :param size: the number of sets
+    :return: the patch id of the region ("1010"...)
+    """
+    return format(mask, "0{}b".format(size))
+
+
+def cache_dir():
+    """
+    :return: the directory where computed layouts are stored
+    """
+    return os.environ.get("VENN_CACHE_DIR",
+                          os.path.join(os.path.expanduser("~"), ".cache",
+                                       "VennDiagramInterpreter"))
+
+
+def shape_field(shape, x, y):
+    """
+    :param shape: a shape of a layout
+    :param x: x coordinates of the points
+    :param y: y coordinates of the points
+    :return: (approximately) the signed distance between the points and the edge
+             of the shape, positive inside the shape
+    """
+    if shape[0] == "ellipse":
+        _, cx, cy, width, height, angle = shape
+        theta = np.deg2rad(angle)
+        dx, dy = x - cx, y - cy
+        u = dx * np.cos(theta) + dy * np.sin(theta)
+        v = -dx * np.sin(theta) + dy * np.cos(theta)
+        a, b = width / 2, height / 2
+        value = 1 - (u / a) ** 2 - (v / b) ** 2
+        gradient = 2 * np.hypot(u / a ** 2, v / b ** 2)
+        return value / np.maximum(gradient, 1e-9)
+    elif shape[0] == "triangle":
+        points = triangle_points(shape)
+        distances = []
+        for i in range(3):
+            p, q = points[i], points[(i + 1) % 3]
+            normal = np.array([p[1] - q[1], q[0] - p[0]]) / np.hypot(*(q - p))
+            distances.append((x - p[0]) * normal[0] + (y - p[1]) * normal[1])
+        return np.min(distances, axis=0)
+    raise ValueError("ERROR: Unknown shape " + str(shape[0]))
+
+
+def triangle_points(shape):
+    """
+    :return: the corners of a triangle in counterclockwise order
+    """
+    points = np.array(shape[1:], dtype=float).reshape(3, 2)
+    edge1, edge2 = points[1] - points[0], points[2] - points[0]
+    if edge1[0] * edge2[1] - edge1[1] * edge2[0] < 0:
+        points = points[::-1]
+    return points
+
+
+def shape_outline(shape, steps=240):
+    """
+    :return: a closed polygon (an array of points) of the edge of the shape
+    """
+    if shape[0] == "ellipse":
+        _, cx, cy, width, height, angle = shape
+        t = np.linspace(0, 2 * np.pi, steps)
+        theta = np.deg2rad(angle)
+        u, v = width / 2 * np.cos(t), height / 2 * np.sin(t)
+        return np.column_stack([cx + u * np.cos(theta) - v * np.sin(theta),
+                                cy + u * np.sin(theta) + v * np.cos(theta)])
+    points = triangle_points(shape)
+    return np.vstack([points, points[:1]])
+
+
+class RegionRaster(object):
+    def __init__(self, size, extent, raster):
+        """
+        A lookup table from a point of a diagram to the region containing it
+        :param size: the number of sets
+        :param extent: (xmin, xmax, ymin, ymax) of the diagram
+        :param raster: a 2D array of region masks (0 outside all sets), the first
+                       row is at ymin
+        """
+        self.size = size
+        self.extent = extent
+        self.raster = raster
+
+    def region_at(self, x, y):
+        """
+        :return: the id of the region containing the point, or None if the point is
+                 outside of all sets
+        """
+        xmin, xmax, ymin, ymax = self.extent
+        rows, cols = self.raster.shape
+        col = int((x - xmin) / (xmax - xmin) * (cols - 1) + 0.5)
+        row = int((y - ymin) / (ymax - ymin) * (rows - 1) + 0.5)
+        if not (0 <= row < rows and 0 <= col < cols) or self.raster[row, col] == 0:
+            return None
+        return region_id(int(self.raster[row, col]), self.size)
+
+    def masks_at(self, x, y):
+        """
+        The same as region_at for many points at once
+        :param x: an array of x coordinates
+        :param y: an array of y coordinates, broadcast against x
+        :return: an array of the masks of the regions containing the points (0 for
+                 the points outside of all sets)
+        """
+        xmin, xmax, ymin, ymax = self.extent
+        rows, cols = self.raster.shape
+        col = np.floor((x - xmin) / (xmax - xmin) * (cols - 1) + 0.5).astype(int)
+        row = np.floor((y - ymin) / (ymax - ymin) * (rows - 1) + 0.5).astype(int)
+        col, row = np.broadcast_arrays(col, row)
+        inside = (0 <= row) & (row < rows) & (0 <= col) & (col < cols)
+        ret = np.zeros(col.shape, dtype=self.raster.dtype)
+        ret[inside] = self.raster[row[inside], col[inside]]
+        return ret
+
+
+class RegionLayout(RegionRaster):
+    def __init__(self, name, size, extent, raster, polygons, label_pos, outlines,
+                 set_label_pos):
+        """
+        :param name: the name of the layout
+        :param size: the number of sets
+        :param extent: (xmin, xmax, ymin, ymax) of the diagram
+        :param raster: a 2D array of region masks (0 outside all sets), the first
+                       row is at ymin
+        :param polygons: a dict of region ids -> list of closed rings (outer edge
+                         first), each ring is an array of points
+        :param label_pos: a dict of region ids -> a point well inside the region
+        :param outlines: a list of closed polygons of the edge of each set
+        :param set_label_pos: a list of positions of the name of each set
+        """
+        super().__init__(size, extent, raster)
+        self.name = name
+        self.polygons = polygons
+        self.label_pos = label_pos
+        self.outlines = outlines
+        self.set_label_pos = set_label_pos
+
+    def save(self, path):
+        """ Store the layout in a .npz file """
+        ids = sorted(self.polygons)
+        rings = [ring for i in ids for ring in self.polygons[i]]
+        np.savez_compressed(
+            path, name=self.name, size=self.size, extent=np.array(self.extent),
+            raster=self.raster, ids=np.array(ids),
+            ring_count=np.array([len(self.polygons[i]) for i in ids]),
+            ring_length=np.array([len(ring) for ring in rings]),
+            ring_points=np.vstack(rings),
+            label_pos=np.array([self.label_pos[i] for i in ids]),
+            outline_length=np.array([len(o) for o in self.outlines]),
+            outline_points=np.vstack(self.outlines),
+            set_label_pos=np.array(self.set_label_pos))
+
+    @staticmethod
+    def load(path):
+        """ Read a layout stored by save """
+        with np.load(path) as data:
+            ids = [str(i) for i in data["ids"]]
+            rings = np.split(data["ring_points"],
+                             np.cumsum(data["ring_length"])[:-1])
+            ring_index = np.cumsum(np.concatenate([[0], data["ring_count"]]))
+            polygons = {i: rings[ring_index[k]:ring_index[k + 1]]
+                        for k, i in enumerate(ids)}
+            label_pos = {i: tuple(p) for i, p in zip(ids, data["label_pos"])}
+            outlines = np.split(data["outline_points"],
+                                np.cumsum(data["outline_length"])[:-1])
+            return RegionLayout(str(data["name"]), int(data["size"]),
+                                tuple(data["extent"]), data["raster"], polygons,
+                                label_pos, outlines,
+                                [tuple(p) for p in data["set_label_pos"]])
+
+
+def layout_digest(name, shapes):
+    """
+    :return: a short hash of everything a computed layout depends on
+    """
+    key = repr((CACHE_VERSION, RESOLUTION, name, shapes)).encode("utf8")
+    return hashlib.sha1(key).hexdigest()[:12]
+
+
+def build_layout(name, shapes, optional=()):
+    """
+    This function computes the region polygons, region label positions and the
+    region raster of a layout
+    throw a ValueError if a region that is not optional is not in the layout
+    :param name: the name of the layout
+    :param shapes: a list of shapes, one for each set
+    :param optional: ids of the regions the layout may leave out
+    :return: a RegionLayout object
+    """
+    import contourpy
+
+    size = len(shapes)
+    outlines = [shape_outline(shape) for shape in shapes]
+    points = np.vstack(outlines)
+    margin = 0.08 * np.ptp(points, axis=0).max()
+    xmin, ymin = points.min(axis=0) - margin
+    xmax, ymax = points.max(axis=0) + margin
+    step = max(xmax - xmin, ymax - ymin) / RESOLUTION
+    x = np.arange(xmin, xmax + step, step)
+    y = np.arange(ymin, ymax + step, step)
+    grid_x, grid_y = np.meshgrid(x, y)
+
+    fields = np.array([shape_field(shape, grid_x, grid_y) for shape in shapes])
+    inside = fields > 0
+    raster = np.zeros(grid_x.shape, dtype=np.uint8)
+    for i in range(size):
+        raster |= inside[i].astype(np.uint8) << (size - 1 - i)
+
+    polygons, label_pos = dict(), dict()
+    for mask in range(1, 2 ** size):
+        signs = np.array([1 if mask >> (size - 1 - i) & 1 else -1
+                          for i in range(size)])
+        # The region is where the point is inside (or outside) every set
+        field = np.min(fields * signs[:, None, None], axis=0)
+        generator = contourpy.contour_generator(grid_x, grid_y, field,
+                                                fill_type="OuterOffset")
+        rings = []
+        for ring_points, offsets in zip(*generator.filled(0.0, np.inf)):
+            rings.extend(ring_points[offsets[i]:offsets[i + 1]]
+                         for i in range(len(offsets) - 1))
+        if len(rings) == 0 and region_id(mask, size) in optional:
+            continue
+        if len(rings) == 0:
+            raise ValueError("ERROR: Layout {} has no region {}".format(
+                name, region_id(mask, size)))
+        # Put the outer edge of the largest piece first
+        rings.sort(key=lambda r: -abs(np.dot(r[:-1, 0], r[1:, 1]) -
+                                      np.dot(r[1:, 0], r[:-1, 1])))
+        polygons[region_id(mask, size)] = rings
+        deepest = np.unravel_index(np.argmax(field), field.shape)
+        label_pos[region_id(mask, size)] = (x[deepest[1]], y[deepest[0]])
+
+    # Set names go beyond the point of each set farthest from the center
+    center = points.mean(axis=0)
+    set_label_pos = []
+    for outline in outlines:
+        far = outline[np.argmax(np.hypot(*(outline - center).T))]
+        set_label_pos.append(tuple(far + (far - center) * 0.08))
+    return RegionLayout(name, size, (xmin, xmax, ymin, ymax), raster, polygons,
+                        label_pos, outlines, set_label_pos)
+
+
+def euler_name(size: int, mask: int):
+    """
+    :param size: the number of sets
+    :param mask: the black regions, bit m is set for the region of mask m (see
+                 black_mask)
+    :return: the name of the Euler layout without these regions
+    """
+    return "euler{}-{:03x}".format(size, mask)
+
+
+def black_mask(region_ids):
+    """
+    :param region_ids: ids of the black regions ("110"...)
+    :return: the mask of these regions, as EvaluationResult.mask
+    """
+    return sum(1 << int(i, 2) for i in set(region_ids))
+
+
+def euler_loss(params, points, black, tau):
+    """
+    The loss of a placement of circles: the area of the black regions, the area
+    missing from the other regions and how far the circles are from the
+    EULER_RADIUS circles at the middle of the diagram. The edges of the circles
+    are blurred over a width of tau so that the areas have a gradient
+    :param params: the x and y of the center of each circle, then the radii
+    :param points: an array of the points the areas are measured on
+    :param black: a set of the masks of the black regions
+    :param tau: the width of the blur
+    :return: the loss, the gradient of the loss
+    """
+    size = len(params) // 3
+    centers, radii = params[:2 * size].reshape(size, 2), params[2 * size:]
+    delta = points[None, :, :] - centers[:, None, :]
+    distance = np.maximum(np.hypot(delta[..., 0], delta[..., 1]), 1e-9)
+    inside = 1 / (1 + np.exp((distance - radii[:, None]) / tau))
+    # Areas are measured in areas of an EULER_RADIUS circle
+    unit = (np.ptp(points[:, 0]) * np.ptp(points[:, 1]) / len(points)) / \
+        (np.pi * EULER_RADIUS ** 2)
+    masks = np.arange(1, 2 ** size)
+    bits = (masks[:, None] >> (size - 1 - np.arange(size))[None, :] & 1).astype(bool)
+    # The factor of each set in the area of each region: inside or outside it
+    factors = np.where(bits[:, :, None], inside[None, :, :], 1 - inside[None, :, :])
+    areas = np.prod(factors, axis=1).sum(axis=1) * unit
+    is_black = np.isin(masks, list(black))
+    missing = np.where(is_black, 0.0, np.maximum(EULER_MIN_AREA - areas, 0.0))
+    loss = EULER_WEIGHTS["black"] * np.sum(areas[is_black]) + \
+        EULER_WEIGHTS["kept"] * np.sum(missing ** 2)
+    slopes = np.where(is_black, EULER_WEIGHTS["black"],
+                      -2 * EULER_WEIGHTS["kept"] * missing) * unit
+    grad_inside = np.empty_like(inside)
+    for i in range(size):
+        others = np.prod(np.delete(factors, i, axis=1), axis=1)
+        grad_inside[i] = (slopes * np.where(bits[:, i], 1, -1)) @ others
+    grad_edge = grad_inside * inside * (1 - inside) / tau
+    grad_radii = grad_edge.sum(axis=1)
+    grad_centers = (grad_edge[..., None] * delta / distance[..., None]).sum(axis=1)
+    log_ratio = np.log(radii / EULER_RADIUS)
+    loss += EULER_WEIGHTS["radius"] * np.sum(log_ratio ** 2)
+    grad_radii += EULER_WEIGHTS["radius"] * 2 * log_ratio / radii
+    offset = (centers - 0.5) / EULER_RADIUS
+    loss += EULER_WEIGHTS["compact"] * np.sum(offset ** 2)
+    grad_centers += EULER_WEIGHTS["compact"] * 2 * offset / EULER_RADIUS
+    return loss, np.concatenate([grad_centers.ravel(), grad_radii])
+
+
+def euler_shapes(size: int, mask: int):
+    """
+    This function places a circle for each set so that the black regions are
+    left out and the other regions are kept, as far as circles allow
+    :param size: the number of sets
+    :param mask: the black regions (see black_mask)
+    :return: a list of shapes, one for each set
+    """
+    black = {m for m in range(1, 2 ** size) if mask >> m & 1}
+    axis = np.linspace(-0.5, 1.5, EULER_GRID)
+    points = np.column_stack([a.ravel() for a in np.meshgrid(axis, axis)])
+    rng = np.random.default_rng(mask)
+    starts = [np.array([v for shape in LAYOUTS[CIRCLE_LAYOUT[size]]
+                        for v in shape[1:3]] + [EULER_RADIUS] * size)]
+    for _ in range(EULER_STARTS - 1):
+        starts.append(np.concatenate([rng.uniform(0.2, 0.8, 2 * size),
+                                      EULER_RADIUS * rng.uniform(0.6, 1.4, size)]))
+    best, best_score = None, None
+    for params in starts:
+        # Adam steps, while the edges of the circles get sharper
+        moment, velocity = np.zeros_like(params), np.zeros_like(params)
+        for step in range(1, EULER_STEPS + 1):
+            tau = 0.04 * (0.2 ** (step / EULER_STEPS))
+            loss, gradient = euler_loss(params, points, black, tau)
+            moment = 0.9 * moment + 0.1 * gradient
+            velocity = 0.999 * velocity + 0.001 * gradient ** 2
+            params = params - 0.01 * (moment / (1 - 0.9 ** step)) / (
+                np.sqrt(velocity / (1 - 0.999 ** step)) + 1e-8)
+            params[2 * size:] = np.maximum(params[2 * size:], 0.2 * EULER_RADIUS)
+        # Fewer missing regions, then fewer black regions drawn, then lower loss
+        centers, radii = params[:2 * size].reshape(size, 2), params[2 * size:]
+        inside = np.hypot(*(points[None, :, :] - centers[:, None, :]).transpose(
+            2, 0, 1)) < radii[:, None]
+        codes = sum(inside[i].astype(int) << (size - 1 - i) for i in range(size))
+        present = set(np.unique(codes)) - {0}
+        score = (len(set(range(1, 2 ** size)) - black - present),
+                 len(black & present), euler_loss(params, points, black, 0.008)[0])
+        if best_score is None or score < best_score:
+            best, best_score = params, score
+    return [("ellipse", best[2 * i], best[2 * i + 1], 2 * best[2 * size + i],
+             2 * best[2 * size + i], 0.0) for i in range(size)]
+
+
+def build_euler_layout(size: int, mask: int):
+    """
+    :return: the RegionLayout of the Euler diagram of a mask of black regions (see
+             black_mask). The circle layout is used if no placement keeps every
+             region that is not black
+    """
+    name = euler_name(size, mask)
+    optional = [region_id(m, size) for m in range(1, 2 ** size) if mask >> m & 1]
+    try:
+        return build_layout(name, euler_shapes(size, mask), optional)
+    except ValueError:
+        return build_layout(name, LAYOUTS[CIRCLE_LAYOUT[size]], optional)
+
+
+def get_euler_layout(size: int, mask: int):
+    """
+    :param size: the number of sets, one of EULER_SIZES
+    :param mask: the black regions (see black_mask)
+    :return: the RegionLayout of the Euler diagram without the black regions
+    """
+    return get_layout(euler_name(size, mask))
+
+
+def get_layout(name):
+    """
+    :param name: the name of a layout in LAYOUTS or of an Euler layout (see
+                 euler_name)
+    :return: the RegionLayout, computed at most once and stored in the cache
+             directory for later runs
+    """
+    if name in _layouts:
+        return _layouts[name]
+    if name in LAYOUTS:
+        key = LAYOUTS[name]
+        build = functools.partial(build_layout, name, LAYOUTS[name])
+    elif name.startswith("euler"):
+        size, mask = name[len("euler"):].split("-")
+        if int(size) not in EULER_SIZES:
+            raise KeyError(name)
+        # The shapes depend on the optimizer
+        key = (EULER_RADIUS, EULER_GRID, EULER_STEPS, EULER_STARTS, EULER_MIN_AREA,
+               sorted(EULER_WEIGHTS.items()))
+        build = functools.partial(build_euler_layout, int(size), int(mask, 16))
+    else:
+        raise KeyError(name)
+    path = os.path.join(cache_dir(), "{}-{}.npz".format(name,
+                                                        layout_digest(name, key)))
+    layout = None
+    if os.path.exists(path):
+        try:
+            layout = RegionLayout.load(path)
+        except (OSError, ValueError, KeyError):
+            layout = None
+    if layout is None:
+        layout = build()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = path + ".{}.tmp.npz".format(os.getpid())
+            layout.save(temp_path)
+            os.replace(temp_path, path)
+        except OSError:
+            pass  # The layout is still cached in this process
+    _layouts[name] = layout
+    return layout
+
+
+def area_colors(size: int):
+    """
+    :return: the hex colors of all regions of a diagram in the order of
+             ExpressionSet.all_label
+    """
+    if size in AREA_COLORS:
+        return AREA_COLORS[size]
+    rgb = np.array([[int(c[i:i + 2], 16) for i in (1, 3, 5)]
+                    for c in SET_COLORS[:size]])
+    colors = []
+    for mask in region_masks(size):
+        members = [i for i in range(size) if mask >> (size - 1 - i) & 1]
+        colors.append("#{:02x}{:02x}{:02x}".format(
+            *np.round(rgb[members].mean(axis=0)).astype(int)))
+    return colors
+
+
+def region_masks(size: int):
+    """
+    :return: the masks of all regions of a diagram in the order of
+             ExpressionSet.all_label (single sets first)
+    """
+    masks = []
+    for count in range(1, size + 1):
+        for combine in itertools.combinations(range(size), count):
+            masks.append(sum(1 << (size - 1 - i) for i in combine))
+    return masks
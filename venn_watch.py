@@ -0,0 +1,52 @@
+import hashlib
+import os
+
+
+class FileWatcher(object):
+    def __init__(self, paths):
+        """
+        Polls files for changes by their modification time and size, which only
+        needs one stat call per file
+        :param paths: the paths of the watched files
+        """
+        self.stats = dict.fromkeys(paths)  # path -> (mtime, size) at the last poll
+
+    @staticmethod
+    def signature(path):
+        """
+        :return: (modification time in nanoseconds, size) of a file, or None if the
+                 file does not exist
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def changed(self):
+        """
+        :return: a list of the watched paths changed since the last call (all of
+                 them on the first call)
+        """
+        ret = []
+        for path, last in self.stats.items():
+            current = self.signature(path)
+            if current != last:
+                self.stats[path] = current
+                if current is not None:
+                    ret.append(path)
+        return ret
+
+
+def diagram_state(s, verdicts=()):
+    """
+    :param s: a parsed ExpressionSet
+    :param verdicts: a list of (argument, key of the verdict, marked area labels)
+    :return: a digest of everything that is drawn: the set names, the areas with
+             a X, the black areas and the verdicts
+    """
+    state = (sorted(s.all_label),
+             sorted(tuple(sorted(labels)) for labels in s.cross),
+             sorted(s.black),
+             [(str(exp), result, sorted(marked)) for exp, result, marked in verdicts])
+    return hashlib.sha1(repr(state).encode("utf8")).hexdigest()
@@ -0,0 +1,91 @@
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundWorker(object):
+    def __init__(self, root, poll_ms=20):
+        """
+        Runs jobs on a worker thread and hands their results back to the Tk thread.
+        Jobs have a kind (e.g. "preview"); only the latest job of each kind matters,
+        so a new job cancels the pending one of the same kind and the results of
+        stale jobs are dropped.
+        :param root: the Tk root window, used to schedule callbacks
+        :param poll_ms: how often (in milliseconds) finished jobs are collected
+        """
+        self.root = root
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.finished = queue.Queue()
+        self.lock = threading.Lock()
+        self.latest = dict()  # kind -> the number of the latest job
+        self.futures = dict()  # kind -> the future of the latest job
+        self.timers = dict()  # kind -> the Tk "after" id of a debounced job
+        self.root.after(self.poll_ms, self.poll)
+
+    def submit(self, kind, func, callback, delay=0):
+        """
+        Run func() on the worker thread and then callback(result) on the Tk thread
+        :param kind: the kind of the job, a newer job replaces older ones
+        :param func: a function that does not touch any Tk widget
+        :param callback: a function called with the result of func
+        :param delay: milliseconds to wait for a newer job before starting this one
+        """
+        self.cancel(kind)
+        if delay > 0:
+            self.timers[kind] = self.root.after(
+                delay, lambda: self.start(kind, func, callback))
+        else:
+            self.start(kind, func, callback)
+
+    def start(self, kind, func, callback):
+        """ Start a job immediately """
+        self.timers.pop(kind, None)
+        with self.lock:
+            number = self.latest.get(kind, 0) + 1
+            self.latest[kind] = number
+
+        def run():
+            if self.is_stale(kind, number):
+                return
+            try:
+                result = func()
+            except Exception as e:
+                print(e, file=sys.stderr)
+                return
+            self.finished.put((kind, number, callback, result))
+
+        self.futures[kind] = self.executor.submit(run)
+
+    def cancel(self, kind):
+        """ Drop the pending and running jobs of a kind """
+        if kind in self.timers:
+            self.root.after_cancel(self.timers.pop(kind))
+        if kind in self.futures:
+            self.futures.pop(kind).cancel()
+        with self.lock:
+            self.latest[kind] = self.latest.get(kind, 0) + 1
+
+    def is_stale(self, kind, number):
+        """
+        :return: True if a newer job of the kind has been submitted
+        """
+        with self.lock:
+            return self.latest.get(kind) != number
+
+    def poll(self):
+        """ Call the callbacks of finished jobs on the Tk thread """
+        try:
+            while True:
+                kind, number, callback, result = self.finished.get_nowait()
+                if not self.is_stale(kind, number):
+                    self.futures.pop(kind, None)
+                    callback(result)
+        except queue.Empty:
+            pass
+        self.root.after(self.poll_ms, self.poll)
+
+    def shutdown(self):
+        """ Stop the worker thread """
+        self.executor.shutdown(wait=False, cancel_futures=True)
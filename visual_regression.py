@@ -0,0 +1,204 @@
+import argparse
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from expression import Expression
+from expression_set import ExpressionSet
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+FIGSIZE = (6.4, 4.8)  # The size (in inches) of a rendered diagram
+DPI = 80
+TOLERANCE = 24  # The largest difference of a channel (0-255) regarded as equal
+MAX_RATIO = 0.0002  # The largest ratio of different pixels a passing image can have
+
+# Cases checked by the harness: name -> (premises, conclusion)
+CASES = {
+    "two_sets": ("Some A's are not B's", "Some A's are B's"),
+    "some_some": ("Some A's are B's\nSome B's are C's", "Some A's are C's"),
+    "all_all": ("All A's are B's\nAll B's are C's", "All A's are C's"),
+    "all_all_not": ("All A's are B's\nAll B's are C's", "All A's are not C's"),
+    "all_some": ("All A's are B's\nAll B's are C's", "Some A's are C's"),
+    "all_some_some": ("All A's are B's\nSome C's are A's", "Some C's are B's"),
+    "no_true": ("All A's are not B's\nAll A's are not C's", "Some A's are B's"),
+    "cross": ("All B's are A's\nSome C's are B's", "Some C's are A's"),
+    "cross2": ("All A's are C's\nSome A's are B's", "Some C's are A's"),
+    "double_cross": ("All A's are B's\nSome B's are C's\nSome A's are C's",
+                     "Some A's are C's"),
+    "no_highlight": ("Some A's are B's\nSome B's are not C's", None),
+    "four_sets": ("All A's are B's\nSome C's are D's\nSome A's are not C's",
+                  "Some B's are not C's"),
+    "five_sets": ("All A's are B's\nAll B's are C's\nSome D's are E's",
+                  "All A's are C's"),
+    "six_sets": ("All A's are not B's\nSome C's are D's\nAll E's are F's",
+                 "Some C's are D's"),
+}
+
+
+def render(premises: str, conclusion=None, highlight_some=True):
+    """
+    This function draws a diagram into an in-memory Agg buffer
+    :param premises: a paragraph of premises separated by newline characters
+    :param conclusion: the argument being validated, or None
+    :param highlight_some: whether "Some" premises are highlighted
+    :return: a (height, width, 4) uint8 array of RGBA pixels
+    """
+    import matplotlib.pyplot as plt
+    s = ExpressionSet()
+    s.add_premises(premises)
+    s.parse_premises()
+    fig = plt.figure(figsize=FIGSIZE)
+    try:
+        s.display_diagram(highlight_some)
+        if conclusion is not None:
+            s.evaluate(Expression(conclusion), show=True)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="rgba", dpi=DPI)
+    finally:
+        plt.close(fig)
+    width, height = (int(round(x * DPI)) for x in FIGSIZE)
+    return np.frombuffer(buffer.getvalue(), dtype=np.uint8).reshape(height, width, 4)
+
+
+def read_png(path):
+    """
+    :return: a (height, width, 4) uint8 array of the RGBA pixels of a png file
+    """
+    with Image.open(path) as image:
+        return np.asarray(image.convert("RGBA"))
+
+
+def write_png(pixels, path):
+    """ Write a (height, width, 4) uint8 array of RGBA pixels to a png file """
+    Image.fromarray(pixels).save(path)
+
+
+def compare(actual, expected, tolerance=TOLERANCE):
+    """
+    :param actual: the rendered pixels
+    :param expected: the golden pixels
+    :param tolerance: the largest difference of a channel regarded as equal
+    :return: the ratio of different pixels (1.0 if the sizes differ), a boolean mask
+             of the different pixels (None if the sizes differ)
+    """
+    if actual.shape != expected.shape:
+        return 1.0, None
+    delta = np.abs(actual.astype(np.int16) - expected.astype(np.int16))
+    mask = delta.max(axis=2) > tolerance
+    return np.count_nonzero(mask) / mask.size, mask
+
+
+def diff_image(expected, mask):
+    """
+    :return: the golden image faded to gray with the different pixels in red
+    """
+    gray = expected[..., :3].mean(axis=2) * 0.3 + 178
+    ret = np.repeat(gray[..., None], 4, axis=2).astype(np.uint8)
+    ret[..., 3] = 255
+    ret[mask] = (255, 0, 0, 255)
+    return ret
+
+
+def check(name, premises, conclusion=None, highlight_some=True, update=False,
+          golden_dir=GOLDEN_DIR, out_dir=None, tolerance=TOLERANCE,
+          max_ratio=MAX_RATIO):
+    """
+    This function renders a case and compares it against its golden png. On failure
+    the rendered image and a diff image are written to out_dir.
+    :param name: the name of the case, the golden file is <golden_dir>/<name>.png
+    :param update: write the rendered image as the new golden png
+    :return: (name, status, ratio of different pixels, message), status is one of
+             "pass", "fail", "missing" and "updated"
+    """
+    actual = render(premises, conclusion, highlight_some)
+    golden = os.path.join(golden_dir, name + ".png")
+    if update:
+        os.makedirs(golden_dir, exist_ok=True)
+        write_png(actual, golden)
+        return name, "updated", 0.0, golden
+    out_dir = out_dir if out_dir is not None else os.path.join(golden_dir, "failed")
+    if not os.path.exists(golden):
+        os.makedirs(out_dir, exist_ok=True)
+        write_png(actual, os.path.join(out_dir, name + "-actual.png"))
+        return name, "missing", 1.0, "No golden image " + golden
+    expected = read_png(golden)
+    ratio, mask = compare(actual, expected, tolerance)
+    if ratio <= max_ratio:
+        return name, "pass", ratio, ""
+    os.makedirs(out_dir, exist_ok=True)
+    write_png(actual, os.path.join(out_dir, name + "-actual.png"))
+    if mask is None:
+        message = "Size {} differs from the golden size {}".format(
+            actual.shape[:2], expected.shape[:2])
+    else:
+        write_png(diff_image(expected, mask), os.path.join(out_dir, name + "-diff.png"))
+        message = "{:.3%} of the pixels differ, see {}".format(ratio, out_dir)
+    return name, "fail", ratio, message
+
+
+def init_worker():
+    """ Render without a display """
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def check_case(name, options):
+    """ Check a case in CASES by its name """
+    premises, conclusion = CASES[name]
+    return check(name, premises, conclusion, **options)
+
+
+def run(names, jobs=None, **options):
+    """
+    This function checks the cases in parallel worker processes
+    :param names: the names of the cases in CASES
+    :param jobs: the number of worker processes (default: the number of cpus)
+    :param options: keyword arguments of check
+    :return: a list of results of check, in the order of names
+    """
+    jobs = jobs if jobs is not None else os.cpu_count() or 1
+    if jobs <= 1:
+        return [check_case(name, options) for name in names]
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker) as executor:
+        return list(executor.map(check_case, names, [options] * len(names)))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Compare rendered diagrams "
+                                                 "against golden images")
+    parser.add_argument("-k", "--filter", help="Only check cases whose name "
+                                               "contains this string", type=str)
+    parser.add_argument("-j", "--jobs", help="Number of worker processes",
+                        type=int, default=None)
+    parser.add_argument("--update", help="Write the rendered images as the new "
+                                         "golden images", action="store_true")
+    parser.add_argument("--golden_dir", help="The directory of golden images",
+                        type=str, default=GOLDEN_DIR)
+    parser.add_argument("--out_dir", help="The directory of failed images and "
+                                          "diff images", type=str)
+    parser.add_argument("--tolerance", help="The largest difference of a color "
+                                            "channel regarded as equal",
+                        type=int, default=TOLERANCE)
+    args = parser.parse_args(argv[1:])
+
+    init_worker()
+    names = [name for name in CASES if not args.filter or args.filter in name]
+    results = run(names, args.jobs, update=args.update, golden_dir=args.golden_dir,
+                  out_dir=args.out_dir, tolerance=args.tolerance)
+    failed = 0
+    for name, status, ratio, message in results:
+        print("{:16s} {:8s} {}".format(name, status.upper(), message))
+        if status in ("fail", "missing"):
+            failed += 1
+    if failed:
+        print("{} of {} cases failed".format(failed, len(results)), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,340 @@
+import argparse
+import json
+import os
+import random
+import string
+import sys
+
+import numpy as np
+
+MOODS = {"A": "All {}'s are {}'s", "E": "All {}'s are not {}'s",
+         "I": "Some {}'s are {}'s", "O": "Some {}'s are not {}'s"}
+# Letters of generated set names. "S" is left out because Token strips leading
+# and trailing "s" from names
+NAME_LETTERS = string.ascii_uppercase.replace("S", "")
+REFERENCE_MAX_SETS = 4  # Larger diagrams have too many worlds to enumerate
+
+
+class ReferenceModel(object):
+    def __init__(self, size: int):
+        """
+        A brute-force model checker, independent of ExpressionSet. A world is a set
+        of inhabited regions; every world of the diagram is enumerated and
+        premises and conclusions are checked in each of them
+        :param size: the number of sets
+        """
+        self.size = size
+        self.regions = np.arange(1, 2 ** size)  # Bit i of a region is set i
+        self.worlds = np.arange(2 ** len(self.regions), dtype=np.int64)
+        self.masks = dict()
+
+    def mask(self, members):
+        """
+        :param members: a tuple of (set index, inside) pairs
+        :return: a bit mask of the regions inside (or outside) all of the sets
+        """
+        if members not in self.masks:
+            self.masks[members] = self.compute_mask(members)
+        return self.masks[members]
+
+    def compute_mask(self, members):
+        selected = np.ones(len(self.regions), dtype=bool)
+        for index, inside in members:
+            selected &= ((self.regions >> index) & 1).astype(bool) == inside
+        return int(np.sum(np.left_shift(1, np.nonzero(selected)[0])))
+
+    def holds(self, statement, index: dict, presume_subject=False):
+        """
+        :param statement: a premise or a conclusion (subject, predicate, mood)
+        :param index: a dict of set names -> set index
+        :param presume_subject: if "All" statements require an inhabited subject
+        :return: a boolean array, True for the worlds where the statement holds
+        """
+        lhs, rhs, mood = index[statement[0]], index[statement[1]], statement[2]
+        if mood in "IO":
+            return self.worlds & self.mask(((lhs, True), (rhs, mood == "I"))) != 0
+        holds = self.worlds & self.mask(((lhs, True), (rhs, mood == "E"))) == 0
+        if presume_subject:
+            holds &= self.worlds & self.mask(((lhs, True),)) != 0
+        return holds
+
+    def verdict(self, names, premises, conclusion):
+        """
+        :param names: the names of all sets
+        :param premises: a list of (subject, predicate, mood)
+        :param conclusion: the statement being validated (subject, predicate, mood)
+        :return: "CONFLICT" if no world satisfies the premises, or the key of the
+                 verdict in expression_set.results:
+                 "Some" conclusions are TRUE if they hold in every world of the
+                 premises, NO TRUE if they hold in none of them.
+                 "All" conclusions are TRUE if they hold in every world, FALSE if
+                 they fail in every world where the subject is inhabited (the
+                 diagram presumes the subject of an argument exists).
+                 Otherwise it is MAYBE TRUE.
+        """
+        index = {name: i for i, name in enumerate(sorted(names))}
+        possible = np.ones(len(self.worlds), dtype=bool)
+        for premise in premises:
+            possible &= self.holds(premise, index)
+        if not possible.any():
+            return "CONFLICT"
+        holds = self.holds(conclusion, index)[possible]
+        if holds.all():
+            return "TRUE"
+        if conclusion[2] in "IO":
+            return "NO TRUE" if not holds.any() else "MAYBE TRUE"
+        presumed = self.holds(conclusion, index, presume_subject=True)[possible]
+        return "FALSE" if not presumed.any() else "MAYBE TRUE"
+
+
+def consistent(names, statements):
+    """
+    :param names: the names of all sets
+    :param statements: a list of (subject, predicate, mood, text)
+    :return: True if a world satisfies all statements, i.e. every "Some"
+             statement has a region that no "All" statement makes empty
+    """
+    index = {name: i for i, name in enumerate(names)}
+    regions = range(1, 2 ** len(names))
+
+    def inside(region, name):
+        return bool(region >> index[name] & 1)
+    empty, some = set(), []
+    for lhs, rhs, mood, _ in statements:
+        if mood in "AE":
+            # "All A's are B's" empties A without B, "All A's are not B's" A with B
+            empty.update(r for r in regions
+                         if inside(r, lhs) and inside(r, rhs) == (mood == "E"))
+        else:
+            some.append({r for r in regions
+                         if inside(r, lhs) and inside(r, rhs) == (mood == "I")})
+    return all(support - empty for support in some)
+
+
+class WorkloadGenerator(object):
+    def __init__(self, seed=0, sets=(3,), premises=(2, 4), conclusions=1,
+                 all_ratio=0.5, negation_ratio=0.3, name_length=1,
+                 duplicate_ratio=0.0, symmetric_ratio=0.0, conflict_ratio=0.0,
+                 expected=True):
+        """
+        Generates random problems (premises and conclusions). Each problem only
+        depends on the seed and its index
+        :param seed: the random seed
+        :param sets: the possible numbers of sets of a problem
+        :param premises: the smallest and largest number of premises
+        :param conclusions: the number of conclusions of each problem
+        :param all_ratio: the probability that a premise is an "All" statement
+        :param negation_ratio: the probability that a premise is negated
+        :param name_length: the number of letters of set names
+        :param duplicate_ratio: the probability of repeating a premise
+        :param symmetric_ratio: the probability of adding the converse of a
+                                symmetric premise ("Some B's are A's" for
+                                "Some A's are B's")
+        :param conflict_ratio: the probability of adding a premise that
+                               contradicts a "Some" premise
+        :param expected: if the expected verdicts are computed by ReferenceModel
+        """
+        self.seed = seed
+        self.sets = tuple(sets)
+        self.premises = premises
+        self.conclusions = conclusions
+        self.all_ratio = all_ratio
+        self.negation_ratio = negation_ratio
+        self.name_length = name_length
+        self.duplicate_ratio = duplicate_ratio
+        self.symmetric_ratio = symmetric_ratio
+        self.conflict_ratio = conflict_ratio
+        self.expected = expected
+        self.models = dict()  # number of sets -> ReferenceModel
+
+    def names(self, rng, count):
+        """
+        :return: a list of distinct set names. No name is a part of a
+                 concatenation of the other names, since area labels are
+                 concatenated names
+        """
+        while True:
+            names = set()
+            while len(names) < count:
+                names.add("".join(rng.choice(NAME_LETTERS)
+                                  for _ in range(self.name_length)))
+            names = sorted(names)
+            others = ["".join(n for n in names if n != name) for name in names]
+            if all(name not in other for name, other in zip(names, others)):
+                return names
+
+    def statement(self, rng, lhs, rhs, mood=None):
+        """
+        :return: the mood ("A", "E", "I" or "O") and the text of a statement
+        """
+        if mood is None:
+            negated = rng.random() < self.negation_ratio
+            if rng.random() < self.all_ratio:
+                mood = "E" if negated else "A"
+            else:
+                mood = "O" if negated else "I"
+        return mood, MOODS[mood].format(lhs, rhs)
+
+    def problem(self, index: int):
+        """
+        :param index: the index of the problem
+        :return: a dict of "id", "sets", "premises", "conclusions", "conflicting"
+                 (if a contradiction was added on purpose) and "expected" (the
+                 verdict of each conclusion by ReferenceModel, None if there are
+                 too many sets)
+        """
+        rng = random.Random("{}:{}".format(self.seed, index))
+        names = self.names(rng, rng.choice(self.sets))
+        statements = self.statements(rng, names)
+        while not consistent(names, statements):
+            statements = self.statements(rng, names)
+        conflicting = rng.random() < self.conflict_ratio
+        if conflicting:
+            lhs, rhs = rng.sample(names, 2)
+            mood = rng.choice("IO")
+            statements.append((lhs, rhs) + self.statement(rng, lhs, rhs, mood))
+            statements.append((lhs, rhs) + self.statement(rng, lhs, rhs,
+                                                          "E" if mood == "I" else "A"))
+        rng.shuffle(statements)
+        conclusions = []
+        for _ in range(self.conclusions):
+            lhs, rhs = rng.sample(names, 2)
+            conclusions.append((lhs, rhs) + self.statement(rng, lhs, rhs))
+
+        problem = {"id": "{}-{}".format(self.seed, index), "sets": names,
+                   "premises": [s[3] for s in statements],
+                   "conclusions": [c[3] for c in conclusions],
+                   "conflicting": conflicting}
+        if self.expected:
+            problem["expected"] = self.verdicts(names, statements, conclusions)
+        return problem
+
+    def statements(self, rng, names):
+        """
+        :return: a list of random premises (subject, predicate, mood, text) that
+                 mention every set
+        """
+        statements = []
+        for _ in range(rng.randint(*self.premises)):
+            lhs, rhs = rng.sample(names, 2)
+            statements.append((lhs, rhs) + self.statement(rng, lhs, rhs))
+            if rng.random() < self.symmetric_ratio and statements[-1][2] in "EI":
+                statements.append((rhs, lhs) + self.statement(rng, rhs, lhs,
+                                                              statements[-1][2]))
+            if rng.random() < self.duplicate_ratio:
+                statements.append(rng.choice(statements))
+        # Every set appears in the premises
+        used = {name for s in statements for name in s[:2]}
+        for name in names:
+            if name not in used:
+                other = rng.choice([n for n in names if n != name])
+                statements.append((name, other) + self.statement(rng, name, other))
+        return statements
+
+    def verdicts(self, names, premises, conclusions):
+        """
+        :param names: the names of all sets
+        :param premises: a list of (subject, predicate, mood, text)
+        :param conclusions: a list of (subject, predicate, mood, text)
+        :return: a list of expected verdicts of the conclusions, or None if the
+                 diagram has too many sets for the reference model
+        """
+        if len(names) > REFERENCE_MAX_SETS:
+            return None
+        if len(names) not in self.models:
+            self.models[len(names)] = ReferenceModel(len(names))
+        model = self.models[len(names)]
+        return [model.verdict(names, premises, c) for c in conclusions]
+
+    def generate(self, count: int, start=0):
+        """
+        :return: an iterator of count problems
+        """
+        for index in range(start, start + count):
+            yield self.problem(index)
+
+
+def write_venn(problem, directory):
+    """
+    This function writes the premises of a problem to <id>.venn and its
+    conclusions to <id>.conclusions, one per line
+    """
+    path = os.path.join(directory, problem["id"])
+    with open(path + ".venn", "w", encoding="utf8") as f:
+        f.write("\n".join(problem["premises"]) + "\n")
+    with open(path + ".conclusions", "w", encoding="utf8") as f:
+        f.write("\n".join(problem["conclusions"]) + "\n")
+
+
+def parse_range(text: str):
+    """
+    :param text: "3" or "2-4"
+    :return: (smallest, largest)
+    """
+    low, _, high = text.partition("-")
+    return int(low), int(high or low)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Generate random premise sets "
+                                                 "and conclusions")
+    parser.add_argument("-n", "--count", help="Number of problems", type=int,
+                        default=10)
+    parser.add_argument("--seed", help="Random seed", type=int, default=0)
+    parser.add_argument("--start", help="Index of the first problem", type=int,
+                        default=0)
+    parser.add_argument("--sets", help="Number of sets, e.g. 3 or 2-4",
+                        type=str, default="3")
+    parser.add_argument("--premises", help="Number of premises, e.g. 2-4",
+                        type=str, default="2-4")
+    parser.add_argument("--conclusions", help="Number of conclusions of each "
+                                              "problem", type=int, default=1)
+    parser.add_argument("--all_ratio", help="Probability of \"All\" premises",
+                        type=float, default=0.5)
+    parser.add_argument("--negation_ratio", help="Probability of negated premises",
+                        type=float, default=0.3)
+    parser.add_argument("--name_length", help="Letters of set names", type=int,
+                        default=1)
+    parser.add_argument("--duplicate_ratio", help="Probability of repeating a "
+                                                  "premise", type=float, default=0)
+    parser.add_argument("--symmetric_ratio", help="Probability of adding the "
+                                                  "converse of a symmetric premise",
+                        type=float, default=0)
+    parser.add_argument("--conflict_ratio", help="Probability of adding "
+                                                 "conflicting premises",
+                        type=float, default=0)
+    parser.add_argument("--no_expected", help="Do not compute expected verdicts",
+                        action="store_true")
+    parser.add_argument("--jsonl", help="Write problems to a JSONL file "
+                                        "(default: standard output)", type=str)
+    parser.add_argument("--venn_dir", help="Write problems as .venn files to a "
+                                           "directory", type=str)
+    args = parser.parse_args(argv[1:])
+
+    low, high = parse_range(args.sets)
+    generator = WorkloadGenerator(
+        seed=args.seed, sets=range(low, high + 1),
+        premises=parse_range(args.premises), conclusions=args.conclusions,
+        all_ratio=args.all_ratio, negation_ratio=args.negation_ratio,
+        name_length=args.name_length, duplicate_ratio=args.duplicate_ratio,
+        symmetric_ratio=args.symmetric_ratio, conflict_ratio=args.conflict_ratio,
+        expected=not args.no_expected)
+    if args.venn_dir:
+        os.makedirs(args.venn_dir, exist_ok=True)
+    out = None
+    if args.jsonl or not args.venn_dir:
+        out = open(args.jsonl, "w", encoding="utf8") if args.jsonl else sys.stdout
+    try:
+        for problem in generator.generate(args.count, args.start):
+            if out is not None:
+                out.write(json.dumps(problem) + "\n")
+            if args.venn_dir:
+                write_venn(problem, args.venn_dir)
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))